@@ -0,0 +1,313 @@
+"""
+Capa de almacenamiento columnar (Parquet) para el pipeline del ECU 911.
+
+Todas las etapas pueden leer y escribir aquí en lugar de CSV:
+- Fecha se guarda como timestamp (no hay que volver a parsear texto)
+- provincia, Canton, Parroquia, Servicio y Subtipo van codificadas como
+  diccionario (category en pandas)
+- los archivos grandes se particionan por año/mes (anio=AAAA/mes=M)
+- la lectura permite proyectar solo las columnas necesarias
+"""
+import glob
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+FORMATOS = ['csv', 'parquet']
+COLUMNAS_DICCIONARIO = ['provincia', 'Canton', 'Parroquia', 'Servicio', 'Subtipo']
+COLUMNAS_PARTICION = ['anio', 'mes']
+ESQUEMA_PARTICION = pa.schema([('anio', pa.int32()), ('mes', pa.int32())])
+
+
+def es_parquet(ruta: str) -> bool:
+    """
+    True si la ruta apunta a un archivo o carpeta Parquet.
+    """
+    return ruta.rstrip('/').endswith('.parquet')
+
+
+def ruta_con_formato(ruta: str, formato: str) -> str:
+    """
+    Cambia la extensión de la ruta según el formato ('csv' o 'parquet').
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato} (use {FORMATOS})")
+    return f"{os.path.splitext(ruta.rstrip('/'))[0]}.{formato}"
+
+
+def tamano_mb(ruta: str) -> float:
+    """
+    Tamaño en MB de un archivo o de una carpeta particionada.
+    """
+    if os.path.isdir(ruta):
+        total = sum(
+            os.path.getsize(f)
+            for f in glob.glob(os.path.join(ruta, '**', '*'), recursive=True)
+            if os.path.isfile(f)
+        )
+    else:
+        total = os.path.getsize(ruta)
+    return total / (1024 * 1024)
+
+
+# ============================================================
+# 2. ESCRITURA
+# ============================================================
+
+def preparar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve el DataFrame con los tipos del almacenamiento columnar:
+    - Fecha como datetime64
+    - columnas geográficas y de servicio como category (diccionario)
+    """
+    cambios = {}
+    if 'Fecha' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['Fecha']):
+        cambios['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+    for col in COLUMNAS_DICCIONARIO:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            cambios[col] = df[col].astype('category')
+    return df.assign(**cambios) if cambios else df
+
+
+def escribir_parquet(df: pd.DataFrame, ruta: str, particionar: bool = False) -> str:
+    """
+    Escribe df en Parquet.
+    - particionar=False: un solo archivo (p. ej. un mes georreferenciado)
+    - particionar=True: carpeta con particiones anio=/mes= derivadas de Fecha
+      (la carpeta se reemplaza en las particiones que se vuelven a escribir)
+    """
+    df = preparar_tipos(df)
+    if not particionar:
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), ruta)
+        return ruta
+
+    escribir_tabla_arrow(pa.Table.from_pandas(con_particiones(df), preserve_index=False), ruta)
+    return ruta
+
+
+def con_particiones(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Agrega las columnas anio/mes (de Fecha) que definen las particiones.
+    """
+    fecha = df['Fecha']
+    return df.assign(
+        anio=fecha.dt.year.astype('Int32'),
+        mes=fecha.dt.month.astype('Int32'),
+    )
+
+
+def escribir_tabla_arrow(tabla: pa.Table, ruta: str, existentes: str = 'delete_matching',
+                         nombre_base: str = 'parte-{i}.parquet') -> None:
+    """
+    Escribe una tabla Arrow (ya con columnas anio/mes) como dataset
+    particionado estilo hive.
+    """
+    ds.write_dataset(
+        tabla,
+        ruta,
+        format='parquet',
+        partitioning=ds.partitioning(ESQUEMA_PARTICION, flavor='hive'),
+        existing_data_behavior=existentes,
+        basename_template=nombre_base,
+    )
+
+
+def escribir_tabla(df: pd.DataFrame, ruta: str, formato: str = 'csv',
+                   particionar: bool = False) -> str:
+    """
+    Guarda df en el formato pedido y devuelve la ruta final
+    (la extensión se ajusta al formato).
+    """
+    ruta = ruta_con_formato(ruta, formato)
+    if formato == 'parquet':
+        return escribir_parquet(df, ruta, particionar=particionar)
+    df.to_csv(ruta, index=False, encoding='utf-8')
+    return ruta
+
+
+def esquema_estable(esquema: pa.Schema) -> pa.Schema:
+    """
+    Esquema del primer bloque que sirve para todos los siguientes:
+    diccionarios con índices int32 y valores string (cada bloque trae sus
+    propias categorías) y columnas sin ningún valor como string.
+    """
+    campos = []
+    for campo in esquema:
+        if pa.types.is_dictionary(campo.type):
+            campo = campo.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif pa.types.is_null(campo.type) or pa.types.is_large_string(campo.type):
+            campo = campo.with_type(pa.string())
+        campos.append(campo)
+    return pa.schema(campos, metadata=esquema.metadata)
+
+
+class EscritorPorBloques:
+    """
+    Escribe una tabla bloque a bloque sin tenerla completa en memoria:
+    - csv: el primer bloque con encabezado y los demás agregados al final
+    - parquet: un solo archivo con un row group por bloque
+    - parquet con particionar=True: carpeta anio=/mes= con archivos
+      parte-<bloque>-<i>.parquet por bloque
+    Las columnas y tipos del primer bloque fijan los de la salida.
+    Se escribe en un temporal que reemplaza a la ruta final al cerrar (si
+    hay un error el temporal se borra). Uso:
+
+        with EscritorPorBloques(ruta, formato) as escritor:
+            for bloque in bloques:
+                escritor.escribir(bloque)
+        escritor.ruta  # ruta final
+    """
+
+    def __init__(self, ruta: str, formato: str = 'csv', particionar: bool = False):
+        self.ruta = ruta_con_formato(ruta, formato)
+        self.formato = formato
+        self.particionar = particionar and formato == 'parquet'
+        self.temporal = f"{self.ruta}.tmp{os.getpid()}"
+        self.filas = 0
+        self.bloques = 0
+        self.columnas = None
+        self.esquema = None
+        self._parquet = None
+
+    def _alinear(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Columnas del primer bloque, en su orden (las que falten quedan nulas
+        y las que sobren se descartan).
+        """
+        if self.columnas is None:
+            self.columnas = list(df.columns)
+            return df
+        if list(df.columns) == self.columnas:
+            return df
+        faltantes = {col: None for col in self.columnas if col not in df.columns}
+        return df.assign(**faltantes)[self.columnas]
+
+    def escribir(self, df: pd.DataFrame) -> None:
+        df = self._alinear(df)
+        if self.particionar:
+            tabla = pa.Table.from_pandas(con_particiones(preparar_tipos(df)), preserve_index=False)
+            if self.esquema is None:
+                # Se conservan los metadatos pandas del primer bloque (Int64, ...)
+                self.esquema = esquema_estable(tabla.schema)
+            escribir_tabla_arrow(tabla.select(self.esquema.names).cast(self.esquema), self.temporal,
+                                 existentes='overwrite_or_ignore',
+                                 nombre_base=f'parte-{self.bloques}-{{i}}.parquet')
+        elif self.formato == 'parquet':
+            tabla = pa.Table.from_pandas(preparar_tipos(df), preserve_index=False)
+            if self._parquet is None:
+                # Metadatos pandas del primer bloque, igual que al particionar
+                self.esquema = esquema_estable(tabla.schema)
+                self._parquet = pq.ParquetWriter(self.temporal, self.esquema)
+            self._parquet.write_table(tabla.select(self.esquema.names).cast(self.esquema))
+        else:
+            primero = self.esquema is None
+            df.to_csv(self.temporal, index=False, encoding='utf-8',
+                      mode='w' if primero else 'a', header=primero)
+            self.esquema = self.columnas
+        self.filas += len(df)
+        self.bloques += 1
+
+    def __enter__(self) -> "EscritorPorBloques":
+        return self
+
+    def __exit__(self, tipo, error, traza) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+        if tipo is None and self.esquema is not None:
+            if self.particionar and not os.path.exists(self.temporal):
+                # Solo bloques vacíos: write_dataset no creó ninguna partición
+                os.makedirs(self.temporal)
+            if os.path.isdir(self.ruta):
+                shutil.rmtree(self.ruta)
+            os.replace(self.temporal, self.ruta)
+        elif os.path.isdir(self.temporal):
+            shutil.rmtree(self.temporal)
+        elif os.path.exists(self.temporal):
+            os.remove(self.temporal)
+
+
+# ============================================================
+# 3. LECTURA
+# ============================================================
+
+def abrir_dataset(ruta: str) -> ds.Dataset:
+    """
+    Abre un archivo o carpeta Parquet (con particiones hive si existen).
+    """
+    return ds.dataset(ruta, format='parquet', partitioning='hive')
+
+
+def columnas_parquet(ruta: str) -> list:
+    """
+    Columnas de datos de un Parquet, sin las columnas de partición
+    (solo lee el esquema).
+    """
+    return [c for c in abrir_dataset(ruta).schema.names if c not in COLUMNAS_PARTICION]
+
+
+def leer_parquet(ruta: str, columnas: list = None, filtro=None) -> pd.DataFrame:
+    """
+    Lee un Parquet leyendo solo las columnas pedidas.
+    filtro es una expresión de pyarrow.dataset (p. ej. ds.field('anio') == 2024)
+    que se empuja a las particiones.
+    """
+    if columnas is None:
+        columnas = columnas_parquet(ruta)
+    tabla = abrir_dataset(ruta).to_table(columns=columnas, filter=filtro)
+    return tabla.to_pandas()
+
+
+def leer_tabla(ruta: str, columnas: list = None, **kwargs_csv) -> pd.DataFrame:
+    """
+    Lee un CSV o un Parquet según la extensión de la ruta.
+    Los kwargs extra solo aplican a pd.read_csv.
+    """
+    if es_parquet(ruta):
+        return leer_parquet(ruta, columnas)
+    return pd.read_csv(ruta, usecols=columnas, **kwargs_csv)
+
+
+def columnas_tabla(ruta: str, **kwargs_csv) -> list:
+    """
+    Columnas de un CSV o Parquet sin cargar los datos.
+    """
+    if es_parquet(ruta):
+        return columnas_parquet(ruta)
+    return pd.read_csv(ruta, nrows=0, **kwargs_csv).columns.tolist()
+
+
+def leer_tabla_por_bloques(ruta: str, columnas: list = None, tamano_bloque: int = None,
+                           **kwargs_csv):
+    """
+    Itera un CSV o Parquet en DataFrames de a lo más tamano_bloque filas,
+    para procesar archivos que no caben en memoria.
+    Con tamano_bloque=None devuelve un único bloque con todo el archivo.
+    """
+    if tamano_bloque is None:
+        yield leer_tabla(ruta, columnas, **kwargs_csv)
+        return
+
+    if es_parquet(ruta):
+        if columnas is None:
+            columnas = columnas_parquet(ruta)
+        lotes = abrir_dataset(ruta).to_batches(
+            columns=columnas,
+            batch_size=tamano_bloque,
+            batch_readahead=0,
+            fragment_readahead=0,
+        )
+        for lote in lotes:
+            if lote.num_rows:
+                yield lote.to_pandas()
+        return
+
+    yield from pd.read_csv(ruta, usecols=columnas, chunksize=tamano_bloque, **kwargs_csv)
@@ -1,4 +1,5 @@
 import pandas as pd
+from catalogo_inec import cargar_catalogo_inec
 
 # Cargar el CSV
 print("Cargando emergencias_octubre_2021.csv...")
@@ -77,22 +78,15 @@ else:
 
 # Cargar INEC para comparar
 print("\n=== VERIFICANDO CONTRA CODIFICACIÓN INEC ===")
-dataI = pd.read_excel("CODIFICACIÓN_2021.xlsx", header=0, skiprows=1)
-dataI = dataI.dropna(axis=1, how="any")
+catalogo = cargar_catalogo_inec("CODIFICACIÓN_2021.xlsx")
+dataI = catalogo.dataI
 
-from unidecode import unidecode
-
-def norm_nombre(s):
-    if pd.isna(s):
-        return None
-    s = str(s).strip()
-    s = " ".join(s.split())
-    s = unidecode(s).lower()
-    return s
+# Nombres INEC ya normalizados en el catálogo compilado
+dataI_parr_norm = catalogo.inec_ref['parr_norm']
 
 print("\n1. Buscando 'el carmen de pijili' en INEC:")
 inec_carmen = dataI[
-    dataI['DPA_DESPAR'].apply(norm_nombre).str.contains('carmen.*pijili', case=False, na=False, regex=True)
+    dataI_parr_norm.str.contains('carmen.*pijili', case=False, na=False, regex=True)
 ]
 print(f"Resultados: {len(inec_carmen)}")
 if len(inec_carmen) > 0:
@@ -100,7 +94,7 @@ if len(inec_carmen) > 0:
 
 print("\n2. Buscando 'tiputini' en INEC:")
 inec_tiputini = dataI[
-    dataI['DPA_DESPAR'].apply(norm_nombre) == 'tiputini'
+    dataI_parr_norm == 'tiputini'
 ]
 print(f"Resultados: {len(inec_tiputini)}")
 if len(inec_tiputini) > 0:
@@ -108,8 +102,18 @@ if len(inec_tiputini) > 0:
 else:
     # Buscar similar
     inec_tiputini_like = dataI[
-        dataI['DPA_DESPAR'].apply(norm_nombre).str.contains('tipu', case=False, na=False)
+        dataI_parr_norm.str.contains('tipu', case=False, na=False)
     ]
     print(f"Resultados similares: {len(inec_tiputini_like)}")
     if len(inec_tiputini_like) > 0:
         print(inec_tiputini_like[['DPA_DESPRO', 'DPA_DESCAN', 'DPA_DESPAR', 'DPA_PARROQ']])
+
+# Resolver los mismos casos con el match por nombre (exacto + difuso por bloques)
+print("\n=== MATCH POR NOMBRE CONTRA INEC ===")
+from coincidencia_nombres import IndiceNombresINEC
+
+indice_nombres = IndiceNombresINEC(catalogo.inec_ref)
+for tripleta in [('azuay', 'camilo ponce enriquez', 'el carmen de pijili'),
+                 ('orellana', 'aguarico', 'tiputini')]:
+    codigo, confianza, metodo = indice_nombres.resolver(*tripleta)
+    print(f"{' / '.join(tripleta)} -> DPA_PARROQ={codigo} (metodo={metodo}, confianza={confianza:.2f})")
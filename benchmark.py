@@ -0,0 +1,360 @@
+"""
+Benchmark de las etapas del pipeline del ECU 911 sobre datos sintéticos.
+
+Genera (o reutiliza) un conjunto de datos con datos_sinteticos.py y corre en
+una carpeta de trabajo la cadena completa, midiendo cada etapa:
+- norm_nombre: normalización escalar de provincia/cantón/parroquia
+- clean_emergencias: limpieza de cada CSV mensual
+- mapear_parroquias_inec: código INEC de cada archivo limpio
+- unir_georreferenciados: unión de los *_georreferenciado
+- concatenar_polars: concatenación 2021-2025 con Polars
+- generar_agregados: generar_agregados.main sobre el resultado
+Cada etapa corre en un proceso propio, así el pico de memoria (RSS) de una
+no contamina a la siguiente. Solo se cronometra la función medida (leer la
+entrada y escribir lo que necesita la etapa siguiente no cuenta); el pico de
+RSS sí incluye la entrada de la etapa, que es lo que hay que tener en RAM.
+
+Los resultados se comparan con una base guardada (--guardar-base) y las
+etapas más lentas o con más memoria que la base más la tolerancia se
+reportan como regresión (código de salida 1).
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from datos_sinteticos import ESCALAS, SEMILLA, filas_desde_texto, generar_datos
+from instrumentacion import memoria_mb, reiniciar_pico_rss
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+CARPETA_BENCHMARK = "benchmark_datos"
+ARCHIVO_BASE = "benchmark_base.json"
+ARCHIVO_RESULTADOS = "benchmark_resultados.json"
+
+ETAPAS = [
+    'norm_nombre',
+    'clean_emergencias',
+    'mapear_parroquias_inec',
+    'unir_georreferenciados',
+    'concatenar_polars',
+    'generar_agregados',
+]
+
+# Margen sobre la base antes de reportar una regresión (0.15 = 15 %)
+TOLERANCIA_TIEMPO = 0.15
+TOLERANCIA_MEMORIA = 0.10
+# Etapas más rápidas que esto (en la base y ahora) son ruido de medición
+MINIMO_SEGUNDOS = 0.5
+
+COLUMNAS_NOMBRE = ['provincia', 'Canton', 'Parroquia']
+
+
+class Medicion:
+    """
+    Acumula el tiempo y las filas de las secciones medidas de una etapa.
+    """
+
+    def __init__(self):
+        self.segundos = 0.0
+        self.filas = 0
+
+    @contextlib.contextmanager
+    def medir(self, filas: int = 0):
+        inicio = time.perf_counter()
+        yield
+        self.segundos += time.perf_counter() - inicio
+        self.filas += filas
+
+
+# ============================================================
+# 2. ETAPAS (cada una corre en la carpeta de trabajo)
+# ============================================================
+
+def archivos_crudos() -> list:
+    return sorted(a for a in glob.glob("emergencias_*.csv")
+                  if not a.endswith("_georreferenciado.csv"))
+
+
+def etapa_norm_nombre(medicion: Medicion, formato: str) -> None:
+    import pandas as pd
+    from normalizacion import norm_nombre
+
+    for ruta in archivos_crudos():
+        df = pd.read_csv(ruta, sep=";", usecols=COLUMNAS_NOMBRE, dtype=str)
+        with medicion.medir(len(df)):
+            for col in COLUMNAS_NOMBRE:
+                df[col].map(norm_nombre)
+
+
+def etapa_clean_emergencias(medicion: Medicion, formato: str) -> None:
+    from procesar_todos_emergencias import clean_emergencias, load_emergencias
+
+    for ruta in archivos_crudos():
+        df = load_emergencias(ruta)
+        with medicion.medir(len(df)):
+            clean_emergencias(df)
+
+
+def etapa_mapear_parroquias_inec(medicion: Medicion, formato: str) -> None:
+    """
+    Además deja los emergencias_X_georreferenciado para la etapa siguiente.
+    """
+    from almacenamiento import escribir_tabla
+    from catalogo_inec import ARCHIVO_CODIFICACION, cargar_catalogo_inec
+    from coincidencia_nombres import completar_por_nombre
+    from procesar_todos_emergencias import clean_emergencias, load_emergencias, mapear_parroquias_inec
+
+    inec_ref = cargar_catalogo_inec(ARCHIVO_CODIFICACION).inec_ref
+    for ruta in archivos_crudos():
+        df = clean_emergencias(load_emergencias(ruta))
+        with medicion.medir(len(df)):
+            df = mapear_parroquias_inec(df, inec_ref)
+        df = completar_por_nombre(df, inec_ref)
+        escribir_tabla(df, f"{os.path.splitext(ruta)[0]}_georreferenciado.csv", formato)
+
+
+def etapa_unir_georreferenciados(medicion: Medicion, formato: str) -> None:
+    from unir_georreferenciados import unir_archivos_georreferenciados
+
+    with medicion.medir():
+        df = unir_archivos_georreferenciados(formato, usar_cache=False)
+    medicion.filas += len(df)
+
+
+def etapa_concatenar_polars(medicion: Medicion, formato: str) -> None:
+    """
+    El resultado queda como datos_limpios_2021_2025 (entrada de generar_agregados).
+    """
+    import polars as pl
+
+    from almacenamiento import ruta_con_formato
+    from concatenar_georreferenciados_polars import concatenar_archivos_georreferenciados
+    from generar_agregados import ARCHIVO_CSV
+
+    with medicion.medir():
+        lf = concatenar_archivos_georreferenciados(formato)
+    medicion.filas += lf.select(pl.len()).collect().item()
+    os.replace(ruta_con_formato("todos_georreferenciados_2021_2025.csv", formato),
+               ruta_con_formato(ARCHIVO_CSV, formato))
+
+
+def etapa_generar_agregados(medicion: Medicion, formato: str) -> None:
+    from consultas_dashboard import leer_metadatos
+    from generar_agregados import CARPETA_SALIDA, main
+
+    with medicion.medir():
+        main()
+    medicion.filas += leer_metadatos(CARPETA_SALIDA)["total_registros"]
+
+
+def correr_etapa(nombre: str, trabajo: str, formato: str, ruta_resultado: str) -> None:
+    """
+    Corre una etapa en este proceso y guarda su medición en ruta_resultado.
+    """
+    funcion = globals()[f"etapa_{nombre}"]
+    medicion = Medicion()
+    os.chdir(trabajo)
+    rss_inicial = memoria_mb("VmRSS")
+    reiniciar_pico_rss()
+    funcion(medicion, formato)
+    resultado = {
+        "segundos": round(medicion.segundos, 3),
+        "filas": medicion.filas,
+        "filas_por_s": round(medicion.filas / medicion.segundos, 1) if medicion.segundos else None,
+        "rss_pico_mb": round(memoria_mb("VmHWM"), 1),
+        "rss_inicial_mb": round(rss_inicial, 1),
+    }
+    with open(ruta_resultado, "w", encoding="utf-8") as f:
+        json.dump(resultado, f)
+
+
+# ============================================================
+# 3. EJECUCIÓN DEL BENCHMARK
+# ============================================================
+
+def preparar_datos(carpeta: str, filas: int, meses: int, semilla: int, con_hora: bool = False) -> str:
+    """
+    Genera los datos sintéticos (o reutiliza los de una corrida anterior con
+    los mismos parámetros). Devuelve la carpeta de datos.
+    """
+    datos = os.path.join(carpeta, f"datos_{filas}_{meses}_{semilla}_{'hora' if con_hora else 'dia'}")
+    marca = os.path.join(datos, ".completo")
+    if os.path.exists(marca):
+        print(f"[OK] Reutilizando datos sintéticos de {datos}")
+        return datos
+    print(f"[PROCESO] Generando {filas:,} filas sintéticas en {meses} meses...")
+    shutil.rmtree(datos, ignore_errors=True)
+    generar_datos(datos, filas, meses, semilla=semilla, con_hora=con_hora)
+    open(marca, "w").close()
+    return datos
+
+
+def preparar_trabajo(carpeta: str, datos: str) -> str:
+    """
+    Carpeta de trabajo limpia con enlaces a los datos crudos y al catálogo.
+    """
+    trabajo = os.path.abspath(os.path.join(carpeta, "trabajo"))
+    shutil.rmtree(trabajo, ignore_errors=True)
+    os.makedirs(trabajo)
+    for nombre in os.listdir(datos):
+        if nombre.endswith((".csv", ".xlsx")):
+            os.symlink(os.path.abspath(os.path.join(datos, nombre)), os.path.join(trabajo, nombre))
+    return trabajo
+
+
+def ejecutar_benchmark(filas: int, meses: int = 12, semilla: int = SEMILLA,
+                       formato: str = "csv", carpeta: str = CARPETA_BENCHMARK,
+                       detalle: bool = False, con_hora: bool = False) -> dict:
+    """
+    Corre todas las ETAPAS en orden (cada una en un subproceso) y devuelve
+    el resultado con la configuración y la medición de cada etapa.
+    Con con_hora los datos sintéticos traen hora en Fecha (el feed real solo
+    trae el día, así que la corrida por defecto es la representativa).
+    """
+    datos = preparar_datos(carpeta, filas, meses, semilla, con_hora)
+    trabajo = preparar_trabajo(carpeta, datos)
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "filas": filas,
+        "meses": meses,
+        "semilla": semilla,
+        "formato": formato,
+        "con_hora": con_hora,
+        "python": platform.python_version(),
+        "maquina": platform.node(),
+        "etapas": {},
+    }
+
+    for nombre in ETAPAS:
+        print(f"[PROCESO] {nombre}...")
+        ruta_resultado = os.path.join(trabajo, f".resultado_{nombre}.json")
+        proceso = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--etapa", nombre,
+             "--trabajo", trabajo, "--formato", formato, "--resultado", ruta_resultado],
+            stdout=None if detalle else subprocess.DEVNULL,
+        )
+        if proceso.returncode != 0:
+            print(f"[ERROR] {nombre} terminó con código {proceso.returncode}; "
+                  f"se detiene el benchmark (use --detalle para ver la salida)")
+            break
+        with open(ruta_resultado, encoding="utf-8") as f:
+            medicion = json.load(f)
+        resultado["etapas"][nombre] = medicion
+        print(f"  [OK] {medicion['segundos']:.2f} s | {medicion['filas']:,} filas | "
+              f"{medicion['filas_por_s'] or 0:,.0f} filas/s | pico {medicion['rss_pico_mb']:,.0f} MB")
+    return resultado
+
+
+# ============================================================
+# 4. COMPARACIÓN CON LA BASE
+# ============================================================
+
+def comparar_con_base(resultado: dict, base: dict,
+                      tolerancia_tiempo: float = TOLERANCIA_TIEMPO,
+                      tolerancia_memoria: float = TOLERANCIA_MEMORIA) -> list:
+    """
+    Imprime la comparación etapa por etapa y devuelve las regresiones.
+    Si la base se midió con otra escala solo se compara el rendimiento
+    (filas/s), que no depende del número de filas; con otro formato o con
+    otro tipo de Fecha (con o sin hora) no se compara.
+    """
+    if resultado["formato"] != base.get("formato"):
+        print(f"[AVISO] La base se midió con formato {base.get('formato')}; no se compara")
+        return []
+    # Las bases anteriores a con_hora se midieron con hora en Fecha
+    if resultado["con_hora"] != base.get("con_hora", True):
+        print("[AVISO] La base se midió con otro tipo de Fecha (con/sin hora); no se compara")
+        return []
+    misma_escala = all(resultado[k] == base.get(k) for k in ("filas", "meses"))
+    if not misma_escala:
+        print(f"[AVISO] La base se midió con {base.get('filas', 0):,} filas / "
+              f"{base.get('meses')} meses; solo se compara filas/s")
+
+    regresiones = []
+    print(f"\n{'etapa':<24}{'tiempo':>10}{'base':>10}{'cambio':>9}{'pico MB':>10}{'base':>8}{'cambio':>9}")
+    for nombre, actual in resultado["etapas"].items():
+        anterior = base.get("etapas", {}).get(nombre)
+        if anterior is None:
+            print(f"{nombre:<24}{actual['segundos']:>10.2f}{'-':>10}")
+            continue
+
+        if misma_escala:
+            cambio_tiempo = actual["segundos"] / anterior["segundos"] - 1 if anterior["segundos"] else 0
+        else:
+            cambio_tiempo = (anterior["filas_por_s"] / actual["filas_por_s"] - 1
+                             if actual["filas_por_s"] else 0)
+        cambio_memoria = actual["rss_pico_mb"] / anterior["rss_pico_mb"] - 1
+
+        print(f"{nombre:<24}{actual['segundos']:>10.2f}{anterior['segundos']:>10.2f}"
+              f"{cambio_tiempo:>+9.0%}{actual['rss_pico_mb']:>10.0f}{anterior['rss_pico_mb']:>8.0f}"
+              f"{cambio_memoria:>+9.0%}")
+        medible = max(actual["segundos"], anterior["segundos"]) >= MINIMO_SEGUNDOS
+        if medible and cambio_tiempo > tolerancia_tiempo:
+            regresiones.append(f"{nombre}: {cambio_tiempo:+.0%} de tiempo")
+        if misma_escala and cambio_memoria > tolerancia_memoria:
+            regresiones.append(f"{nombre}: {cambio_memoria:+.0%} de memoria")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline ECU 911 con datos sintéticos")
+    parser.add_argument("--filas", type=filas_desde_texto, default=ESCALAS['1M'],
+                        help=f"filas sintéticas en total (p. ej. 200k, {', '.join(ESCALAS)})")
+    parser.add_argument("--meses", type=int, default=12, help="archivos mensuales")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv",
+                        help="formato de los archivos intermedios")
+    parser.add_argument("--carpeta", default=CARPETA_BENCHMARK,
+                        help="carpeta para los datos sintéticos y la corrida")
+    parser.add_argument("--base", default=ARCHIVO_BASE, help="resultados de referencia")
+    parser.add_argument("--guardar-base", action="store_true",
+                        help="guardar esta corrida como la nueva base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_TIEMPO,
+                        help="aumento de tiempo tolerado antes de reportar regresión")
+    parser.add_argument("--detalle", action="store_true", help="mostrar la salida de cada etapa")
+    parser.add_argument("--con-hora", action="store_true",
+                        help="datos sintéticos con hora en Fecha (por defecto solo el día, como el feed real)")
+    # Uso interno: correr una sola etapa en un subproceso
+    parser.add_argument("--etapa", choices=ETAPAS, help=argparse.SUPPRESS)
+    parser.add_argument("--trabajo", help=argparse.SUPPRESS)
+    parser.add_argument("--resultado", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.etapa:
+        correr_etapa(args.etapa, args.trabajo, args.formato, args.resultado)
+        sys.exit(0)
+
+    resultado = ejecutar_benchmark(args.filas, args.meses, args.semilla, args.formato,
+                                   args.carpeta, args.detalle, args.con_hora)
+    ruta_resultados = os.path.join(args.carpeta, ARCHIVO_RESULTADOS)
+    with open(ruta_resultados, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\n[OK] Resultados guardados en {ruta_resultados}")
+
+    if args.guardar_base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"[OK] Base guardada en {args.base}")
+    elif os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar_con_base(resultado, base, args.tolerancia)
+        if regresiones:
+            print("\n[AVISO] Regresiones respecto de la base:")
+            for regresion in regresiones:
+                print(f"  - {regresion}")
+            sys.exit(1)
+        print("\n[OK] Sin regresiones respecto de la base")
+    else:
+        print(f"[AVISO] No existe {args.base}; use --guardar-base para crearla")
@@ -0,0 +1,235 @@
+"""
+Cache en disco de los resultados de cada etapa del pipeline.
+
+Una etapa (georreferenciar un mes, unir los meses) se identifica por una
+clave sha256 de:
+- el hash del contenido de cada archivo de entrada
+- el hash del catálogo INEC o de otras tablas que use
+- la versión del pipeline: VERSION_PIPELINE más el hash del código fuente
+  de los módulos de la etapa (MODULOS_ETAPA), así editar el código invalida
+  la cache sin tener que acordarse de subir un número
+- los parámetros que cambian la salida (formato, ...)
+Si la clave ya está en la cache el artefacto (archivo o carpeta Parquet) se
+copia a su ruta de salida y la etapa no se ejecuta.
+
+Cada entrada es una carpeta propia (CARPETA_CACHE_ETAPAS/<clave>/), que se
+escribe en un temporal y se renombra, así varios workers pueden usar la
+cache a la vez. La fecha de modificación de entrada.json marca el último
+uso: al pasar de limite_mb se borran las entradas usadas hace más tiempo
+(LRU). Los hash de los archivos de entrada se recuerdan por tamaño y mtime
+para no releer archivos grandes que no cambiaron.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from catalogo_inec import hash_archivo
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+CARPETA_CACHE_ETAPAS = ".cache_etapas"
+LIMITE_CACHE_MB = 20_000
+ARCHIVO_HUELLAS = "huellas.json"
+ARCHIVO_ENTRADA = "entrada.json"
+
+# Subir si cambia algo de la salida que no está en el código de MODULOS_ETAPA
+# (versiones de librerías, formato de la cache, ...)
+VERSION_PIPELINE = 1
+
+# Etapa -> módulos cuyo código define su salida
+MODULOS_ETAPA = {
+    'georreferenciacion': ['procesar_todos_emergencias.py', 'normalizacion.py', 'esquema.py',
+                           'catalogo_inec.py', 'coincidencia_nombres.py', 'almacenamiento.py',
+                           'conjuntos.py'],
+    'unir': ['unir_georreferenciados.py', 'esquema.py', 'almacenamiento.py', 'conjuntos.py'],
+}
+
+_CARPETA_CODIGO = os.path.dirname(os.path.abspath(__file__))
+
+
+def version_codigo(etapa: str) -> str:
+    """
+    VERSION_PIPELINE + hash del código de los módulos de la etapa.
+    """
+    h = hashlib.sha256(f"v{VERSION_PIPELINE}".encode())
+    for modulo in MODULOS_ETAPA.get(etapa, []):
+        h.update(modulo.encode())
+        with open(os.path.join(_CARPETA_CODIGO, modulo), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def huella_tabla(df: pd.DataFrame) -> str:
+    """
+    Hash del contenido de un DataFrame chico (p. ej. inec_ref).
+    """
+    h = hashlib.sha256(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def tamano_bytes(ruta: str) -> int:
+    if os.path.isdir(ruta):
+        return sum(os.path.getsize(os.path.join(raiz, nombre))
+                   for raiz, _, nombres in os.walk(ruta) for nombre in nombres)
+    return os.path.getsize(ruta)
+
+
+def copiar_artefacto(origen: str, destino: str) -> None:
+    """
+    Copia un archivo o carpeta a destino pasando por un temporal, así
+    destino nunca queda a medias.
+    """
+    temporal = f"{destino.rstrip('/')}.tmp{os.getpid()}"
+    if os.path.isdir(origen):
+        shutil.copytree(origen, temporal)
+        if os.path.isdir(destino):
+            shutil.rmtree(destino)
+    else:
+        shutil.copy2(origen, temporal)
+    os.replace(temporal, destino)
+
+
+# ============================================================
+# 2. CACHE
+# ============================================================
+
+class CacheEtapas:
+    """
+    Cache de artefactos por clave (ver docstring del módulo). Uso:
+
+        clave = cache.clave("unir", archivos, formato=formato)
+        if not cache.restaurar(clave, salida):
+            ... ejecutar la etapa y escribir salida ...
+            cache.guardar(clave, "unir", salida)
+    """
+
+    def __init__(self, carpeta: str = CARPETA_CACHE_ETAPAS, limite_mb: float = LIMITE_CACHE_MB):
+        self.carpeta = carpeta
+        self.limite_mb = limite_mb
+
+    # --------------------------------------------------------
+    # Claves
+    # --------------------------------------------------------
+
+    def huella_archivo(self, ruta: str) -> str:
+        """
+        sha256 del archivo; se recalcula solo si cambió su tamaño o mtime.
+        """
+        ruta_huellas = os.path.join(self.carpeta, ARCHIVO_HUELLAS)
+        huellas = {}
+        if os.path.exists(ruta_huellas):
+            with open(ruta_huellas, "r", encoding="utf-8") as f:
+                huellas = json.load(f)
+
+        estado = os.stat(ruta)
+        clave = os.path.abspath(ruta)
+        previa = huellas.get(clave)
+        if previa and previa["tamano"] == estado.st_size and previa["mtime"] == estado.st_mtime:
+            return previa["sha256"]
+
+        huellas[clave] = {"tamano": estado.st_size, "mtime": estado.st_mtime,
+                          "sha256": hash_archivo(ruta)}
+        os.makedirs(self.carpeta, exist_ok=True)
+        temporal = f"{ruta_huellas}.tmp{os.getpid()}"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(huellas, f, indent=2)
+        os.replace(temporal, ruta_huellas)
+        return huellas[clave]["sha256"]
+
+    def clave(self, etapa: str, entradas: list, **parametros) -> str:
+        """
+        Clave de la etapa para estos archivos de entrada (el orden no
+        importa) y parámetros (valores str o hash, p. ej. huella_tabla).
+        """
+        contenido = {
+            "etapa": etapa,
+            "codigo": version_codigo(etapa),
+            "entradas": sorted(self.huella_archivo(ruta) for ruta in entradas),
+            "parametros": parametros,
+        }
+        return hashlib.sha256(json.dumps(contenido, sort_keys=True).encode()).hexdigest()
+
+    # --------------------------------------------------------
+    # Entradas
+    # --------------------------------------------------------
+
+    def _entrada(self, clave: str) -> str:
+        return os.path.join(self.carpeta, clave[:32])
+
+    def restaurar(self, clave: str, destino: str) -> bool:
+        """
+        Copia el artefacto de la clave a destino. False si no está en la cache.
+        """
+        entrada = self._entrada(clave)
+        meta = os.path.join(entrada, ARCHIVO_ENTRADA)
+        if not os.path.exists(meta):
+            return False
+        with open(meta, "r", encoding="utf-8") as f:
+            nombre = json.load(f)["nombre"]
+        copiar_artefacto(os.path.join(entrada, nombre), destino)
+        os.utime(meta)
+        return True
+
+    def guardar(self, clave: str, etapa: str, origen: str) -> None:
+        """
+        Guarda una copia del artefacto origen bajo la clave y poda la cache.
+        """
+        entrada = self._entrada(clave)
+        if os.path.exists(entrada):
+            return
+        temporal = f"{entrada}.tmp{os.getpid()}"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        nombre = os.path.basename(origen.rstrip('/'))
+        copiar_artefacto(origen, os.path.join(temporal, nombre))
+        with open(os.path.join(temporal, ARCHIVO_ENTRADA), "w", encoding="utf-8") as f:
+            json.dump({"etapa": etapa, "nombre": nombre, "bytes": tamano_bytes(origen),
+                       "creado": time.strftime("%Y-%m-%d %H:%M:%S")}, f, indent=2)
+        try:
+            os.rename(temporal, entrada)
+        except OSError:
+            # Otro proceso guardó la misma clave primero
+            shutil.rmtree(temporal, ignore_errors=True)
+        self.podar()
+
+    def entradas(self) -> list:
+        """
+        [(último uso, bytes, carpeta), ...] de las entradas completas.
+        """
+        resultado = []
+        if not os.path.isdir(self.carpeta):
+            return resultado
+        for nombre in os.listdir(self.carpeta):
+            meta = os.path.join(self.carpeta, nombre, ARCHIVO_ENTRADA)
+            try:
+                with open(meta, "r", encoding="utf-8") as f:
+                    tamano = json.load(f)["bytes"]
+                resultado.append((os.path.getmtime(meta), tamano, os.path.join(self.carpeta, nombre)))
+            except (OSError, ValueError, KeyError):
+                continue
+        return resultado
+
+    def podar(self) -> int:
+        """
+        Borra las entradas usadas hace más tiempo hasta quedar bajo
+        limite_mb. Devuelve cuántas se borraron.
+        """
+        entradas = sorted(self.entradas())
+        total = sum(tamano for _, tamano, _ in entradas)
+        limite = self.limite_mb * 1024 * 1024
+        borradas = 0
+        for _, tamano, carpeta in entradas:
+            if total <= limite:
+                break
+            shutil.rmtree(carpeta, ignore_errors=True)
+            total -= tamano
+            borradas += 1
+        return borradas
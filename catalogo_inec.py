@@ -0,0 +1,164 @@
+"""
+Catálogo INEC (CODIFICACIÓN_2021.xlsx) compilado y cacheado.
+
+Leer el xlsx con openpyxl domina el arranque de los scripts, así que el
+catálogo se compila una sola vez a un archivo binario (pickle) con:
+- dataI: la hoja tal como la usan los scripts
+- inec_ref: códigos DPA con ceros a la izquierda + nombres normalizados
+- codigos_parroquia: índice de códigos parroquiales válidos (enteros)
+- jerarquia: provincia -> cantón -> parroquia
+El archivo se identifica por el hash del xlsx: si el xlsx cambia, se
+recompila solo.
+"""
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from normalizacion import normalizar_nombres
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+ARCHIVO_CODIFICACION = "CODIFICACIÓN_2021.xlsx"
+CARPETA_CACHE = ".cache_inec"
+
+# Subir este número si cambia la forma de compilar el catálogo
+VERSION_CATALOGO = 1
+
+COLUMNAS_INEC = ['DPA_PROVIN', 'DPA_DESPRO',
+                 'DPA_CANTON', 'DPA_DESCAN',
+                 'DPA_PARROQ', 'DPA_DESPAR']
+
+# Ancho de cada código DPA
+ANCHO_CODIGOS = {'DPA_PROVIN': 2, 'DPA_CANTON': 4, 'DPA_PARROQ': 6}
+
+
+# ============================================================
+# 2. COMPILACIÓN
+# ============================================================
+
+def codigo_dpa(serie: pd.Series, ancho: int) -> pd.Series:
+    """
+    Código DPA como string con ceros a la izquierda (11451 -> '011451').
+    """
+    return (
+        serie
+        .astype(str)
+        .str.replace(r'\.0$', '', regex=True)
+        .str.strip()
+        .str.zfill(ancho)
+    )
+
+
+def leer_codificacion_xlsx(ruta_xlsx: str = ARCHIVO_CODIFICACION) -> pd.DataFrame:
+    """
+    Lee la hoja de codificación INEC (lento: usa openpyxl).
+    """
+    dataI = pd.read_excel(ruta_xlsx, header=0, skiprows=1)
+    dataI = dataI.dropna(axis=1, how="any")
+    return dataI
+
+
+def preparar_inec_ref(dataI: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame de referencia con:
+    - DPA_PROVIN / DPA_CANTON / DPA_PARROQ con ceros a la izquierda
+    - Nombres oficiales de provincia, cantón, parroquia
+    - Versiones normalizadas para el match (prov_norm, canton_norm, parr_norm)
+    """
+    inec_ref = dataI[COLUMNAS_INEC].copy()
+    for col, ancho in ANCHO_CODIGOS.items():
+        inec_ref[col] = codigo_dpa(inec_ref[col], ancho)
+
+    # Normalizar nombres
+    inec_ref['prov_norm']   = normalizar_nombres(inec_ref['DPA_DESPRO'])
+    inec_ref['canton_norm'] = normalizar_nombres(inec_ref['DPA_DESCAN'])
+    inec_ref['parr_norm']   = normalizar_nombres(inec_ref['DPA_DESPAR'])
+
+    return inec_ref
+
+
+def construir_jerarquia(inec_ref: pd.DataFrame) -> dict:
+    """
+    {cod_provincia: {'nombre', 'cantones': {cod_canton: {'nombre',
+    'parroquias': {cod_parroquia: nombre}}}}} con nombres normalizados.
+    """
+    jerarquia = {}
+    for fila in inec_ref.itertuples(index=False):
+        provincia = jerarquia.setdefault(
+            fila.DPA_PROVIN, {'nombre': fila.prov_norm, 'cantones': {}}
+        )
+        canton = provincia['cantones'].setdefault(
+            fila.DPA_CANTON, {'nombre': fila.canton_norm, 'parroquias': {}}
+        )
+        canton['parroquias'][fila.DPA_PARROQ] = fila.parr_norm
+    return jerarquia
+
+
+def indice_parroquias(inec_ref: pd.DataFrame) -> pd.Index:
+    """
+    Índice hash de los códigos parroquiales válidos como enteros, sin
+    duplicados (así una búsqueda nunca devuelve más de una fila).
+    """
+    codigos = pd.to_numeric(codigo_dpa(inec_ref['DPA_PARROQ'], 6), errors='coerce').dropna()
+    return pd.Index(np.unique(codigos.to_numpy(dtype=np.int64)))
+
+
+class CatalogoINEC:
+    """
+    Catálogo INEC compilado (ver docstring del módulo).
+    """
+
+    def __init__(self, dataI: pd.DataFrame, huella: str):
+        self.dataI = dataI
+        self.huella = huella
+        self.inec_ref = preparar_inec_ref(dataI)
+        self.codigos_parroquia = indice_parroquias(self.inec_ref)
+        self.jerarquia = construir_jerarquia(self.inec_ref)
+
+
+# ============================================================
+# 3. CACHE EN DISCO
+# ============================================================
+
+def hash_archivo(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def ruta_cache(huella: str) -> str:
+    return os.path.join(CARPETA_CACHE, f"catalogo_inec_v{VERSION_CATALOGO}_{huella[:16]}.pkl")
+
+
+def cargar_catalogo_inec(ruta_xlsx: str = ARCHIVO_CODIFICACION,
+                         usar_cache: bool = True) -> CatalogoINEC:
+    """
+    Devuelve el catálogo INEC compilado. Si ya existe en CARPETA_CACHE para
+    este xlsx (mismo hash) se carga del pickle; si no, se lee el xlsx, se
+    compila y se guarda para las próximas ejecuciones.
+    """
+    huella = hash_archivo(ruta_xlsx)
+    cache = ruta_cache(huella)
+
+    if usar_cache and os.path.exists(cache):
+        with open(cache, "rb") as f:
+            return pickle.load(f)
+
+    catalogo = CatalogoINEC(leer_codificacion_xlsx(ruta_xlsx), huella)
+
+    if usar_cache:
+        os.makedirs(CARPETA_CACHE, exist_ok=True)
+        temporal = f"{cache}.tmp{os.getpid()}"
+        with open(temporal, "wb") as f:
+            pickle.dump(catalogo, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, cache)
+
+    return catalogo
@@ -0,0 +1,238 @@
+"""
+Segunda etapa de georreferenciación: match por nombre contra el INEC.
+
+Para las filas cuyo Cod_Parroquia no existe en el catálogo se busca la
+tripleta normalizada (prov_norm, canton_norm, parr_norm):
+1) índice hash exacto de tripletas INEC
+2) índice difuso por bloques: solo se comparan las parroquias del mismo
+   cantón (o de la misma provincia si el cantón tampoco aparece), con
+   similitud de trigramas y de palabras; un match difuso se acepta solo si
+   supera al segundo candidato por MARGEN_MINIMO (los nombres ambiguos
+   quedan sin código)
+Se trabaja sobre tripletas únicas, así el costo no depende de las filas,
+y el índice se arma una vez por catálogo.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+# Confianza mínima para aceptar un match difuso
+UMBRAL_CONFIANZA = 0.75
+
+# Peso de la coincidencia por palabras frente a la de trigramas
+PESO_PALABRAS = 0.9
+
+# Palabras mínimas de la consulta para puntuar por contención (una sola
+# palabra genérica como 'san' estaría contenida en decenas de nombres)
+MIN_PALABRAS_CONTENCION = 2
+
+# Ventaja mínima del mejor candidato sobre el segundo
+MARGEN_MINIMO = 0.05
+
+PALABRAS_VACIAS = {'de', 'del', 'la', 'las', 'el', 'los', 'y'}
+
+COLUMNAS_TRIPLETA = ['prov_norm', 'canton_norm', 'parr_norm']
+
+
+# ============================================================
+# 2. SIMILITUD ENTRE NOMBRES
+# ============================================================
+
+def trigramas(texto: str) -> frozenset:
+    texto = f"  {texto} "
+    return frozenset(texto[i:i + 3] for i in range(len(texto) - 2))
+
+
+def palabras(texto: str) -> frozenset:
+    return frozenset(re.findall(r'[a-z0-9]+', texto)) - PALABRAS_VACIAS
+
+
+class Nombre:
+    """
+    Nombre normalizado con sus trigramas y palabras precalculados.
+    """
+    __slots__ = ('texto', 'trigramas', 'palabras')
+
+    def __init__(self, texto: str):
+        self.texto = texto
+        self.trigramas = trigramas(texto)
+        self.palabras = palabras(texto)
+
+
+def similitud(a: Nombre, b: Nombre) -> float:
+    """
+    Similitud en [0, 1]: el máximo entre
+    - coeficiente de Dice sobre trigramas (errores de tipeo, acentos)
+    - fracción de palabras de la consulta `a` presentes en `b`, con peso
+      PESO_PALABRAS (nombres recortados como 'quito distrito metropolitano, *');
+      solo si la consulta tiene MIN_PALABRAS_CONTENCION palabras o más
+    """
+    if a.texto == b.texto:
+        return 1.0
+    comunes = len(a.trigramas & b.trigramas)
+    dice = 2 * comunes / (len(a.trigramas) + len(b.trigramas))
+    contencion = 0.0
+    if len(a.palabras) >= MIN_PALABRAS_CONTENCION:
+        contencion = PESO_PALABRAS * len(a.palabras & b.palabras) / len(a.palabras)
+    return max(dice, contencion)
+
+
+def mejor_candidato(consulta: Nombre, candidatos: list, margen: float = MARGEN_MINIMO):
+    """
+    Devuelve (clave, confianza) del candidato (clave, Nombre) más parecido.
+    Si otra clave queda a menos de margen (p. ej. la misma parroquia en dos
+    cantones) el resultado es ambiguo y la clave es None, en lugar de
+    depender del orden del catálogo.
+    """
+    mejor, confianza, segunda = None, 0.0, 0.0
+    for clave, nombre in candidatos:
+        valor = similitud(consulta, nombre)
+        if valor > confianza:
+            if clave != mejor:
+                segunda = confianza
+            mejor, confianza = clave, valor
+        elif clave != mejor and valor > segunda:
+            segunda = valor
+    if mejor is not None and confianza - segunda < margen:
+        return None, confianza
+    return mejor, confianza
+
+
+# ============================================================
+# 3. ÍNDICE INEC (EXACTO + DIFUSO POR BLOQUES)
+# ============================================================
+
+class IndiceNombresINEC:
+    """
+    Índices sobre inec_ref (ver catalogo_inec.preparar_inec_ref):
+    - exacto: (prov_norm, canton_norm, parr_norm) -> DPA_PARROQ
+    - provincias: lista de nombres de provincia
+    - cantones por provincia y parroquias por (provincia, cantón)
+    """
+
+    def __init__(self, inec_ref: pd.DataFrame, umbral: float = UMBRAL_CONFIANZA):
+        self.umbral = umbral
+        self.exacto = {}
+        self.cantones = {}
+        self.parroquias = {}
+        self.parroquias_provincia = {}
+        for fila in inec_ref.itertuples(index=False):
+            codigo = fila.DPA_PARROQ
+            self.exacto.setdefault((fila.prov_norm, fila.canton_norm, fila.parr_norm), codigo)
+            self.cantones.setdefault(fila.prov_norm, {})[fila.canton_norm] = Nombre(fila.canton_norm)
+            nombre = Nombre(fila.parr_norm)
+            self.parroquias.setdefault((fila.prov_norm, fila.canton_norm), []).append((codigo, nombre))
+            self.parroquias_provincia.setdefault(fila.prov_norm, []).append((codigo, nombre))
+        self.provincias = [(p, Nombre(p)) for p in self.cantones]
+
+    def resolver(self, prov: str, canton: str, parr: str):
+        """
+        Devuelve (DPA_PARROQ, confianza, metodo) para una tripleta;
+        metodo es 'exacto', 'difuso' o None si no supera el umbral.
+        """
+        if not isinstance(parr, str):
+            return None, np.nan, None
+
+        codigo = self.exacto.get((prov, canton, parr))
+        if codigo is not None:
+            return codigo, 1.0, 'exacto'
+
+        # Bloque de provincia (exacta o la más parecida)
+        confianza_prov = 1.0
+        if prov not in self.cantones:
+            if not isinstance(prov, str):
+                return None, np.nan, None
+            prov, confianza_prov = mejor_candidato(Nombre(prov), self.provincias)
+            if prov is None or confianza_prov < self.umbral:
+                return None, confianza_prov, None
+
+        # Bloque de cantón (exacto, el más parecido o toda la provincia)
+        candidatos = self.parroquias.get((prov, canton))
+        if candidatos is None and isinstance(canton, str):
+            mejor, confianza_canton = mejor_candidato(Nombre(canton), self.cantones[prov].items())
+            if mejor is not None and confianza_canton >= self.umbral:
+                candidatos = self.parroquias[(prov, mejor)]
+        if candidatos is None:
+            candidatos = self.parroquias_provincia[prov]
+
+        codigo, confianza = mejor_candidato(Nombre(parr), candidatos)
+        confianza = min(confianza, confianza_prov)
+        if codigo is None or confianza < self.umbral:
+            return None, confianza, None
+        return codigo, confianza, 'difuso'
+
+
+# Último índice armado: (inec_ref, umbral, IndiceNombresINEC). Guarda la
+# referencia al catálogo, así un id reutilizado no puede devolver otro índice
+_INDICE_NOMBRES = None
+
+
+def indice_nombres(inec_ref: pd.DataFrame, umbral: float = UMBRAL_CONFIANZA) -> IndiceNombresINEC:
+    """
+    IndiceNombresINEC de inec_ref, armado una sola vez por catálogo (y no
+    por archivo o por bloque).
+    """
+    global _INDICE_NOMBRES
+    if _INDICE_NOMBRES is None or _INDICE_NOMBRES[0] is not inec_ref or _INDICE_NOMBRES[1] != umbral:
+        _INDICE_NOMBRES = (inec_ref, umbral, IndiceNombresINEC(inec_ref, umbral))
+    return _INDICE_NOMBRES[2]
+
+
+# ============================================================
+# 4. COMPLETAR DPA_PARROQ POR NOMBRE
+# ============================================================
+
+def completar_por_nombre(df_geo: pd.DataFrame, inec_ref: pd.DataFrame,
+                         umbral: float = UMBRAL_CONFIANZA) -> pd.DataFrame:
+    """
+    Completa DPA_PARROQ en las filas sin código usando la tripleta de nombres
+    (opcional en el pipeline: los códigos difusos son una estimación)
+    y agrega las columnas:
+    - metodo_match: 'codigo', 'exacto', 'difuso' o None
+    - confianza_match: 1.0 para código/exacto, similitud para difuso
+    Imprime cuánto sube el porcentaje de filas con código.
+    """
+    sin_codigo = df_geo['DPA_PARROQ'].isna().to_numpy()
+    total = len(df_geo)
+    antes = total - int(sin_codigo.sum())
+
+    metodo = np.where(sin_codigo, None, 'codigo').astype(object)
+    confianza = np.where(sin_codigo, np.nan, 1.0)
+
+    if sin_codigo.any():
+        # Tripletas únicas entre las filas sin código
+        filas = pd.MultiIndex.from_frame(df_geo.loc[sin_codigo, COLUMNAS_TRIPLETA])
+        tripletas = filas.unique()
+        indice = indice_nombres(inec_ref, umbral)
+        resultados = [indice.resolver(*t) for t in tripletas]
+
+        posiciones = tripletas.get_indexer(filas)
+        codigos = np.array([r[0] if r[0] is not None else np.nan for r in resultados], dtype=object)
+        confianzas = np.array([r[1] for r in resultados], dtype=float)
+        metodos = np.array([r[2] for r in resultados], dtype=object)
+
+        dpa = df_geo['DPA_PARROQ'].to_numpy(dtype=object, copy=True)
+        dpa[sin_codigo] = codigos[posiciones]
+        df_geo['DPA_PARROQ'] = dpa
+        metodo[sin_codigo] = metodos[posiciones]
+        confianza[sin_codigo] = np.where(pd.isna(metodos[posiciones]), np.nan, confianzas[posiciones])
+
+    df_geo['metodo_match'] = metodo
+    df_geo['confianza_match'] = confianza
+
+    despues = int(df_geo['DPA_PARROQ'].notna().sum())
+    if total:
+        print(f"[match por nombre] Con código antes: {antes} ({antes/total*100:.2f}%) | "
+              f"después: {despues} ({despues/total*100:.2f}%) | "
+              f"mejora: +{despues - antes} filas ({(despues - antes)/total*100:.2f} pp)")
+        conteo = pd.Series(metodo).value_counts()
+        for nombre in ['exacto', 'difuso']:
+            print(f"   - {nombre}: {int(conteo.get(nombre, 0))} filas")
+
+    return df_geo
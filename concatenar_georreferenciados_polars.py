@@ -1,159 +1,334 @@
 import polars as pl
+import argparse
 import glob
 import os
+import re
+import shutil
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 
-def concatenar_archivos_georreferenciados():
+from almacenamiento import (
+    COLUMNAS_DICCIONARIO,
+    COLUMNAS_PARTICION,
+    es_parquet,
+    ruta_con_formato,
+    tamano_mb,
+)
+from esquema import esquema_polars
+from instrumentacion import etapa
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+# Carpeta con una subcarpeta por año (2022/, 2023/, ...). Por defecto la
+# carpeta padre, como en ../2022; se cambia con la variable de entorno o
+# con --raiz. Un año nuevo se incluye solo con crear su carpeta.
+VARIABLE_RAIZ_DATOS = "ECU911_RAIZ_DATOS"
+RAIZ_DATOS = os.environ.get(VARIABLE_RAIZ_DATOS) or ".."
+PATRON_CARPETA_ANIO = re.compile(r"^\d{4}$")
+
+TIPOS = ['emergencias', 'eventos']
+PATRON_ARCHIVO = "{tipo}_*_completo_georreferenciado.{extension}"
+
+ARCHIVO_SALIDA = "todos_georreferenciados_2021_2025.csv"
+
+# Hilos para leer los encabezados / esquemas Parquet
+HILOS_ESQUEMA = 8
+
+
+# ============================================================
+# 2. DESCUBRIMIENTO
+# ============================================================
+
+def carpetas_de_datos(raiz: str = RAIZ_DATOS, anios: list = None) -> list:
+    """
+    La carpeta actual y las subcarpetas de año de raiz (con anios, solo
+    esas), sin repetir la misma carpeta por dos caminos (. y ../2021).
+    """
+    candidatas = ["."]
+    if os.path.isdir(raiz):
+        candidatas += [os.path.join(raiz, nombre) for nombre in sorted(os.listdir(raiz))
+                       if PATRON_CARPETA_ANIO.match(nombre)
+                       and os.path.isdir(os.path.join(raiz, nombre))]
+
+    carpetas = {}
+    for carpeta in candidatas:
+        nombre = os.path.basename(os.path.realpath(carpeta))
+        if anios and PATRON_CARPETA_ANIO.match(nombre) and int(nombre) not in anios:
+            continue
+        carpetas.setdefault(os.path.realpath(carpeta), carpeta)
+    return list(carpetas.values())
+
+
+def buscar_archivos_georreferenciados(carpetas: list, tipos: list = TIPOS) -> list:
+    """
+    Archivos *_completo_georreferenciado (CSV o Parquet) de cada tipo en
+    las carpetas, ordenados.
+    """
+    archivos = []
+    for carpeta in carpetas:
+        for tipo in tipos:
+            for extension in ('csv', 'parquet'):
+                patron = PATRON_ARCHIVO.format(tipo=tipo, extension=extension)
+                archivos.extend(glob.glob(os.path.join(carpeta, patron)))
+    return sorted(os.path.normpath(archivo) for archivo in archivos)
+
+
+# ============================================================
+# 3. LECTURA PEREZOSA
+# ============================================================
+
+def columnas_csv(archivo: str) -> list:
+    """
+    Columnas del encabezado (read_csv con n_rows=0 igual recorre el archivo).
+    """
+    return pl.scan_csv(archivo, encoding='utf8', infer_schema=False).collect_schema().names()
+
+
+def escanear_georreferenciado(archivo: str, esquema: dict = None) -> pl.LazyFrame:
+    """
+    Escaneo perezoso de un archivo georreferenciado en CSV (con el esquema
+    declarado en esquema.py) o Parquet (archivo único o carpeta particionada
+    anio=/mes=, sin las columnas de partición).
+    """
+    if es_parquet(archivo):
+        origen = f"{archivo}/**/*.parquet" if os.path.isdir(archivo) else archivo
+        lf = pl.scan_parquet(origen, hive_partitioning=True)
+        columnas = lf.collect_schema().names()
+        return lf.drop([c for c in COLUMNAS_PARTICION if c in columnas])
+
+    # Esquema explícito: categóricas, códigos Int64 (valores tipo "000nan"
+    # quedan nulos) y el resto como string, sin inferir tipos
+    if esquema is None:
+        esquema = esquema_polars(columnas_csv(archivo))
+    return pl.scan_csv(archivo, encoding='utf8', schema_overrides=esquema, ignore_errors=True)
+
+
+def leer_georreferenciado(archivo: str) -> pl.DataFrame:
+    """
+    Lee un archivo georreferenciado completo (ver escanear_georreferenciado).
+    """
+    return escanear_georreferenciado(archivo).collect()
+
+
+def esquema_archivo(archivo: str) -> dict:
+    """
+    Columnas y tipos de un archivo sin leer sus filas (encabezado del CSV o
+    metadatos Parquet).
+    """
+    if es_parquet(archivo):
+        return dict(escanear_georreferenciado(archivo).collect_schema())
+    return esquema_polars(columnas_csv(archivo))
+
+
+def sondear_esquemas(archivos: list) -> dict:
+    """
+    {archivo: esquema} leyendo los encabezados en paralelo; los archivos que
+    no se pueden leer se informan y quedan fuera.
+    """
+    def sondear(archivo):
+        try:
+            return archivo, esquema_archivo(archivo), None
+        except Exception as e:
+            return archivo, None, e
+
+    esquemas = {}
+    with ThreadPoolExecutor(max_workers=HILOS_ESQUEMA) as hilos:
+        for archivo, esquema, error in hilos.map(sondear, archivos):
+            if error is not None:
+                print(f"  ❌ Error al leer {archivo}: {error}")
+                continue
+            esquemas[archivo] = esquema
+    return esquemas
+
+
+def columnas_comunes(esquemas: dict) -> list:
+    """
+    Columnas presentes en todos los archivos, en el orden del primero.
+    """
+    listas = [list(esquema) for esquema in esquemas.values()]
+    comunes = set(listas[0]).intersection(*listas[1:])
+    return [col for col in listas[0] if col in comunes]
+
+
+def plan_concatenado(esquemas: dict, columnas: list) -> pl.LazyFrame:
+    """
+    Un escaneo por archivo con la proyección de columnas comunes empujada
+    al lector, más archivo_origen, concatenados para leerse en paralelo.
+    """
+    escaneos = [
+        escanear_georreferenciado(archivo, esquema)
+        .select(columnas)
+        .with_columns(pl.lit(os.path.basename(archivo)).cast(pl.Categorical).alias("archivo_origen"))
+        for archivo, esquema in esquemas.items()
+    ]
+    return pl.concat(escaneos, how='vertical_relaxed', parallel=True)
+
+
+# ============================================================
+# 4. ESCRITURA EN STREAMING
+# ============================================================
+
+def con_particiones(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Fecha como timestamp, columnas geográficas/servicio como categóricas y
+    las columnas de partición anio/mes.
+    """
+    esquema = lf.collect_schema()
+    if esquema.get('Fecha') == pl.String:
+        lf = lf.with_columns(pl.col('Fecha').str.to_datetime(strict=False))
+    return lf.with_columns(
+        [pl.col(c).cast(pl.Categorical) for c in COLUMNAS_DICCIONARIO if c in esquema]
+        + [
+            pl.col('Fecha').dt.year().cast(pl.Int32).alias('anio'),
+            pl.col('Fecha').dt.month().cast(pl.Int32).alias('mes'),
+        ]
+    )
+
+
+def sumidero(lf: pl.LazyFrame, ruta: str, formato: str) -> pl.LazyFrame:
+    """
+    sink_csv, o sink_parquet particionado por año/mes, sin ejecutar
+    (lazy=True) para correrlo junto a las estadísticas.
+    """
+    if formato == "parquet":
+        destino = pl.PartitionBy(ruta, key=COLUMNAS_PARTICION, include_key=False)
+        return con_particiones(lf).sink_parquet(destino, mkdir=True, lazy=True)
+    return lf.sink_csv(ruta, lazy=True)
+
+
+def reemplazar(temporal: str, destino: str) -> None:
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.replace(temporal, destino)
+
+
+def concatenar_archivos_georreferenciados(formato: str = "csv", raiz: str = RAIZ_DATOS,
+                                          anios: list = None, tipos: list = TIPOS):
     """
     Concatena todos los archivos georreferenciados de eventos y emergencias
-    de los años 2021-2025 usando Polars, manejando errores de parsing y 
-    diferencias en columnas.
+    de la carpeta actual y de las carpetas de año de raiz usando Polars,
+    manejando errores de parsing y diferencias en columnas.
+    Los esquemas se leen de los encabezados antes de leer filas; los
+    archivos se escanean en paralelo (solo las columnas comunes) y el
+    resultado se escribe en streaming con sink_csv/sink_parquet, sin
+    tenerlo completo en memoria.
+    Lee CSV o Parquet; con formato="parquet" guarda un Parquet particionado
+    por año/mes en lugar del CSV final.
+    Devuelve un LazyFrame sobre el archivo guardado.
     """
     print("="*80)
     print("CONCATENANDO ARCHIVOS GEORREFERENCIADOS CON POLARS")
     print("="*80)
-    
-    # Buscar archivos en todos los años
-    patrones = [
-        "emergencias_*_completo_georreferenciado.csv",
-        "eventos_*_completo_georreferenciado.csv",
-        "../2022/emergencias_*_completo_georreferenciado.csv",
-        "../2022/eventos_*_completo_georreferenciado.csv",
-        "../2023/emergencias_*_completo_georreferenciado.csv",
-        "../2023/eventos_*_completo_georreferenciado.csv",
-        "../2024/emergencias_*_completo_georreferenciado.csv",
-        "../2024/eventos_*_completo_georreferenciado.csv",
-        "../2025/emergencias_*_completo_georreferenciado.csv",
-        "../2025/eventos_*_completo_georreferenciado.csv",
-    ]
-    
-    archivos = []
-    for patron in patrones:
-        archivos.extend(glob.glob(patron))
-    
+
+    # Buscar archivos en la carpeta actual y en las de cada año
+    carpetas = carpetas_de_datos(raiz, anios)
+    archivos = buscar_archivos_georreferenciados(carpetas, tipos)
+
     if not archivos:
         print("\n❌ No se encontraron archivos georreferenciados")
         return None
-    
-    print(f"\n✅ Se encontraron {len(archivos)} archivos:")
-    for archivo in sorted(archivos):
-        tamano_mb = os.path.getsize(archivo) / (1024 * 1024)
-        print(f"  • {archivo} ({tamano_mb:.2f} MB)")
-    
-    # Leer archivos con Polars
-    dataframes = []
-    columnas_comunes = None
-    
-    for i, archivo in enumerate(sorted(archivos), 1):
-        print(f"\n[{i}/{len(archivos)}] Procesando {os.path.basename(archivo)}...")
-        
-        try:
-            # Leer con columnas como strings para evitar errores de parsing
-            df_temp = pl.read_csv(
-                archivo,
-                encoding='utf-8',
-                infer_schema_length=0,  # Leer todo como string primero
-                ignore_errors=True
-            )
-            
-            print(f"  ✓ Leído: {df_temp.shape[0]:,} filas, {df_temp.shape[1]} columnas")
-            
-            # Identificar columnas comunes
-            if columnas_comunes is None:
-                columnas_comunes = set(df_temp.columns)
-            else:
-                columnas_comunes = columnas_comunes.intersection(set(df_temp.columns))
-            
-            # Convertir columnas numéricas con manejo de errores
-            for col in df_temp.columns:
-                if col in ['Cod_Provincia', 'Cod_Canton', 'Cod_Parroquia']:
-                    # Limpiar valores tipo "000nan" y convertir
-                    df_temp = df_temp.with_columns(
-                        pl.when(pl.col(col).str.contains("nan"))
-                        .then(None)
-                        .otherwise(pl.col(col))
-                        .cast(pl.Int64, strict=False)
-                        .alias(col)
-                    )
-            
-            # Agregar columna de origen
-            df_temp = df_temp.with_columns(
-                pl.lit(os.path.basename(archivo)).alias("archivo_origen")
-            )
-            
-            dataframes.append(df_temp)
-            print(f"  ✓ Procesado correctamente")
-            
-        except Exception as e:
-            print(f"  ❌ Error al leer {archivo}: {e}")
-            continue
-    
-    if not dataframes:
+
+    print(f"\n✅ Se encontraron {len(archivos)} archivos en {len(carpetas)} carpetas:")
+    for archivo in archivos:
+        print(f"  • {archivo} ({tamano_mb(archivo):.2f} MB)")
+
+    # Las categóricas de distintos archivos deben compartir diccionario para
+    # concatenarse (en Polars recientes esto ya es global y la llamada avisa)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        pl.enable_string_cache()
+
+    # Esquemas de todos los archivos a partir de los encabezados
+    with etapa("esquemas", filas_entrada=len(archivos)) as paso:
+        esquemas = sondear_esquemas(archivos)
+        paso.contar(salida=len(esquemas))
+
+    if not esquemas:
         print("\n❌ No se pudieron leer archivos")
         return None
-    
+
+    for archivo, esquema in esquemas.items():
+        print(f"  ✓ {os.path.basename(archivo)}: {len(esquema)} columnas")
+
+    # Asegurar que todos tengan las mismas columnas base
+    columnas = columnas_comunes(esquemas)
+    print(f"\n📋 Columnas comunes encontradas: {len(columnas)}")
+
     print(f"\n{'='*80}")
-    print(f"CONCATENANDO {len(dataframes)} DATAFRAMES")
+    print(f"CONCATENANDO {len(esquemas)} ARCHIVOS")
     print(f"{'='*80}")
-    
-    # Asegurar que todos tengan las mismas columnas base
-    print(f"\n📋 Columnas comunes encontradas: {len(columnas_comunes)}")
-    
-    # Seleccionar solo columnas comunes + archivo_origen de cada dataframe
-    dataframes_normalizados = []
-    for df in dataframes:
-        cols_seleccionar = [col for col in df.columns if col in columnas_comunes or col == "archivo_origen"]
-        df_normalizado = df.select(cols_seleccionar)
-        dataframes_normalizados.append(df_normalizado)
-    
-    # Concatenar usando vertical_relaxed para mayor flexibilidad
+
+    output_file = ruta_con_formato(ARCHIVO_SALIDA, formato)
+    temporal = f"{output_file}.tmp{os.getpid()}"
+
     try:
-        df_final = pl.concat(dataframes_normalizados, how='vertical_relaxed')
-        print(f"\n✅ DataFrame final creado con {df_final.shape[0]:,} filas y {df_final.shape[1]} columnas")
-        print(f"\n📊 Columnas: {df_final.columns}")
-        
+        lf = plan_concatenado(esquemas, columnas)
+        estadisticas = [lf.group_by("archivo_origen").agg(pl.len().alias("cantidad"))]
+        if 'DPA_PARROQ' in columnas:
+            estadisticas.append(lf.select(pl.col('DPA_PARROQ').is_not_null().sum().alias("con_codigo")))
+
+        # Una sola pasada: escritura y estadísticas comparten el escaneo
+        print(f"\n💾 Guardando archivo: {output_file}")
+        with etapa("concatenar_escribir", output_file) as paso:
+            _, dist_archivos, *con_codigo = pl.collect_all(
+                [sumidero(lf, temporal, formato)] + estadisticas, engine="streaming"
+            )
+            total = int(dist_archivos["cantidad"].sum())
+            paso.contar(entrada=total, salida=total)
+        reemplazar(temporal, output_file)
+
+        print(f"\n✅ Archivo final creado con {total:,} filas y {len(columnas) + 1} columnas")
+        print(f"\n📊 Columnas: {columnas + ['archivo_origen']}")
+
         # Estadísticas
         print(f"\n{'='*80}")
         print("ESTADÍSTICAS")
         print(f"{'='*80}")
-        
-        if 'DPA_PARROQ' in df_final.columns:
-            con_codigo = df_final.filter(pl.col('DPA_PARROQ').is_not_null()).shape[0]
-            sin_codigo = df_final.filter(pl.col('DPA_PARROQ').is_null()).shape[0]
-            print(f"  • Con código INEC: {con_codigo:,} ({con_codigo/df_final.shape[0]*100:.2f}%)")
-            print(f"  • Sin código INEC: {sin_codigo:,} ({sin_codigo/df_final.shape[0]*100:.2f}%)")
-        
+
+        if con_codigo and total:
+            con_codigo = int(con_codigo[0]["con_codigo"][0])
+            sin_codigo = total - con_codigo
+            print(f"  • Con código INEC: {con_codigo:,} ({con_codigo/total*100:.2f}%)")
+            print(f"  • Sin código INEC: {sin_codigo:,} ({sin_codigo/total*100:.2f}%)")
+
         # Distribución por archivo
         print(f"\n{'='*80}")
         print("DISTRIBUCIÓN POR ARCHIVO")
         print(f"{'='*80}")
-        
-        dist_archivos = df_final.group_by("archivo_origen").agg(
-            pl.count().alias("cantidad")
-        ).sort("archivo_origen")
-        
-        print(dist_archivos)
-        
-        # Guardar archivo final
-        output_file = "todos_georreferenciados_2021_2025.csv"
-        print(f"\n💾 Guardando archivo: {output_file}")
-        df_final.write_csv(output_file)
-        
-        tamano_final_mb = os.path.getsize(output_file) / (1024 * 1024)
+
+        print(dist_archivos.sort("archivo_origen"))
+
+        tamano_final_mb = tamano_mb(output_file)
         print(f"✅ Archivo guardado exitosamente ({tamano_final_mb:.2f} MB)")
-        
+
         print(f"\n{'='*80}")
         print("✅ PROCESO COMPLETADO")
         print(f"{'='*80}")
-        
-        return df_final
-        
+
+        return escanear_georreferenciado(output_file)
+
     except Exception as e:
+        if os.path.isdir(temporal):
+            shutil.rmtree(temporal, ignore_errors=True)
+        elif os.path.exists(temporal):
+            os.remove(temporal)
         print(f"\n❌ Error al concatenar: {e}")
         print(f"\n🔍 Información de debug:")
-        for i, df in enumerate(dataframes_normalizados):
-            print(f"  DataFrame {i+1}: {df.shape[0]} filas x {df.shape[1]} columnas")
-            print(f"    Columnas: {df.columns}")
+        for i, (archivo, esquema) in enumerate(esquemas.items(), 1):
+            print(f"  Archivo {i} ({os.path.basename(archivo)}): {len(esquema)} columnas")
+            print(f"    Columnas: {list(esquema)}")
         return None
 
 if __name__ == "__main__":
-    df_unificado = concatenar_archivos_georreferenciados()
+    parser = argparse.ArgumentParser(description="Concatena los georreferenciados de todos los años")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--raiz", default=RAIZ_DATOS,
+                        help=f"carpeta con una subcarpeta por año (por defecto ${VARIABLE_RAIZ_DATOS} o ..)")
+    parser.add_argument("--anios", type=int, nargs="+", default=None,
+                        help="solo estas carpetas de año (por defecto todas)")
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS, default=TIPOS)
+    args = parser.parse_args()
+    lf_unificado = concatenar_archivos_georreferenciados(args.formato, args.raiz, args.anios, args.tipos)
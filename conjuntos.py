@@ -0,0 +1,171 @@
+"""
+Registro de los conjuntos de datos del ECU 911 que pasan por el pipeline.
+
+Cada conjunto declara cómo se leen sus CSV crudos y cómo se llaman sus
+salidas, y el resto del pipeline (procesar_todos_emergencias,
+unir_georreferenciados, generar_agregados) es el mismo para todos:
+- prefijos de los archivos crudos (<prefijo>_<mes>_<año>.csv); las salidas
+  conservan el prefijo (<prefijo>_<mes>_<año>_georreferenciado.csv) y el
+  anual se llama <nombre>_<año>_completo_georreferenciado
+- separador del CSV (None = se detecta en el encabezado)
+- renombres de columnas del feed a los nombres del pipeline y columnas
+  que tienen que estar después de renombrar
+- esquema de lectura y claves de evento para duplicados
+- archivos y carpetas propios (registro de huellas, agregados, parciales)
+
+Para sumar un conjunto nuevo basta con agregarlo a CONJUNTOS.
+"""
+import glob
+import os
+
+from duplicados import ARCHIVO_HUELLAS, CLAVES_EVENTO
+from esquema import ESQUEMA_EMERGENCIAS
+
+
+# ============================================================
+# 1. CONJUNTO DE DATOS
+# ============================================================
+
+# Columnas que usan la limpieza y el match INEC
+COLUMNAS_BASE = ['Fecha', 'provincia', 'Canton', 'Cod_Parroquia', 'Parroquia', 'Servicio', 'Subtipo']
+
+# Separadores que se prueban cuando el conjunto no declara uno
+SEPARADORES = [';', ',', '|', '\t']
+
+
+class ConjuntoDatos:
+    """
+    Definición de un conjunto de datos (ver docstring del módulo).
+    """
+
+    def __init__(self, nombre: str, prefijos: list, separador: str = ";",
+                 renombrar: dict = None, columnas: list = COLUMNAS_BASE,
+                 esquema: dict = ESQUEMA_EMERGENCIAS, claves: list = CLAVES_EVENTO,
+                 archivo_huellas: str = None, carpeta_agregados: str = None,
+                 carpeta_parciales: str = None):
+        self.nombre = nombre
+        self.prefijos = prefijos
+        self.separador = separador
+        self.renombrar = renombrar or {}
+        self.columnas = columnas
+        self.esquema = esquema
+        self.claves = claves
+        self.archivo_huellas = archivo_huellas or f"huellas_conjunto_{nombre}.pkl"
+        self.carpeta_agregados = carpeta_agregados or f"datos_agregados_{nombre}"
+        self.carpeta_parciales = carpeta_parciales or f"datos_parciales_{nombre}"
+
+    def __repr__(self) -> str:
+        return f"ConjuntoDatos({self.nombre!r})"
+
+    # --------------------------------------------------------
+    # Archivos
+    # --------------------------------------------------------
+
+    def es_propio(self, archivo: str) -> bool:
+        """
+        True si el nombre del archivo empieza con alguno de los prefijos.
+        """
+        nombre = os.path.basename(archivo.rstrip('/'))
+        return any(nombre.startswith(f"{prefijo}_") for prefijo in self.prefijos)
+
+    def archivos_crudos(self, carpeta: str = ".") -> list:
+        """
+        CSV crudos del conjunto (sin las salidas *_georreferenciado).
+        """
+        archivos = set()
+        for prefijo in self.prefijos:
+            for archivo in glob.glob(os.path.join(carpeta, f"{prefijo}_*.csv")):
+                if not archivo.endswith("_georreferenciado.csv"):
+                    archivos.add(os.path.normpath(archivo))
+        return sorted(archivos)
+
+    def patrones_georreferenciados(self, carpeta: str = ".") -> list:
+        """
+        Patrones glob de las salidas *_georreferenciado en CSV y Parquet.
+        """
+        return [os.path.join(carpeta, f"{prefijo}_*_georreferenciado.{extension}")
+                for prefijo in self.prefijos for extension in ("csv", "parquet")]
+
+    # --------------------------------------------------------
+    # Lectura
+    # --------------------------------------------------------
+
+    def opciones_csv(self, ruta: str) -> dict:
+        """
+        kwargs de pd.read_csv para un archivo crudo: separador y, si hay
+        renombres, el encabezado ya renombrado (names + header=0), así los
+        dtypes del esquema se aplican sobre los nombres del pipeline.
+        """
+        separador = self.separador or detectar_separador(ruta)
+        opciones = {"sep": separador, "encoding": "utf-8"}
+        if self.renombrar:
+            with open(ruta, "r", encoding="utf-8-sig") as f:
+                encabezado = f.readline().rstrip("\r\n").split(separador)
+            nombres = [self.renombrar.get(col.strip().strip('"'), col.strip().strip('"'))
+                       for col in encabezado]
+            opciones.update(header=0, names=nombres)
+        return opciones
+
+    def validar_columnas(self, columnas, ruta: str) -> None:
+        faltantes = [col for col in self.columnas if col not in columnas]
+        if faltantes:
+            raise ValueError(f"{os.path.basename(ruta)} ({self.nombre}) no tiene las columnas {faltantes}")
+
+
+def detectar_separador(ruta: str) -> str:
+    """
+    El separador de SEPARADORES que más aparece en el encabezado.
+    """
+    with open(ruta, "r", encoding="utf-8-sig") as f:
+        encabezado = f.readline()
+    return max(SEPARADORES, key=encabezado.count)
+
+
+# ============================================================
+# 2. REGISTRO
+# ============================================================
+
+CONJUNTOS = {
+    # Feed mensual de emergencias (datos abiertos del ECU 911)
+    'emergencias': ConjuntoDatos(
+        'emergencias', ['emergencias'],
+        archivo_huellas=ARCHIVO_HUELLAS,
+    ),
+    # Eventos / incidentes: mismas columnas que emergencias, pero según la
+    # entrega vienen con otro separador o con los nombres en minúsculas
+    'eventos': ConjuntoDatos(
+        'eventos', ['eventos', 'incidentes'],
+        separador=None,
+        renombrar={
+            'fecha': 'Fecha',
+            'Provincia': 'provincia',
+            'canton': 'Canton', 'Cantón': 'Canton', 'cantón': 'Canton',
+            'parroquia': 'Parroquia',
+            'cod_parroquia': 'Cod_Parroquia',
+            'servicio': 'Servicio',
+            'subtipo': 'Subtipo',
+        },
+    ),
+}
+
+# Conjuntos que se procesan si no se indican otros (eventos se pide aparte)
+CONJUNTOS_POR_DEFECTO = ['emergencias']
+
+
+def conjunto_datos(nombre: str) -> ConjuntoDatos:
+    if nombre not in CONJUNTOS:
+        raise ValueError(f"Conjunto de datos no soportado: {nombre} (use {list(CONJUNTOS)})")
+    return CONJUNTOS[nombre]
+
+
+def conjunto_de_archivo(archivo: str, conjunto: ConjuntoDatos = None) -> ConjuntoDatos:
+    """
+    conjunto si se pasa; si no, el conjunto al que pertenece el archivo por
+    su prefijo (emergencias si no coincide ninguno).
+    """
+    if conjunto is not None:
+        return conjunto
+    for candidato in CONJUNTOS.values():
+        if candidato.es_propio(archivo):
+            return candidato
+    return CONJUNTOS['emergencias']
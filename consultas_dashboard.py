@@ -0,0 +1,465 @@
+"""
+Consultas del dashboard (stream.py), una por widget, con tres backends:
+
+- "csv": lee los CSV de datos_agregados/ con pandas y filtra en memoria;
+  el explorador usa el cubo de cubo.py.
+- "paquete": igual que csv, pero todas las tablas y los metadatos salen de
+  un solo archivo binario abierto con mmap (paquete_agregados.py), sin
+  parsear CSV al arrancar.
+- "duckdb": SQL parametrizado sobre una base DuckDB local
+  (datos_agregados/ecu911.duckdb, ver construir_base) o, si no existe,
+  directamente sobre los CSV/Parquet de datos_agregados/. Cada interacción
+  es una consulta pequeña, así se pueden publicar agregados más finos
+  (diarios, por Subtipo, por parroquia y mes) sin cargarlos en pandas.
+
+El backend se elige con la variable de entorno ECU911_BACKEND; sin ella se
+usa el paquete si existe y no es más viejo que metadatos.json, y si no los CSV.
+DuckDB es opcional: solo se importa si se usa ese backend y se instala
+con requirements-duckdb.txt (sin él, ECU911_BACKEND=duckdb cae en csv).
+"""
+import argparse
+import glob
+import json
+import os
+
+import pandas as pd
+
+from cubo import ARCHIVO_CUBO, DIMENSIONES_CUBO, DIMENSIONES_ENTERAS, SIN_DATO, CuboConteos
+from paquete_agregados import ARCHIVO_PAQUETE, PaqueteAgregados
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+CARPETA_DATOS = "datos_agregados"
+ARCHIVO_DUCKDB = "ecu911.duckdb"
+VARIABLE_BACKEND = "ECU911_BACKEND"
+ARCHIVO_METADATOS = "metadatos.json"
+BACKENDS = ("csv", "duckdb", "paquete")
+# Subtipos fuera del top que generar_agregados suma en una fila (al final)
+OTROS_SUBTIPOS = "otros"
+
+# Tabla -> archivo de datos_agregados/ (CSV o Parquet)
+TABLAS_AGREGADOS = {
+    'conteos_ano_mes': "conteos_ano_mes.csv",
+    'conteos_dia_semana': "conteos_dia_semana.csv",
+    'conteos_provincia': "conteos_provincia.csv",
+    'evolucion_provincia': "evolucion_provincia.csv",
+    'conteos_canton': "conteos_canton.csv",
+    'conteos_ano_servicio': "conteos_ano_servicio.csv",
+    'ranking_parroquias': "ranking_parroquias.csv",
+    'conteos_hora_dia': "conteos_hora_dia.csv",
+    'conteos_hora_servicio': "conteos_hora_servicio.csv",
+    'conteos_subtipo_ano': "conteos_subtipo_ano.csv",
+    'conteos_subtipo_provincia': "conteos_subtipo_provincia.csv",
+    'cubo_conteos': ARCHIVO_CUBO,
+}
+
+# Agregados finos que solo se calculan al construir la base DuckDB
+# (a partir del dataset limpio completo)
+SQL_AGREGADOS_FINOS = {
+    'conteos_diarios': """
+        SELECT CAST(TRY_CAST(Fecha AS TIMESTAMP) AS DATE) AS Dia,
+               provincia, Servicio, Subtipo, COUNT(*) AS Cantidad
+        FROM {fuente}
+        WHERE TRY_CAST(Fecha AS TIMESTAMP) IS NOT NULL
+        GROUP BY ALL
+        ORDER BY ALL
+    """,
+    'parroquia_mes': """
+        SELECT strftime(TRY_CAST(Fecha AS TIMESTAMP), '%Y-%m') AS "Año_Mes",
+               provincia, Canton, Parroquia, COUNT(*) AS Cantidad
+        FROM {fuente}
+        WHERE TRY_CAST(Fecha AS TIMESTAMP) IS NOT NULL AND Parroquia IS NOT NULL
+        GROUP BY ALL
+        ORDER BY ALL
+    """,
+}
+
+
+def lector_duckdb(ruta: str) -> str:
+    """
+    Expresión FROM de DuckDB para un CSV, un Parquet o una carpeta Parquet
+    particionada.
+    """
+    ruta = ruta.replace("'", "''")
+    if os.path.isdir(ruta):
+        return f"read_parquet('{ruta}/**/*.parquet', hive_partitioning = true)"
+    if ruta.endswith(".parquet"):
+        return f"read_parquet('{ruta}')"
+    return f"read_csv_auto('{ruta}', header = true)"
+
+
+def leer_metadatos(carpeta: str = CARPETA_DATOS) -> dict:
+    with open(os.path.join(carpeta, ARCHIVO_METADATOS), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def archivo_vigente(ruta: str, carpeta: str = CARPETA_DATOS) -> bool:
+    """
+    True si ruta existe y no es más vieja que metadatos.json: las copias de
+    los agregados (paquete, base DuckDB) que no se rehicieron al regenerar
+    los agregados son de otra corrida.
+    """
+    if not os.path.exists(ruta):
+        return False
+    ruta_metadatos = os.path.join(carpeta, ARCHIVO_METADATOS)
+    if not os.path.exists(ruta_metadatos):
+        return True
+    return os.path.getmtime(ruta) >= os.path.getmtime(ruta_metadatos)
+
+
+def paquete_vigente(carpeta: str = CARPETA_DATOS) -> bool:
+    return PaqueteAgregados.existe(carpeta) and archivo_vigente(os.path.join(carpeta, ARCHIVO_PAQUETE), carpeta)
+
+
+def columna_sql(nombre: str) -> str:
+    if nombre not in DIMENSIONES_CUBO:
+        raise ValueError(f"Dimensión desconocida: {nombre}")
+    return f'"{nombre}"'
+
+
+# ============================================================
+# 2. BACKEND CSV (PANDAS)
+# ============================================================
+
+class ConsultasCSV:
+    """
+    Comportamiento original del dashboard: CSV completos en memoria.
+    """
+
+    def __init__(self, carpeta: str = CARPETA_DATOS):
+        self.carpeta = carpeta
+        self.tablas = {}
+        self.cubo = None
+
+    def tabla(self, nombre: str) -> pd.DataFrame:
+        if nombre not in self.tablas:
+            self.tablas[nombre] = pd.read_csv(f"{self.carpeta}/{TABLAS_AGREGADOS[nombre]}")
+        return self.tablas[nombre]
+
+    def disponible(self, nombre: str) -> bool:
+        return os.path.exists(f"{self.carpeta}/{TABLAS_AGREGADOS.get(nombre, nombre)}")
+
+    def metadatos(self) -> dict:
+        return leer_metadatos(self.carpeta)
+
+    def conteos_ano_mes(self) -> pd.DataFrame:
+        return self.tabla('conteos_ano_mes')
+
+    def conteos_dia_semana(self) -> pd.DataFrame:
+        return self.tabla('conteos_dia_semana')
+
+    def conteos_provincia(self) -> pd.DataFrame:
+        return self.tabla('conteos_provincia')
+
+    def evolucion_provincia(self, provincias: list) -> pd.DataFrame:
+        evolucion = self.tabla('evolucion_provincia')
+        return evolucion[evolucion['provincia'].isin(provincias)]
+
+    def conteos_ano_servicio(self) -> pd.DataFrame:
+        return self.tabla('conteos_ano_servicio')
+
+    def ranking_parroquias(self, n: int) -> pd.DataFrame:
+        return self.tabla('ranking_parroquias').head(n).copy()
+
+    def conteos_hora_dia(self) -> pd.DataFrame:
+        return self.tabla('conteos_hora_dia')
+
+    def conteos_hora_servicio(self) -> pd.DataFrame:
+        return self.tabla('conteos_hora_servicio')
+
+    def conteos_subtipo_ano(self) -> pd.DataFrame:
+        return self.tabla('conteos_subtipo_ano')
+
+    def conteos_subtipo_provincia(self, provincia: str) -> pd.DataFrame:
+        subtipos = self.tabla('conteos_subtipo_provincia')
+        return subtipos[subtipos['provincia'] == provincia]
+
+    # conteos_diarios solo existe en ConsultasDuckDB; stream.py lo pide
+    # después de comprobar disponible('conteos_diarios')
+
+    # --- Explorador (cubo) ---
+    def _cubo(self) -> CuboConteos:
+        if self.cubo is None:
+            self.cubo = CuboConteos.cargar(self.carpeta)
+        return self.cubo
+
+    def valores(self, dimension: str) -> list:
+        return self._cubo().valores(dimension)
+
+    def consultar(self, por: list, filtros: dict = None, desde: str = None,
+                  hasta: str = None) -> pd.DataFrame:
+        return self._cubo().consultar(por, filtros, desde, hasta)
+
+
+class ConsultasPaquete(ConsultasCSV):
+    """
+    Mismas consultas que ConsultasCSV sobre el paquete binario: cada tabla
+    se arma desde el archivo mapeado en memoria la primera vez que se pide.
+    """
+
+    def __init__(self, carpeta: str = CARPETA_DATOS):
+        super().__init__(carpeta)
+        self.paquete = PaqueteAgregados.abrir(carpeta)
+
+    def tabla(self, nombre: str) -> pd.DataFrame:
+        if nombre not in self.tablas:
+            self.tablas[nombre] = self.paquete.tabla(nombre)
+        return self.tablas[nombre]
+
+    def disponible(self, nombre: str) -> bool:
+        return nombre in self.paquete.encabezado["tablas"]
+
+    def metadatos(self) -> dict:
+        return self.paquete.metadatos
+
+    def _cubo(self) -> CuboConteos:
+        if self.cubo is None:
+            self.cubo = CuboConteos(self.tabla('cubo_conteos'))
+        return self.cubo
+
+
+# ============================================================
+# 3. BACKEND DUCKDB (SQL)
+# ============================================================
+
+class ConsultasDuckDB:
+    """
+    Mismas consultas en SQL parametrizado. Si existe la base construida con
+    construir_base y no es más vieja que los agregados (archivo_vigente) se
+    abre en solo lectura; si no, se crean vistas sobre los archivos de
+    datos_agregados/ en una base en memoria.
+    """
+
+    def __init__(self, carpeta: str = CARPETA_DATOS, ruta_db: str = None):
+        import duckdb
+
+        self.carpeta = carpeta
+        ruta_db = ruta_db or os.path.join(carpeta, ARCHIVO_DUCKDB)
+        vigente = archivo_vigente(ruta_db, carpeta)
+        if os.path.exists(ruta_db) and not vigente:
+            print(f"[AVISO] {ruta_db} es anterior a los agregados; se consultan los archivos "
+                  f"(vuelva a correr consultas_dashboard.py para reconstruirla)")
+        if vigente:
+            self.conexion = duckdb.connect(ruta_db, read_only=True)
+        else:
+            self.conexion = duckdb.connect()
+            for nombre, archivo in TABLAS_AGREGADOS.items():
+                ruta = os.path.join(carpeta, archivo)
+                if os.path.exists(ruta):
+                    self.conexion.execute(f"CREATE VIEW {nombre} AS SELECT * FROM {lector_duckdb(ruta)}")
+        self.tablas = set(
+            fila[0] for fila in self.conexion.execute(
+                "SELECT table_name FROM information_schema.tables"
+            ).fetchall()
+        )
+
+    def _consulta(self, sql: str, parametros: list = None) -> pd.DataFrame:
+        # Un cursor por consulta: Streamlit atiende sesiones en varios hilos
+        cursor = self.conexion.cursor()
+        try:
+            return cursor.execute(sql, parametros or []).df()
+        finally:
+            cursor.close()
+
+    def disponible(self, nombre: str) -> bool:
+        return nombre in self.tablas
+
+    def metadatos(self) -> dict:
+        return leer_metadatos(self.carpeta)
+
+    def conteos_ano_mes(self) -> pd.DataFrame:
+        return self._consulta('SELECT "Año", Mes, Cantidad FROM conteos_ano_mes ORDER BY "Año", Mes')
+
+    def conteos_dia_semana(self) -> pd.DataFrame:
+        return self._consulta("SELECT DiaSemana, Cantidad FROM conteos_dia_semana ORDER BY DiaSemana")
+
+    def conteos_provincia(self) -> pd.DataFrame:
+        return self._consulta("SELECT Provincia, Cantidad FROM conteos_provincia ORDER BY Cantidad DESC, Provincia")
+
+    def evolucion_provincia(self, provincias: list) -> pd.DataFrame:
+        return self._consulta(
+            'SELECT "Año_Mes", provincia, Cantidad FROM evolucion_provincia '
+            'WHERE list_contains(?, provincia) ORDER BY "Año_Mes", provincia',
+            [list(provincias)],
+        )
+
+    def conteos_ano_servicio(self) -> pd.DataFrame:
+        return self._consulta('SELECT "Año", Servicio, Cantidad FROM conteos_ano_servicio ORDER BY "Año", Servicio')
+
+    def ranking_parroquias(self, n: int) -> pd.DataFrame:
+        return self._consulta(
+            "SELECT Parroquia, provincia, Cantidad FROM ranking_parroquias "
+            "ORDER BY Cantidad DESC LIMIT ?",
+            [int(n)],
+        )
+
+    def conteos_hora_dia(self) -> pd.DataFrame:
+        return self._consulta("SELECT DiaSemana, Hora, Cantidad FROM conteos_hora_dia ORDER BY DiaSemana, Hora")
+
+    def conteos_hora_servicio(self) -> pd.DataFrame:
+        return self._consulta("SELECT Hora, Servicio, Cantidad FROM conteos_hora_servicio ORDER BY Hora, Servicio")
+
+    def conteos_subtipo_ano(self) -> pd.DataFrame:
+        # Mismo orden que el CSV: por Subtipo y Año, con "otros" al final
+        return self._consulta(
+            'SELECT Subtipo, "Año", Cantidad FROM conteos_subtipo_ano '
+            'ORDER BY Subtipo = ?, Subtipo, "Año"',
+            [OTROS_SUBTIPOS],
+        )
+
+    def conteos_subtipo_provincia(self, provincia: str) -> pd.DataFrame:
+        return self._consulta(
+            "SELECT Subtipo, provincia, Cantidad FROM conteos_subtipo_provincia "
+            "WHERE provincia = ? ORDER BY Subtipo = ?, Subtipo",
+            [provincia, OTROS_SUBTIPOS],
+        )
+
+    def conteos_diarios(self, provincias: list = None) -> pd.DataFrame:
+        """
+        Serie diaria de incidentes (opcionalmente de algunas provincias).
+        """
+        if not provincias:
+            return self._consulta(
+                "SELECT Dia, CAST(SUM(Cantidad) AS BIGINT) AS Cantidad FROM conteos_diarios GROUP BY Dia ORDER BY Dia"
+            )
+        return self._consulta(
+            "SELECT Dia, CAST(SUM(Cantidad) AS BIGINT) AS Cantidad FROM conteos_diarios "
+            "WHERE list_contains(?, provincia) GROUP BY Dia ORDER BY Dia",
+            [list(provincias)],
+        )
+
+    # --- Explorador (cubo) ---
+    def valores(self, dimension: str) -> list:
+        columna = columna_sql(dimension)
+        invalido = -1 if dimension in DIMENSIONES_ENTERAS else SIN_DATO
+        resultado = self._consulta(
+            f"SELECT DISTINCT {columna} AS v FROM cubo_conteos WHERE {columna} <> ? ORDER BY v",
+            [invalido],
+        )
+        return resultado['v'].tolist()
+
+    def consultar(self, por: list, filtros: dict = None, desde: str = None,
+                  hasta: str = None) -> pd.DataFrame:
+        """
+        Mismo roll-up que CuboConteos.consultar, en SQL sobre cubo_conteos.
+        """
+        columnas = [columna_sql(c) for c in por]
+        condiciones, parametros = [], []
+        for dimension, valores in (filtros or {}).items():
+            if valores is None:
+                continue
+            if not isinstance(valores, (list, tuple, set)):
+                valores = [valores]
+            condiciones.append(f"list_contains(?, {columna_sql(dimension)})")
+            parametros.append(list(valores))
+        if desde is not None or hasta is not None:
+            condiciones.append('"Año_Mes" <> ?')
+            parametros.append(SIN_DATO)
+        if desde is not None:
+            condiciones.append('"Año_Mes" >= ?')
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append('"Año_Mes" <= ?')
+            parametros.append(hasta)
+        for dimension, columna in zip(por, columnas):
+            condiciones.append(f"{columna} <> ?")
+            parametros.append(-1 if dimension in DIMENSIONES_ENTERAS else SIN_DATO)
+
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        lista = ", ".join(columnas)
+        sql = (
+            f"SELECT {lista}, CAST(SUM(Cantidad) AS BIGINT) AS Cantidad FROM cubo_conteos "
+            f"{where} GROUP BY {lista} ORDER BY {lista}"
+        )
+        return self._consulta(sql, parametros)
+
+
+def crear_consultas(backend: str = None, carpeta: str = CARPETA_DATOS):
+    """
+    Backend según el argumento o la variable ECU911_BACKEND (por defecto el
+    paquete si está vigente, ver paquete_vigente; si no csv). Si se pide duckdb y no está instalado, se
+    avisa y se usa csv.
+    """
+    backend = backend or os.environ.get(VARIABLE_BACKEND)
+    if backend is None:
+        backend = "paquete" if paquete_vigente(carpeta) else "csv"
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    if backend == "duckdb":
+        try:
+            return ConsultasDuckDB(carpeta)
+        except ImportError:
+            print("[ERROR] duckdb no está instalado; se usa el backend csv")
+    if backend == "paquete":
+        return ConsultasPaquete(carpeta)
+    return ConsultasCSV(carpeta)
+
+
+# ============================================================
+# 4. CONSTRUCCIÓN DE LA BASE DUCKDB
+# ============================================================
+
+def buscar_datos_limpios() -> str:
+    """
+    Dataset limpio completo (Parquet si existe) para los agregados finos.
+    """
+    for ruta in ["datos_limpios_2021_2025.parquet", "datos_limpios_2021_2025.csv"]:
+        if os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def construir_base(carpeta: str = CARPETA_DATOS, fuente_limpios: str = None) -> str:
+    """
+    Crea datos_agregados/ecu911.duckdb con:
+    - una tabla por cada archivo de datos_agregados/ (TABLAS_AGREGADOS)
+    - los agregados finos de SQL_AGREGADOS_FINOS, si hay dataset limpio
+    La base se escribe en un temporal y se reemplaza al final.
+    """
+    import duckdb
+
+    ruta_db = os.path.join(carpeta, ARCHIVO_DUCKDB)
+    temporal = f"{ruta_db}.tmp{os.getpid()}"
+    for resto in glob.glob(f"{temporal}*"):
+        os.remove(resto)
+
+    conexion = duckdb.connect(temporal)
+    try:
+        for nombre, archivo in TABLAS_AGREGADOS.items():
+            ruta = os.path.join(carpeta, archivo)
+            if not os.path.exists(ruta):
+                print(f"  [AVISO] No existe {ruta}; se omite la tabla {nombre}")
+                continue
+            conexion.execute(f"CREATE TABLE {nombre} AS SELECT * FROM {lector_duckdb(ruta)}")
+            print(f"  [OK] {nombre}")
+
+        if fuente_limpios is None:
+            fuente_limpios = buscar_datos_limpios()
+        if fuente_limpios is None:
+            print("  [AVISO] Sin dataset limpio: no se generan los agregados finos")
+        else:
+            for nombre, sql in SQL_AGREGADOS_FINOS.items():
+                conexion.execute(
+                    f"CREATE TABLE {nombre} AS {sql.format(fuente=lector_duckdb(fuente_limpios))}"
+                )
+                filas = conexion.execute(f"SELECT COUNT(*) FROM {nombre}").fetchone()[0]
+                print(f"  [OK] {nombre}: {filas:,} filas")
+    finally:
+        conexion.close()
+
+    os.replace(temporal, ruta_db)
+    return ruta_db
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construye la base DuckDB del dashboard")
+    parser.add_argument("--limpios", metavar="RUTA",
+                        help="dataset limpio para los agregados finos (por defecto datos_limpios_2021_2025.*)")
+    args = parser.parse_args()
+    print("[PROCESO] Construyendo base DuckDB...")
+    ruta = construir_base(fuente_limpios=args.limpios)
+    print(f"[OK] Base guardada en {ruta}")
@@ -0,0 +1,178 @@
+"""
+Cubo de conteos multidimensional del ECU 911.
+
+generar_agregados.py (y pipeline_polars.py) guardan en datos_agregados/ un
+Parquet con el número de incidentes por cada combinación de
+(Año_Mes, DiaSemana, Hora, provincia, Canton, Parroquia, Servicio, Subtipo).
+Cualquier corte nuevo (p. ej. Servicio por provincia y hora) es un roll-up
+de ese cubo, así que se responde sin volver a leer los datos crudos:
+
+    cubo = CuboConteos.cargar()
+    cubo.consultar(['provincia', 'Hora'], {'Servicio': 'seguridad ciudadana'})
+
+Los valores faltantes se guardan como SIN_DATO (texto) o -1 (enteros) para
+que los roll-ups sumen siempre el total de registros.
+"""
+import os
+
+import pandas as pd
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+CARPETA_CUBO = "datos_agregados"
+ARCHIVO_CUBO = "cubo_conteos.parquet"
+
+DIMENSIONES_CUBO = ['Año_Mes', 'DiaSemana', 'Hora', 'provincia',
+                    'Canton', 'Parroquia', 'Servicio', 'Subtipo']
+DIMENSIONES_ENTERAS = ['DiaSemana', 'Hora']
+
+# Valor de las dimensiones de texto sin dato (fecha inválida, parroquia nula...)
+SIN_DATO = "(sin dato)"
+
+
+# ============================================================
+# 2. CONSTRUCCIÓN
+# ============================================================
+
+def dimensiones_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnas del cubo de un bloque (con Año_Mes/DiaSemana/Hora ya derivadas),
+    con los nulos reemplazados por SIN_DATO / -1.
+    """
+    dims = {}
+    for col in DIMENSIONES_CUBO:
+        serie = df[col]
+        if col in DIMENSIONES_ENTERAS:
+            dims[col] = serie.fillna(-1).astype('int64')
+            continue
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            if serie.isna().any():
+                serie = serie.cat.add_categories([SIN_DATO]).fillna(SIN_DATO)
+        else:
+            serie = serie.where(serie.notna() & (serie != 'NaT'), SIN_DATO).astype(object)
+        dims[col] = serie
+    return pd.DataFrame(dims, index=df.index)
+
+
+def contar_cubo(df: pd.DataFrame) -> pd.Series:
+    """
+    Conteo de un bloque por todas las dimensiones del cubo, como Serie con
+    MultiIndex de valores planos (sumable con la de otros bloques).
+    """
+    dims = dimensiones_cubo(df)
+    conteo = dims.groupby(DIMENSIONES_CUBO, observed=True).size()
+    tabla = conteo.reset_index(name='Cantidad')
+    for col in DIMENSIONES_CUBO:
+        if isinstance(tabla[col].dtype, pd.CategoricalDtype):
+            tabla[col] = tabla[col].astype(object)
+    return tabla.set_index(DIMENSIONES_CUBO)['Cantidad']
+
+
+def tabla_cubo(conteo: pd.Series) -> pd.DataFrame:
+    """
+    Cubo como tabla plana: dimensiones de texto como diccionario (category)
+    y enteros pequeños, ordenado por las dimensiones.
+    """
+    tabla = conteo.sort_index().reset_index(name='Cantidad')
+    for col in DIMENSIONES_CUBO:
+        if col in DIMENSIONES_ENTERAS:
+            tabla[col] = tabla[col].astype('int8')
+        else:
+            tabla[col] = tabla[col].astype('category')
+    tabla['Cantidad'] = tabla['Cantidad'].astype('int64')
+    return tabla
+
+
+def guardar_cubo(conteo: pd.Series, carpeta: str = CARPETA_CUBO) -> str:
+    """
+    Escribe el cubo (tabla_cubo) como Parquet.
+    """
+    ruta = os.path.join(carpeta, ARCHIVO_CUBO)
+    tabla_cubo(conteo).to_parquet(ruta, index=False)
+    return ruta
+
+
+# ============================================================
+# 3. CONSULTAS
+# ============================================================
+
+class CuboConteos:
+    """
+    Cubo cargado en memoria con consultas de roll-up filtradas.
+    Las dimensiones de texto son category, así que filtros y groupby
+    trabajan sobre códigos enteros.
+    """
+
+    def __init__(self, tabla: pd.DataFrame):
+        self.tabla = tabla
+
+    @classmethod
+    def cargar(cls, carpeta: str = CARPETA_CUBO) -> "CuboConteos":
+        tabla = pd.read_parquet(os.path.join(carpeta, ARCHIVO_CUBO))
+        for col in DIMENSIONES_CUBO:
+            if col not in DIMENSIONES_ENTERAS and not isinstance(tabla[col].dtype, pd.CategoricalDtype):
+                tabla[col] = tabla[col].astype('category')
+        return cls(tabla)
+
+    @staticmethod
+    def existe(carpeta: str = CARPETA_CUBO) -> bool:
+        return os.path.exists(os.path.join(carpeta, ARCHIVO_CUBO))
+
+    def total(self) -> int:
+        return int(self.tabla['Cantidad'].sum())
+
+    def valores(self, dimension: str) -> list:
+        """
+        Valores presentes de una dimensión (sin SIN_DATO / -1), ordenados.
+        """
+        valores = self.tabla[dimension].drop_duplicates().tolist()
+        return sorted(v for v in valores if v != SIN_DATO and v != -1)
+
+    def filtrar(self, filtros: dict = None, desde: str = None, hasta: str = None) -> pd.DataFrame:
+        """
+        Filas del cubo que cumplen los filtros:
+        - filtros: {dimension: valor o lista de valores}
+        - desde / hasta: rango de Año_Mes ('2023-01'), inclusivo
+        """
+        tabla = self.tabla
+        mascara = pd.Series(True, index=tabla.index)
+        for dimension, valores in (filtros or {}).items():
+            if valores is None:
+                continue
+            if not isinstance(valores, (list, tuple, set)):
+                valores = [valores]
+            mascara &= tabla[dimension].isin(valores)
+        if desde is not None or hasta is not None:
+            # Se compara sobre las categorías, no fila por fila
+            periodos = [
+                p for p in tabla['Año_Mes'].cat.categories
+                if p != SIN_DATO and (desde is None or p >= desde) and (hasta is None or p <= hasta)
+            ]
+            mascara &= tabla['Año_Mes'].isin(periodos)
+        return tabla[mascara]
+
+    def consultar(self, por: list, filtros: dict = None, desde: str = None,
+                  hasta: str = None, incluir_sin_dato: bool = False) -> pd.DataFrame:
+        """
+        Roll-up: suma de Cantidad por las dimensiones `por` sobre las filas
+        filtradas, como DataFrame (por + Cantidad) ordenado por las claves.
+        Con incluir_sin_dato=False se descartan las claves SIN_DATO / -1
+        (igual que un groupby de pandas sobre los datos originales).
+        """
+        tabla = self.filtrar(filtros, desde, hasta)
+        resultado = (
+            tabla.groupby(list(por), observed=True)['Cantidad']
+            .sum()
+            .reset_index()
+        )
+        if not incluir_sin_dato:
+            for col in por:
+                invalido = -1 if col in DIMENSIONES_ENTERAS else SIN_DATO
+                resultado = resultado[resultado[col] != invalido]
+        for col in por:
+            if isinstance(resultado[col].dtype, pd.CategoricalDtype):
+                resultado[col] = resultado[col].astype(object)
+        return resultado.reset_index(drop=True)
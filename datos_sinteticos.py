@@ -0,0 +1,367 @@
+"""
+Generador determinista de datos sintéticos del ECU 911 (para benchmark.py).
+
+Escribe en una carpeta:
+- CODIFICACIÓN_2021.xlsx con el formato de la hoja del INEC (fila de
+  título, encabezado DPA_* y una columna vacía que los scripts descartan)
+- emergencias_<mes>_<año>.csv con el formato de los CSV crudos
+  (sep=";", Fecha;provincia;Canton;Cod_Parroquia;Parroquia;Servicio;Subtipo
+  y Cod_Parroquia entero sin el cero inicial). Fecha es dd/mm/aaaa, solo el
+  día como en el feed real; con_hora=True agrega hh:mm:ss
+
+Los datos imitan lo que complica el pipeline real:
+- Guayaquil y Quito concentran casi la mitad de los eventos y el resto de
+  parroquias sigue una distribución tipo Zipf
+- los nombres llegan con mayúsculas, tildes y espacios variables
+- provincias inválidas ('0', 'zona no delimitada') y códigos de parroquia
+  que no existen en el catálogo
+Con la misma semilla se generan exactamente los mismos archivos; las filas
+se escriben por bloques, así que sirve para escalas de 1M a 50M filas.
+"""
+import argparse
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+SEMILLA = 911
+FILAS_BLOQUE = 1_000_000
+ESCALAS = {'1M': 1_000_000, '5M': 5_000_000, '10M': 10_000_000,
+           '25M': 25_000_000, '50M': 50_000_000}
+
+MESES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio',
+         'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre']
+COLUMNAS_CRUDAS = ['Fecha', 'provincia', 'Canton', 'Cod_Parroquia',
+                   'Parroquia', 'Servicio', 'Subtipo']
+
+# (código, provincia, cantón capital, parroquia cabecera) según el INEC
+PROVINCIAS = [
+    ('01', 'AZUAY', 'CUENCA', 'CUENCA'),
+    ('02', 'BOLÍVAR', 'GUARANDA', 'GUARANDA'),
+    ('03', 'CAÑAR', 'AZOGUES', 'AZOGUES'),
+    ('04', 'CARCHI', 'TULCÁN', 'TULCÁN'),
+    ('05', 'COTOPAXI', 'LATACUNGA', 'LATACUNGA'),
+    ('06', 'CHIMBORAZO', 'RIOBAMBA', 'RIOBAMBA'),
+    ('07', 'EL ORO', 'MACHALA', 'MACHALA'),
+    ('08', 'ESMERALDAS', 'ESMERALDAS', 'ESMERALDAS'),
+    ('09', 'GUAYAS', 'GUAYAQUIL', 'GUAYAQUIL'),
+    ('10', 'IMBABURA', 'IBARRA', 'SAN MIGUEL DE IBARRA'),
+    ('11', 'LOJA', 'LOJA', 'LOJA'),
+    ('12', 'LOS RÍOS', 'BABAHOYO', 'BABAHOYO'),
+    ('13', 'MANABÍ', 'PORTOVIEJO', 'PORTOVIEJO'),
+    ('14', 'MORONA SANTIAGO', 'MORONA', 'MACAS'),
+    ('15', 'NAPO', 'TENA', 'TENA'),
+    ('16', 'PASTAZA', 'PASTAZA', 'PUYO'),
+    ('17', 'PICHINCHA', 'DISTRITO METROPOLITANO DE QUITO',
+     'QUITO DISTRITO METROPOLITANO, CABECERA CANTONAL, CAPITAL PROVINCIAL Y DE LA REPÚBLICA'),
+    ('18', 'TUNGURAHUA', 'AMBATO', 'AMBATO'),
+    ('19', 'ZAMORA CHINCHIPE', 'ZAMORA', 'ZAMORA'),
+    ('20', 'GALÁPAGOS', 'SAN CRISTÓBAL', 'PUERTO BAQUERIZO MORENO'),
+    ('21', 'SUCUMBÍOS', 'LAGO AGRIO', 'NUEVA LOJA'),
+    ('22', 'ORELLANA', 'FRANCISCO DE ORELLANA', 'PUERTO FRANCISCO DE ORELLANA'),
+    ('23', 'SANTO DOMINGO DE LOS TSÁCHILAS', 'SANTO DOMINGO', 'SANTO DOMINGO DE LOS COLORADOS'),
+    ('24', 'SANTA ELENA', 'SANTA ELENA', 'SANTA ELENA'),
+]
+
+# Nombres para los cantones y parroquias de relleno (se repiten entre
+# cantones, como en el catálogo real)
+NOMBRES_LUGAR = [
+    'SAN JOSÉ', 'SANTA ROSA', 'LA UNIÓN', 'EL CARMEN', 'SAN MIGUEL',
+    'SAN ANTONIO', 'SANTA ISABEL', 'EL ROSARIO', 'SAN PEDRO', 'LA PAZ',
+    'SAN ISIDRO', 'SAN JUAN', 'BELÉN', 'CONCEPCIÓN', 'EL TRIUNFO',
+    'JUAN MONTALVO', 'SIMÓN BOLÍVAR', 'ELOY ALFARO', 'SAN SEBASTIÁN',
+    'SAN LUCAS', 'GUADALUPE', 'LA ESPERANZA', 'VALLE HERMOSO', 'PALMIRA',
+    'SAN FRANCISCO', 'SAN PLÁCIDO', 'TARQUI', 'MONTERREY', 'EL PARAÍSO',
+    'SANTA MARTHA DE CUBA', 'CUMBARATZA', 'PUERTO LÓPEZ',
+]
+
+# Parroquias cabecera con peso fijo (el resto se reparte tipo Zipf)
+PESOS_DOMINANTES = {'090150': 0.25, '170150': 0.21}
+EXPONENTE_ZIPF = 1.1
+
+# Provincias inválidas tal como aparecen en los CSV: (provincia, cantón,
+# código, parroquia)
+LUGARES_INVALIDOS = [
+    ('0', '0', 0, '0'),
+    ('ZONA NO DELIMITADA', 'EL PIEDRERO', 900451, 'EL PIEDRERO'),
+    ('Zona no delimitada', 'Las Golondrinas', 900351, 'Las Golondrinas'),
+]
+
+# Servicio -> (peso, subtipos); los subtipos siguen una distribución tipo Zipf
+SERVICIOS = {
+    'Seguridad Ciudadana': (0.55, ['Robo', 'Riña', 'Escándalo en vía pública',
+                                   'Violencia intrafamiliar', 'Persona sospechosa',
+                                   'Consumo de alcohol en vía pública']),
+    'Gestión Sanitaria': (0.20, ['Emergencia médica', 'Dificultad respiratoria',
+                                 'Trauma', 'Intoxicación']),
+    'Tránsito y Movilidad': (0.15, ['Accidente de tránsito', 'Vehículo mal estacionado',
+                                    'Atropellamiento']),
+    'Gestión de Siniestros': (0.06, ['Incendio estructural', 'Incendio forestal',
+                                     'Fuga de gas']),
+    'Servicios Municipales': (0.04, ['Animal en vía pública', 'Árbol caído']),
+}
+
+# Variantes de escritura de un mismo nombre (la 0 es la forma limpia)
+N_VARIANTES = 5
+
+
+# ============================================================
+# 2. CATÁLOGO INEC SINTÉTICO
+# ============================================================
+
+def sin_tildes(texto: str) -> str:
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto)
+                   if not unicodedata.combining(c))
+
+
+def generar_catalogo(cantones: int = 6, parroquias: int = 8,
+                     semilla: int = SEMILLA) -> pd.DataFrame:
+    """
+    Catálogo con las columnas DPA_* del INEC: en cada provincia el cantón
+    capital real y cantones de relleno, cada uno con su cabecera (código
+    XXXX50) y parroquias rurales (XXXX51, XXXX52, ...).
+    """
+    rng = np.random.default_rng(semilla)
+    filas = []
+    for cod_prov, provincia, capital, cabecera in PROVINCIAS:
+        nombres_canton = [capital] + [
+            NOMBRES_LUGAR[i] for i in rng.permutation(len(NOMBRES_LUGAR))[:cantones - 1]
+        ]
+        for k, canton in enumerate(nombres_canton, 1):
+            cod_canton = f"{cod_prov}{k:02d}"
+            nombres_parr = [cabecera if k == 1 else canton] + [
+                NOMBRES_LUGAR[i] for i in rng.permutation(len(NOMBRES_LUGAR))
+                if NOMBRES_LUGAR[i] != canton
+            ][:parroquias - 1]
+            for j, parroquia in enumerate(nombres_parr):
+                filas.append((cod_prov, provincia, cod_canton, canton,
+                              f"{cod_canton}{50 + j}", parroquia))
+    return pd.DataFrame(filas, columns=['DPA_PROVIN', 'DPA_DESPRO', 'DPA_CANTON',
+                                        'DPA_DESCAN', 'DPA_PARROQ', 'DPA_DESPAR'])
+
+
+def escribir_codificacion(catalogo: pd.DataFrame, ruta: str) -> None:
+    """
+    Guarda el catálogo como la hoja del INEC (título en la primera fila).
+    """
+    hoja = catalogo.assign(VACIA=None)
+    with pd.ExcelWriter(ruta) as escritor:
+        pd.DataFrame([['CODIFICACIÓN DIVISIÓN POLÍTICO ADMINISTRATIVA 2021']]).to_excel(
+            escritor, index=False, header=False, startrow=0)
+        hoja.to_excel(escritor, index=False, startrow=1)
+
+
+def pesos_parroquias(catalogo: pd.DataFrame, rng: np.random.Generator) -> np.ndarray:
+    """
+    Probabilidad de cada parroquia: Guayaquil y Quito con PESOS_DOMINANTES,
+    luego las demás cabeceras provinciales y el resto (cada grupo en orden
+    aleatorio), con pesos 1/rango^EXPONENTE_ZIPF.
+    """
+    codigos = catalogo['DPA_PARROQ'].to_numpy()
+    dominante = np.isin(codigos, list(PESOS_DOMINANTES))
+    capital = pd.Series(codigos).str[2:].eq('0150').to_numpy() & ~dominante
+    resto = np.flatnonzero(~dominante & ~capital)
+    orden = np.concatenate([rng.permutation(np.flatnonzero(capital)), rng.permutation(resto)])
+
+    pesos = np.zeros(len(codigos))
+    zipf = 1.0 / np.arange(1, len(orden) + 1) ** EXPONENTE_ZIPF
+    pesos[orden] = zipf / zipf.sum() * (1 - sum(PESOS_DOMINANTES.values()))
+    for codigo, peso in PESOS_DOMINANTES.items():
+        pesos[codigos == codigo] = peso
+    return pesos
+
+
+# ============================================================
+# 3. EVENTOS
+# ============================================================
+
+def variantes(nombres: list) -> np.ndarray:
+    """
+    Matriz (N_VARIANTES x lugares) con formas de escribir cada nombre:
+    título, mayúsculas, minúsculas sin tildes, espacios dobles/sobrantes y
+    título sin tildes.
+    """
+    formas = [
+        [n.title() for n in nombres],
+        [n.upper() for n in nombres],
+        [sin_tildes(n).lower() for n in nombres],
+        [f" {n.replace(' ', '  ').title()} " for n in nombres],
+        [sin_tildes(n).title() for n in nombres],
+    ]
+    return np.array(formas, dtype=object)
+
+
+class GeneradorEventos:
+    """
+    Genera bloques de eventos crudos a partir del catálogo. Todas las
+    columnas se arman con índices numpy sobre tablas de valores, sin bucles
+    por fila.
+    - ruido: fracción de filas con una variante de escritura distinta de la limpia
+    - invalidas: fracción de filas con provincia inválida
+    - codigos_malos: fracción de filas válidas con un Cod_Parroquia que no
+      está en el catálogo
+    - con_hora: Fecha con hora (el feed real solo trae el día)
+    """
+
+    def __init__(self, catalogo: pd.DataFrame, semilla: int = SEMILLA,
+                 ruido: float = 0.3, invalidas: float = 0.01, codigos_malos: float = 0.02,
+                 con_hora: bool = False):
+        self.rng = np.random.default_rng(semilla)
+        self.ruido = ruido
+        self.codigos_malos = codigos_malos
+
+        # Lugares = parroquias del catálogo + lugares inválidos al final
+        provincias = catalogo['DPA_DESPRO'].tolist() + [l[0] for l in LUGARES_INVALIDOS]
+        cantones = catalogo['DPA_DESCAN'].tolist() + [l[1] for l in LUGARES_INVALIDOS]
+        parroquias = catalogo['DPA_DESPAR'].tolist() + [l[3] for l in LUGARES_INVALIDOS]
+        self.n_validos = len(catalogo)
+        self.provincia = variantes(provincias)
+        self.canton = variantes(cantones)
+        self.parroquia = variantes(parroquias)
+        self.codigo = np.concatenate([
+            catalogo['DPA_PARROQ'].astype(int).to_numpy(),
+            [l[2] for l in LUGARES_INVALIDOS],
+        ])
+        self.pesos = np.concatenate([
+            pesos_parroquias(catalogo, self.rng) * (1 - invalidas),
+            np.full(len(LUGARES_INVALIDOS), invalidas / len(LUGARES_INVALIDOS)),
+        ])
+
+        servicios = []
+        subtipos = []
+        pesos_subtipo = []
+        for servicio, (peso, nombres) in SERVICIOS.items():
+            zipf = 1.0 / np.arange(1, len(nombres) + 1)
+            servicios += [servicio] * len(nombres)
+            subtipos += nombres
+            pesos_subtipo += list(peso * zipf / zipf.sum())
+        self.servicio = np.array(servicios, dtype=object)
+        self.subtipo = np.array(subtipos, dtype=object)
+        self.pesos_subtipo = np.array(pesos_subtipo) / sum(pesos_subtipo)
+
+        # "hh:mm:ss" de cada segundo del día
+        self.horas = None
+        if con_hora:
+            segundos = np.arange(86_400)
+            self.horas = np.array([f" {h:02d}:{m:02d}:{s:02d}" for h, m, s in
+                                   zip(segundos // 3600, segundos // 60 % 60, segundos % 60)],
+                                  dtype=object)
+
+    def bloque(self, filas: int, anio: int, mes: int) -> pd.DataFrame:
+        rng = self.rng
+        dias_mes = pd.Period(year=anio, month=mes, freq='M').days_in_month
+        dias = np.array([f"{d:02d}/{mes:02d}/{anio}" for d in range(1, dias_mes + 1)], dtype=object)
+        fecha = dias[rng.integers(0, dias_mes, filas)]
+        if self.horas is not None:
+            fecha = fecha + self.horas[rng.integers(0, 86_400, filas)]
+
+        lugar = rng.choice(len(self.pesos), filas, p=self.pesos)
+        variante = np.where(rng.random(filas) < self.ruido,
+                            rng.integers(1, N_VARIANTES, filas), 0)
+
+        codigo = self.codigo[lugar].copy()
+        malo = (rng.random(filas) < self.codigos_malos) & (lugar < self.n_validos)
+        # Códigos inexistentes: 999999, truncados o con la parroquia cambiada
+        tipo = rng.integers(0, 3, filas)
+        codigo = np.where(malo & (tipo == 0), 999999, codigo)
+        codigo = np.where(malo & (tipo == 1), codigo // 10, codigo)
+        codigo = np.where(malo & (tipo == 2), codigo + 40, codigo)
+
+        subtipo = rng.choice(len(self.subtipo), filas, p=self.pesos_subtipo)
+        return pd.DataFrame({
+            'Fecha': fecha,
+            'provincia': self.provincia[variante, lugar],
+            'Canton': self.canton[variante, lugar],
+            'Cod_Parroquia': codigo,
+            'Parroquia': self.parroquia[variante, lugar],
+            'Servicio': self.servicio[subtipo],
+            'Subtipo': self.subtipo[subtipo],
+        }, columns=COLUMNAS_CRUDAS)
+
+
+# ============================================================
+# 4. ESCRITURA DE LOS ARCHIVOS
+# ============================================================
+
+def meses_desde(anio: int, mes: int, cantidad: int) -> list:
+    """
+    [(año, mes), ...] consecutivos a partir de anio/mes.
+    """
+    return [(anio + (mes - 1 + i) // 12, (mes - 1 + i) % 12 + 1) for i in range(cantidad)]
+
+
+def generar_datos(carpeta: str, filas: int, meses: int = 12, anio: int = 2021,
+                  semilla: int = SEMILLA, cantones: int = 6, parroquias: int = 8,
+                  ruido: float = 0.3, invalidas: float = 0.01,
+                  codigos_malos: float = 0.02, con_hora: bool = False) -> list:
+    """
+    Escribe el catálogo y los CSV mensuales (filas en total, repartidas
+    entre los meses) en carpeta. Devuelve las rutas de los CSV.
+    """
+    os.makedirs(carpeta, exist_ok=True)
+    catalogo = generar_catalogo(cantones, parroquias, semilla)
+    escribir_codificacion(catalogo, os.path.join(carpeta, "CODIFICACIÓN_2021.xlsx"))
+    print(f"[OK] Catálogo: {len(catalogo):,} parroquias")
+
+    generador = GeneradorEventos(catalogo, semilla, ruido, invalidas, codigos_malos, con_hora)
+    rutas = []
+    for i, (anio_mes, mes) in enumerate(meses_desde(anio, 1, meses)):
+        filas_mes = filas // meses + (1 if i < filas % meses else 0)
+        ruta = os.path.join(carpeta, f"emergencias_{MESES[mes - 1]}_{anio_mes}.csv")
+        temporal = f"{ruta}.tmp{os.getpid()}"
+        with open(temporal, "w", encoding="utf-8", newline="") as f:
+            f.write(";".join(COLUMNAS_CRUDAS) + "\n")
+            for inicio in range(0, filas_mes, FILAS_BLOQUE):
+                bloque = generador.bloque(min(FILAS_BLOQUE, filas_mes - inicio), anio_mes, mes)
+                bloque.to_csv(f, sep=";", index=False, header=False)
+        os.replace(temporal, ruta)
+        rutas.append(ruta)
+        print(f"[OK] {os.path.basename(ruta)}: {filas_mes:,} filas")
+    return rutas
+
+
+def filas_desde_texto(texto: str) -> int:
+    """
+    Número de filas desde '200000', '1M', '2.5M' o '500k'.
+    """
+    texto = texto.strip().upper()
+    if texto in ESCALAS:
+        return ESCALAS[texto]
+    multiplicador = {'K': 1_000, 'M': 1_000_000}.get(texto[-1:], 1)
+    if multiplicador > 1:
+        texto = texto[:-1]
+    try:
+        filas = int(float(texto) * multiplicador)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Número de filas inválido: {texto}")
+    if filas <= 0:
+        raise argparse.ArgumentTypeError("El número de filas debe ser positivo")
+    return filas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos del ECU 911")
+    parser.add_argument("carpeta", help="carpeta de salida")
+    parser.add_argument("--filas", type=filas_desde_texto, default=ESCALAS['1M'],
+                        help=f"filas en total (p. ej. 200k, {', '.join(ESCALAS)})")
+    parser.add_argument("--meses", type=int, default=12, help="archivos mensuales a generar")
+    parser.add_argument("--anio", type=int, default=2021, help="año del primer mes (enero)")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--ruido", type=float, default=0.3,
+                        help="fracción de nombres con mayúsculas/tildes/espacios distintos")
+    parser.add_argument("--invalidas", type=float, default=0.01,
+                        help="fracción de filas con provincia '0' o 'zona no delimitada'")
+    parser.add_argument("--codigos-malos", type=float, default=0.02,
+                        help="fracción de filas con un Cod_Parroquia que no está en el catálogo")
+    parser.add_argument("--con-hora", action="store_true",
+                        help="Fecha con hora (dd/mm/aaaa hh:mm:ss); por defecto solo el día, como el feed real")
+    args = parser.parse_args()
+    generar_datos(args.carpeta, args.filas, args.meses, args.anio, args.semilla,
+                  ruido=args.ruido, invalidas=args.invalidas, codigos_malos=args.codigos_malos,
+                  con_hora=args.con_hora)
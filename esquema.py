@@ -0,0 +1,224 @@
+"""
+Esquema declarado del feed ECU 911 (emergencias) y de los archivos
+georreferenciados.
+
+Se aplica al leer en todos los cargadores para no inferir tipos:
+- columnas geográficas y de servicio como category (pocos valores distintos)
+- códigos DPA como enteros con nulo propio (Int64)
+- Fecha con formatos explícitos (día primero)
+Así cada fila ocupa unos pocos bytes de códigos en lugar de varios objetos
+str de Python, y los groupby trabajan sobre enteros.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# ============================================================
+# 1. TIPOS POR COLUMNA
+# ============================================================
+
+COLUMNAS_CATEGORICAS = ['provincia', 'Canton', 'Parroquia', 'Servicio', 'Subtipo']
+COLUMNAS_CODIGO = ['Cod_Provincia', 'Cod_Canton', 'Cod_Parroquia']
+
+# CSV crudo de ECU 911 (sep=";"); Fecha se parsea aparte con FORMATOS_FECHA
+ESQUEMA_EMERGENCIAS = {
+    **{col: 'category' for col in COLUMNAS_CATEGORICAS},
+    **{col: 'Int64' for col in COLUMNAS_CODIGO},
+}
+
+# Salida de procesar_todos_emergencias (sep=",")
+ESQUEMA_GEORREFERENCIADO = {
+    **ESQUEMA_EMERGENCIAS,
+    'prov_norm': 'category',
+    'canton_norm': 'category',
+    'parr_norm': 'category',
+    'DPA_PARROQ': 'category',   # texto de 6 dígitos (conserva el 0 inicial)
+    'metodo_match': 'category',
+    'archivo_origen': 'category',
+}
+
+# Formatos de Fecha del feed (día primero) y de las salidas (ISO), en orden
+# de prioridad
+FORMATOS_FECHA = [
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d",
+]
+
+
+# ============================================================
+# 2. LECTURA CON ESQUEMA
+# ============================================================
+
+def dtypes_para(columnas: list, esquema: dict) -> dict:
+    """
+    Subconjunto del esquema para las columnas presentes.
+    """
+    return {col: esquema[col] for col in columnas if col in esquema}
+
+
+def leer_csv_tipado(ruta: str, esquema: dict, **kwargs_csv) -> pd.DataFrame:
+    """
+    pd.read_csv con los dtypes del esquema. Si algún código DPA trae texto
+    no numérico, esas columnas se releen como texto y se convierten a Int64
+    dejando nulo lo que no es número.
+    """
+    columnas = pd.read_csv(ruta, nrows=0, **kwargs_csv).columns
+    if kwargs_csv.get('usecols') is not None:
+        columnas = [c for c in columnas if c in kwargs_csv['usecols']]
+    dtypes = dtypes_para(columnas, esquema)
+    try:
+        df = pd.read_csv(ruta, dtype=dtypes, **kwargs_csv)
+    except ValueError:
+        codigos = [col for col, tipo in dtypes.items() if tipo == 'Int64']
+        df = pd.read_csv(ruta, dtype={**dtypes, **{col: 'string' for col in codigos}}, **kwargs_csv)
+        for col in codigos:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
+    if 'Fecha' in df.columns:
+        df['Fecha'] = parsear_fecha(df['Fecha'], etiqueta=os.path.basename(ruta))
+    return df
+
+
+def leer_csv_tipado_por_bloques(ruta: str, esquema: dict, tamano_bloque: int, **kwargs_csv):
+    """
+    Como leer_csv_tipado, pero itera bloques de a lo más tamano_bloque filas.
+    Los códigos DPA se leen como texto y se pasan a Int64 en cada bloque (un
+    valor no numérico en un bloque tardío no obliga a releer el archivo), el
+    formato de Fecha se detecta en el primer bloque con fechas y el resumen
+    de fechas se imprime una vez al terminar.
+    """
+    columnas = pd.read_csv(ruta, nrows=0, **kwargs_csv).columns
+    if kwargs_csv.get('usecols') is not None:
+        columnas = [c for c in columnas if c in kwargs_csv['usecols']]
+    dtypes = dtypes_para(columnas, esquema)
+    codigos = [col for col, tipo in dtypes.items() if tipo == 'Int64']
+    dtypes.update({col: 'string' for col in codigos})
+
+    formato = None
+    conteo = {}
+    for bloque in pd.read_csv(ruta, dtype=dtypes, chunksize=tamano_bloque, **kwargs_csv):
+        for col in codigos:
+            bloque[col] = pd.to_numeric(bloque[col], errors='coerce').astype('Int64')
+        if 'Fecha' in bloque.columns:
+            if formato is None:
+                formato = detectar_formato_fecha(bloque['Fecha'].dropna().unique())
+            bloque['Fecha'] = parsear_fecha(bloque['Fecha'], formato, informar=False, conteo=conteo)
+        yield bloque
+    if conteo:
+        informar_fecha(os.path.basename(ruta), formato, **conteo)
+
+
+def unificar_categorias(dataframes: list) -> list:
+    """
+    Antes de un pd.concat: las columnas category con categorías distintas en
+    cada archivo se pasan a la unión de categorías, para que el resultado
+    siga siendo category y no caiga a object.
+    """
+    columnas = set.intersection(*(set(df.columns) for df in dataframes)) if dataframes else set()
+    for col in columnas:
+        if not all(isinstance(df[col].dtype, pd.CategoricalDtype) for df in dataframes):
+            continue
+        categorias = union_categoricals([df[col] for df in dataframes]).categories
+        for df in dataframes:
+            df[col] = df[col].cat.set_categories(categorias)
+    return dataframes
+
+
+def esquema_polars(columnas: list) -> dict:
+    """
+    Mismo esquema para pl.read_csv/scan_csv (schema_overrides): categóricas
+    como pl.Categorical, códigos como pl.Int64 y el resto como texto.
+    """
+    import polars as pl
+
+    tipos = {'category': pl.Categorical, 'Int64': pl.Int64}
+    return {
+        col: tipos[ESQUEMA_GEORREFERENCIADO[col]] if col in ESQUEMA_GEORREFERENCIADO else pl.String
+        for col in columnas
+    }
+
+
+# ============================================================
+# 3. FECHA
+# ============================================================
+
+# Valores distintos que se miran para elegir el formato de un archivo
+MUESTRA_FORMATO = 1000
+
+
+def detectar_formato_fecha(valores, formatos: list = FORMATOS_FECHA):
+    """
+    Elige, sobre una muestra de valores distintos, el formato de formatos
+    que parsea más valores. None si ninguno parsea nada.
+    """
+    muestra = pd.Index(valores).dropna()[:MUESTRA_FORMATO]
+    mejor, aciertos = None, 0
+    for formato in formatos:
+        n = int(pd.to_datetime(muestra, format=formato, errors='coerce').notna().sum())
+        if n > aciertos:
+            mejor, aciertos = formato, n
+        if aciertos == len(muestra):
+            break
+    return mejor
+
+
+def informar_fecha(etiqueta: str, formato: str, en_formato: int, alternas: int,
+                   sin_parsear: int) -> None:
+    print(f"[fecha] {etiqueta}: formato {formato} en {en_formato} filas | "
+          f"otros formatos: {alternas} | sin parsear: {sin_parsear}")
+
+
+def parsear_fecha(serie: pd.Series, formato: str = None, etiqueta: str = 'Fecha',
+                  informar: bool = True, conteo: dict = None) -> pd.Series:
+    """
+    Convierte la columna Fecha (texto) en datetime64:
+    - se trabaja sobre los valores distintos (el feed trae pocas fechas
+      distintas por mes)
+    - el formato se detecta una vez (o se recibe) y se parsea con formato fijo
+    - solo lo que falla se intenta con los demás formatos y, al final, con
+      inferencia de pandas (día primero)
+    - lo que no se pudo parsear queda NaT y se informa cuántas filas son
+      (o se suma en conteo, para informar una vez por archivo leído en bloques)
+    Si la columna ya es datetime se devuelve tal cual.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+
+    codigos, unicos = pd.factorize(serie)
+    unicos = pd.Index(unicos.astype(str)).str.strip()
+    filas = np.bincount(codigos[codigos >= 0], minlength=len(unicos))
+
+    if formato is None:
+        formato = detectar_formato_fecha(unicos)
+    fechas = pd.Series(pd.NaT, index=range(len(unicos)), dtype='datetime64[ns]')
+    if formato is not None:
+        fechas[:] = pd.to_datetime(unicos, format=formato, errors='coerce')
+    en_formato = int(filas[fechas.notna().to_numpy()].sum())
+
+    # Respaldo solo para la minoría que no siguió el formato principal
+    for alterno in FORMATOS_FECHA:
+        faltan = fechas.isna().to_numpy()
+        if not faltan.any():
+            break
+        if alterno != formato:
+            fechas[faltan] = pd.to_datetime(unicos[faltan], format=alterno, errors='coerce')
+    faltan = fechas.isna().to_numpy()
+    if faltan.any():
+        fechas[faltan] = pd.to_datetime(unicos[faltan], dayfirst=True, format='mixed', errors='coerce')
+
+    sin_parsear = int(filas[fechas.isna().to_numpy()].sum())
+    alternas = int(filas.sum()) - en_formato - sin_parsear
+    if informar:
+        informar_fecha(etiqueta, formato, en_formato, alternas, sin_parsear)
+    if conteo is not None:
+        for clave, valor in (('en_formato', en_formato), ('alternas', alternas), ('sin_parsear', sin_parsear)):
+            conteo[clave] = conteo.get(clave, 0) + valor
+
+    # Código -1 (nulo) -> NaT
+    resultado = np.append(fechas.to_numpy(), np.datetime64('NaT', 'ns'))[codigos]
+    return pd.Series(resultado, index=serie.index, name=serie.name)
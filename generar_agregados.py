@@ -1,83 +1,622 @@
 """
 Script para pre-agregar los datos del ECU 911.
 Genera archivos pequenos con estadisticas ya calculadas para usar en Streamlit Cloud.
+
+Los datos se leen por bloques de TAMANO_BLOQUE filas: cada bloque actualiza
+conteos parciales que se pueden sumar, y al final se reducen a los archivos
+de salida. Asi la memoria no crece con los anos que se agreguen.
 """
+import argparse
+import glob
+import hashlib
+import numpy as np
 import pandas as pd
 import json
 import os
+import pickle
+
+from almacenamiento import columnas_tabla, leer_tabla_por_bloques
+from conjuntos import CONJUNTOS, conjunto_datos, conjunto_de_archivo
+from cubo import contar_cubo, guardar_cubo, tabla_cubo
+from paquete_agregados import ARCHIVO_PAQUETE, escribir_paquete
+from sketches import ResumenSketches, guardar_sketches
+from esquema import ESQUEMA_GEORREFERENCIADO, dtypes_para, parsear_fecha
+from instrumentacion import etapa
 
-# Archivo de entrada
+# Archivo de entrada (se usa el Parquet si existe)
 ARCHIVO_CSV = "datos_limpios_2021_2025.csv"
+ARCHIVO_PARQUET = "datos_limpios_2021_2025.parquet"
 CARPETA_SALIDA = "datos_agregados"
 
-def main():
-    print("Cargando datos completos...")
-    df = pd.read_csv(ARCHIVO_CSV, low_memory=False)
-    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+# Modo incremental: agregados parciales por archivo mensual + manifiesto.
+# Los archivos mensuales son los *_georreferenciado del conjunto de datos
+# (conjuntos.py) en estas carpetas
+CARPETAS_MENSUALES = [".", "../20*"]
+CARPETA_PARCIALES = "datos_parciales"
+# Subir este número si cambia lo que guarda AcumuladorAgregados (los
+# parciales de otra versión se recalculan)
+VERSION_PARCIALES = 6
+
+# Filas por bloque (None = cargar todo el archivo de una vez)
+TAMANO_BLOQUE = 1_000_000
+# Bloques cuyos conteos se guardan sin sumar antes de reducirlos con el
+# acumulado: sumar bloque a bloque realinea todo el cubo acumulado (que
+# crece con la historia) en cada bloque
+BLOQUES_POR_REDUCCION = 8
+
+# Unicas columnas que necesitan las agregaciones
+COLUMNAS_NECESARIAS = ['Fecha', 'provincia', 'Canton', 'Parroquia', 'Servicio', 'Subtipo']
+# Columna que dice de que archivo (y por su prefijo, de que conjunto de
+# datos) viene cada fila, para los agregados por conjunto
+COLUMNA_ORIGEN = 'archivo_origen'
+# Tipos al leer CSV (en Parquet ya vienen guardados)
+TIPOS_NECESARIOS = dtypes_para(COLUMNAS_NECESARIAS + [COLUMNA_ORIGEN], ESQUEMA_GEORREFERENCIADO)
+COLUMNAS_TIEMPO = ['Año', 'Mes', 'Hora', 'DiaSemana', 'Año_Mes']
+COLUMNAS_ENTERAS = ['Año', 'Mes', 'Hora', 'DiaSemana']
+# Columnas de apoyo del match INEC que no forman parte de los datos limpios
+COLUMNAS_AUXILIARES = ['prov_norm', 'canton_norm', 'parr_norm']
+
+# Conteos parciales: nombre de salida -> columnas de agrupacion
+AGRUPACIONES = {
+    'conteos_ano_mes': ['Año', 'Mes'],
+    'conteos_dia_semana': ['DiaSemana'],
+    'conteos_provincia': ['provincia'],
+    'evolucion_provincia': ['Año_Mes', 'provincia'],
+    'conteos_canton': ['Canton', 'provincia'],
+    'conteos_ano_servicio': ['Año', 'Servicio'],
+    'ranking_parroquias': ['Parroquia', 'provincia'],
+    'conteos_hora_dia': ['DiaSemana', 'Hora'],
+    'conteos_hora_servicio': ['Hora', 'Servicio'],
+    'conteos_subtipo_ano': ['Subtipo', 'Año'],
+    'conteos_subtipo_provincia': ['Subtipo', 'provincia'],
+}
+
+# Salidas por hora: se omiten si ninguna Fecha trae hora (el feed de datos
+# abiertos solo trae el dia, asi que todas quedarian en Hora=0)
+AGRUPACIONES_HORA = ['conteos_hora_dia', 'conteos_hora_servicio']
+
+# Subtipo tiene cientos de valores: en sus salidas se dejan los TOP_SUBTIPOS
+# con más incidentes y el resto se suma en OTROS_SUBTIPOS
+TOP_SUBTIPOS = 30
+OTROS_SUBTIPOS = "otros"
+
+
+def archivo_entrada():
+    return ARCHIVO_PARQUET if os.path.exists(ARCHIVO_PARQUET) else ARCHIVO_CSV
+
+
+def agregar_columnas_tiempo(df):
+    """
+    Deriva Año, Mes, Hora, DiaSemana y Año_Mes a partir de Fecha.
+    Con Fecha invalida quedan nulas (Año_Mes tambien, no "NaT"), asi esas
+    filas no entran en ningun conteo por fecha, igual que en pipeline_polars.
+    """
+    df['Fecha'] = parsear_fecha(df['Fecha'], informar=False)
     df['Año'] = df['Fecha'].dt.year
     df['Mes'] = df['Fecha'].dt.month
     df['Hora'] = df['Fecha'].dt.hour
     df['DiaSemana'] = df['Fecha'].dt.dayofweek
-    df['Año_Mes'] = df['Fecha'].dt.to_period('M').astype(str)
-    
-    total_registros = len(df)
-    print(f"Cargados {total_registros:,} registros")
-    
-    # Crear carpeta de salida
-    os.makedirs(CARPETA_SALIDA, exist_ok=True)
-    
+    df['Año_Mes'] = df['Fecha'].dt.to_period('M').astype(str).where(df['Fecha'].notna())
+    return df
+
+
+def tiene_hora(fechas):
+    """
+    True si alguna Fecha valida no es medianoche.
+    """
+    fechas = fechas.dropna()
+    return bool((fechas != fechas.dt.normalize()).any())
+
+
+def contar(df, claves):
+    """
+    Conteo por claves como Serie con indice de valores planos
+    (sin categorias y con Año/Mes/DiaSemana enteros) para poder sumarla
+    con los conteos de otros bloques.
+    """
+    tabla = df.groupby(claves, observed=True).size().reset_index(name='Cantidad')
+    for col in claves:
+        if isinstance(tabla[col].dtype, pd.CategoricalDtype):
+            tabla[col] = tabla[col].astype(object)
+        elif col in COLUMNAS_ENTERAS:
+            tabla[col] = tabla[col].astype('int64')
+    return tabla.set_index(claves)['Cantidad']
+
+
+def sumar_conteos(a, b):
+    """
+    Suma dos conteos parciales alineando por indice.
+    """
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return a.add(b, fill_value=0).astype('int64')
+
+
+def reducir_conteos(partes):
+    """
+    Suma varios conteos parciales de una vez: se concatenan y se agrupan
+    por todo el indice (una sola pasada, en lugar de realinear el acumulado
+    con cada parte como haria sumar_conteos).
+    """
+    partes = [p for p in partes if p is not None]
+    if not partes:
+        return None
+    if len(partes) == 1:
+        return partes[0]
+    juntos = pd.concat(partes)
+    niveles = list(range(juntos.index.nlevels))
+    return juntos.groupby(level=niveles, sort=False).sum().astype('int64')
+
+
+class AcumuladorAgregados:
+    """
+    Estado parcial de todas las salidas: conteos por agrupacion, cubo de
+    conteos (ver cubo.py), total de registros, conjuntos de
+    anos/provincias/servicios para metadatos, si alguna Fecha trae hora
+    (con_hora) y, con sketches=True, los
+    resumenes probabilisticos de sketches.py.
+    Se actualiza bloque a bloque y dos acumuladores se pueden combinar.
+    Los conteos de cada bloque quedan pendientes y se suman al acumulado
+    cada BLOQUES_POR_REDUCCION bloques (o al leerlos, ver reducir).
+    """
+
+    def __init__(self, sketches=False):
+        self.conteos = {nombre: None for nombre in AGRUPACIONES}
+        self.cubo = None
+        self.pendientes = {nombre: [] for nombre in AGRUPACIONES}
+        self.pendientes_cubo = []
+        self.sketches = ResumenSketches() if sketches else None
+        self.total_registros = 0
+        self.con_hora = False
+        self.anos = set()
+        self.provincias = set()
+        self.servicios = set()
+
+    def actualizar(self, df):
+        agregar_columnas_tiempo(df)
+        self.total_registros += len(df)
+        self.con_hora = self.con_hora or tiene_hora(df['Fecha'])
+        for nombre, claves in AGRUPACIONES.items():
+            self.pendientes[nombre].append(contar(df, claves))
+        self.pendientes_cubo.append(contar_cubo(df))
+        if len(self.pendientes_cubo) >= BLOQUES_POR_REDUCCION:
+            self.reducir()
+        if self.sketches is not None:
+            self.sketches.actualizar(df)
+        self.anos.update(int(x) for x in df['Año'].dropna().unique())
+        self.provincias.update(df['provincia'].dropna().unique().tolist())
+        self.servicios.update(df['Servicio'].dropna().unique().tolist())
+        return self
+
+    def reducir(self):
+        """
+        Suma los conteos pendientes al acumulado. Se llama sola antes de
+        leer, combinar o guardar (pickle) el acumulador.
+        """
+        if not self.pendientes_cubo:
+            return self
+        for nombre in AGRUPACIONES:
+            self.conteos[nombre] = reducir_conteos([self.conteos[nombre]] + self.pendientes[nombre])
+            self.pendientes[nombre] = []
+        self.cubo = reducir_conteos([self.cubo] + self.pendientes_cubo)
+        self.pendientes_cubo = []
+        return self
+
+    def __getstate__(self):
+        self.reducir()
+        return self.__dict__
+
+    def fechas_invalidas(self):
+        """
+        Registros sin Fecha valida (no entran en conteos_ano_mes).
+        """
+        self.reducir()
+        conteo = self.conteos['conteos_ano_mes']
+        return self.total_registros - (int(conteo.sum()) if conteo is not None else 0)
+
+    def combinar(self, otro):
+        self.reducir()
+        otro.reducir()
+        for nombre in AGRUPACIONES:
+            self.conteos[nombre] = sumar_conteos(self.conteos[nombre], otro.conteos[nombre])
+        self.cubo = sumar_conteos(self.cubo, otro.cubo)
+        if self.sketches is not None and otro.sketches is not None:
+            self.sketches.combinar(otro.sketches)
+        self.total_registros += otro.total_registros
+        self.con_hora = self.con_hora or otro.con_hora
+        self.anos |= otro.anos
+        self.provincias |= otro.provincias
+        self.servicios |= otro.servicios
+        return self
+
+    def tabla(self, nombre):
+        """
+        Conteo final de una agrupacion como DataFrame ordenado por claves
+        (igual que groupby(...).size().reset_index()).
+        """
+        claves = AGRUPACIONES[nombre]
+        self.reducir()
+        conteo = self.conteos[nombre]
+        if conteo is None:
+            return pd.DataFrame(columns=claves + ['Cantidad'])
+        return conteo.sort_index().reset_index(name='Cantidad')
+
+
+def recortar_top(tabla, columna, k):
+    """
+    Deja los k valores de columna con más Cantidad total y agrupa el resto
+    en OTROS_SUBTIPOS (las filas "otros" quedan al final).
+    """
+    totales = tabla.groupby(columna)['Cantidad'].sum().sort_values(ascending=False, kind='stable')
+    if len(totales) <= k:
+        return tabla
+    claves = [c for c in tabla.columns if c != 'Cantidad']
+    top = totales.index[:k]
+    tabla = tabla.copy()
+    tabla[columna] = tabla[columna].where(tabla[columna].isin(top), OTROS_SUBTIPOS)
+    tabla = tabla.groupby(claves, as_index=False, sort=True)['Cantidad'].sum()
+    return pd.concat([tabla[tabla[columna] != OTROS_SUBTIPOS], tabla[tabla[columna] == OTROS_SUBTIPOS]],
+                     ignore_index=True)
+
+
+def escribir_agregados(acumulador, columnas_fuente, paquete=False, carpeta=CARPETA_SALIDA):
+    """
+    Reduce el acumulador a los archivos de carpeta. Con paquete=True
+    además escribe todas las tablas y los metadatos en un solo archivo
+    binario (paquete_agregados.py); sin paquete se borra el de una corrida
+    anterior.
+    """
+    acumulador.reducir()
+    os.makedirs(carpeta, exist_ok=True)
+
     # 1. Conteos por Año y Mes (para heatmap temporal)
     print("Generando: conteos_ano_mes.csv")
-    conteos_año_mes = df.groupby(['Año', 'Mes']).size().reset_index(name='Cantidad')
-    conteos_año_mes.to_csv(f"{CARPETA_SALIDA}/conteos_ano_mes.csv", index=False)
-    
+    conteos_año_mes = acumulador.tabla('conteos_ano_mes')
+    conteos_año_mes.to_csv(f"{carpeta}/conteos_ano_mes.csv", index=False)
+
     # 2. Conteos por dia de la semana
     print("Generando: conteos_dia_semana.csv")
-    conteos_dia = df.groupby('DiaSemana').size().reset_index(name='Cantidad')
-    conteos_dia.to_csv(f"{CARPETA_SALIDA}/conteos_dia_semana.csv", index=False)
-    
+    conteos_dia = acumulador.tabla('conteos_dia_semana')
+    conteos_dia.to_csv(f"{carpeta}/conteos_dia_semana.csv", index=False)
+
     # 3. Conteos por provincia
     print("Generando: conteos_provincia.csv")
-    conteos_provincia = df['provincia'].value_counts().reset_index()
+    conteos_provincia = acumulador.tabla('conteos_provincia')
+    conteos_provincia = conteos_provincia.sort_values('Cantidad', ascending=False, kind='stable')
     conteos_provincia.columns = ['Provincia', 'Cantidad']
-    conteos_provincia.to_csv(f"{CARPETA_SALIDA}/conteos_provincia.csv", index=False)
-    
+    conteos_provincia.to_csv(f"{carpeta}/conteos_provincia.csv", index=False)
+
     # 4. Evolucion por provincia y mes
     print("Generando: evolucion_provincia.csv")
-    evolucion = df.groupby(['Año_Mes', 'provincia']).size().reset_index(name='Cantidad')
-    evolucion.to_csv(f"{CARPETA_SALIDA}/evolucion_provincia.csv", index=False)
-    
+    evolucion = acumulador.tabla('evolucion_provincia')
+    evolucion.to_csv(f"{carpeta}/evolucion_provincia.csv", index=False)
+
     # 5. Conteos por canton y provincia
     print("Generando: conteos_canton.csv")
-    conteos_canton = df.groupby(['Canton', 'provincia']).size().reset_index(name='Cantidad')
-    conteos_canton.to_csv(f"{CARPETA_SALIDA}/conteos_canton.csv", index=False)
-    
+    conteos_canton = acumulador.tabla('conteos_canton')
+    conteos_canton.to_csv(f"{carpeta}/conteos_canton.csv", index=False)
+
     # 6. Conteos por ano y servicio
     print("Generando: conteos_ano_servicio.csv")
-    conteos_año_servicio = df.groupby(['Año', 'Servicio']).size().reset_index(name='Cantidad')
-    conteos_año_servicio.to_csv(f"{CARPETA_SALIDA}/conteos_ano_servicio.csv", index=False)
-    
+    conteos_año_servicio = acumulador.tabla('conteos_ano_servicio')
+    conteos_año_servicio.to_csv(f"{carpeta}/conteos_ano_servicio.csv", index=False)
+
     # 7. Ranking de parroquias
     print("Generando: ranking_parroquias.csv")
-    ranking = df.groupby(['Parroquia', 'provincia']).size().reset_index(name='Cantidad')
+    ranking = acumulador.tabla('ranking_parroquias')
     ranking = ranking.sort_values('Cantidad', ascending=False)
-    ranking.to_csv(f"{CARPETA_SALIDA}/ranking_parroquias.csv", index=False)
-    
+    ranking.to_csv(f"{carpeta}/ranking_parroquias.csv", index=False)
+
     # 8. Metadatos generales
     print("Generando: metadatos.json")
     metadatos = {
-        "total_registros": int(total_registros),
-        "anos": sorted([int(x) for x in df['Año'].dropna().unique().tolist()]),
-        "provincias": int(df['provincia'].nunique()),
-        "servicios": int(df['Servicio'].nunique()),
-        "columnas": df.columns.tolist()
+        "total_registros": int(acumulador.total_registros),
+        "anos": sorted(acumulador.anos),
+        "provincias": len(acumulador.provincias),
+        "servicios": len(acumulador.servicios),
+        "columnas": columnas_fuente + COLUMNAS_TIEMPO,
+        "con_hora": acumulador.con_hora
     }
-    with open(f"{CARPETA_SALIDA}/metadatos.json", "w", encoding="utf-8") as f:
+    with open(f"{carpeta}/metadatos.json", "w", encoding="utf-8") as f:
         json.dump(metadatos, f, ensure_ascii=False, indent=2)
-    
+
+    # 9-10. Heatmap hora x dia de la semana y conteos por hora y servicio
+    # (solo si Fecha trae hora; si no, se borran los de una corrida anterior)
+    tablas_hora = {}
+    for nombre in AGRUPACIONES_HORA:
+        ruta = f"{carpeta}/{nombre}.csv"
+        if acumulador.con_hora:
+            print(f"Generando: {nombre}.csv")
+            tablas_hora[nombre] = acumulador.tabla(nombre)
+            tablas_hora[nombre].to_csv(ruta, index=False)
+        elif os.path.exists(ruta):
+            os.remove(ruta)
+    if not acumulador.con_hora:
+        print(f"[AVISO] Fecha sin hora (todas a medianoche): se omiten {', '.join(AGRUPACIONES_HORA)}")
+
+    # 11. Subtipo por ano (top TOP_SUBTIPOS)
+    print("Generando: conteos_subtipo_ano.csv")
+    conteos_subtipo_ano = recortar_top(acumulador.tabla('conteos_subtipo_ano'), 'Subtipo', TOP_SUBTIPOS)
+    conteos_subtipo_ano.to_csv(f"{carpeta}/conteos_subtipo_ano.csv", index=False)
+
+    # 12. Subtipo por provincia (top TOP_SUBTIPOS)
+    print("Generando: conteos_subtipo_provincia.csv")
+    conteos_subtipo_provincia = recortar_top(acumulador.tabla('conteos_subtipo_provincia'), 'Subtipo', TOP_SUBTIPOS)
+    conteos_subtipo_provincia.to_csv(f"{carpeta}/conteos_subtipo_provincia.csv", index=False)
+
+    # 13. Cubo de conteos para consultas interactivas (cubo.py)
+    if acumulador.cubo is not None:
+        print("Generando: cubo_conteos.parquet")
+        guardar_cubo(acumulador.cubo, carpeta)
+
+    # 14. Sketches (distintos y top-K aproximados, ver sketches.py)
+    if acumulador.sketches is not None:
+        print("Generando: sketches.pkl")
+        guardar_sketches(acumulador.sketches, carpeta)
+        for nombre in ('parroquia', 'canton', 'subtipo'):
+            print(f"   ~{acumulador.sketches.distintos(nombre):,} valores distintos de {nombre}")
+
+    # 15. Paquete binario con todas las tablas + metadatos
+    if paquete:
+        print("Generando: agregados.ecu911")
+        tablas = {
+            'conteos_ano_mes': conteos_año_mes,
+            'conteos_dia_semana': conteos_dia,
+            'conteos_provincia': conteos_provincia,
+            'evolucion_provincia': evolucion,
+            'conteos_canton': conteos_canton,
+            'conteos_ano_servicio': conteos_año_servicio,
+            'ranking_parroquias': ranking,
+            **tablas_hora,
+            'conteos_subtipo_ano': conteos_subtipo_ano,
+            'conteos_subtipo_provincia': conteos_subtipo_provincia,
+        }
+        if acumulador.cubo is not None:
+            tablas['cubo_conteos'] = tabla_cubo(acumulador.cubo)
+        escribir_paquete(tablas, metadatos, carpeta)
+    elif os.path.exists(f"{carpeta}/{ARCHIVO_PAQUETE}"):
+        # El de una corrida anterior ya no coincide con los CSV (y el
+        # dashboard lo preferiria)
+        os.remove(f"{carpeta}/{ARCHIVO_PAQUETE}")
+        print(f"[AVISO] Se borro {ARCHIVO_PAQUETE} de una corrida anterior (use --paquete para regenerarlo)")
+
+
+def buscar_archivos_mensuales(conjunto="emergencias"):
+    """
+    Archivos mensuales georreferenciados del conjunto de datos (sin los
+    *_completo_* anuales, que contarian dos veces los mismos registros).
+    Si un mes existe en CSV y en Parquet se usa el Parquet.
+    """
+    patrones = [patron for carpeta in CARPETAS_MENSUALES
+                for patron in conjunto_datos(conjunto).patrones_georreferenciados(carpeta)]
+    por_nombre = {}
+    for patron in patrones:
+        for archivo in glob.glob(patron):
+            if "_completo_" not in archivo:
+                por_nombre[os.path.splitext(archivo)[0]] = archivo
+    return sorted(por_nombre.values())
+
+
+def hash_archivo(ruta):
+    h = hashlib.sha256()
+    if os.path.isdir(ruta):
+        partes = sorted(glob.glob(os.path.join(ruta, '**', '*.parquet'), recursive=True))
+    else:
+        partes = [ruta]
+    for parte in partes:
+        with open(parte, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(bloque)
+    return h.hexdigest()
+
+
+def firma_archivo(ruta):
+    estado = os.stat(ruta)
+    return {"tamano": estado.st_size, "mtime": estado.st_mtime}
+
+
+def ruta_manifiesto(carpeta=CARPETA_PARCIALES):
+    return f"{carpeta}/manifiesto.json"
+
+
+def cargar_manifiesto(carpeta=CARPETA_PARCIALES):
+    if not os.path.exists(ruta_manifiesto(carpeta)):
+        return {}
+    with open(ruta_manifiesto(carpeta), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def guardar_manifiesto(manifiesto, carpeta=CARPETA_PARCIALES):
+    os.makedirs(carpeta, exist_ok=True)
+    temporal = f"{ruta_manifiesto(carpeta)}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta_manifiesto(carpeta))
+
+
+def ruta_parcial(archivo, carpeta=CARPETA_PARCIALES):
+    clave = hashlib.sha1(os.path.abspath(archivo).encode("utf-8")).hexdigest()[:16]
+    return f"{carpeta}/{clave}.pkl"
+
+
+def necesita_proceso(archivo, entrada, sketches=False):
+    """
+    Decide si un archivo mensual debe (re)procesarse comparando con su
+    entrada del manifiesto: tamano/mtime primero y, si solo cambio el mtime,
+    el hash del contenido. Tambien se reprocesa si se piden sketches y el
+    parcial no los tiene. Devuelve (procesar, firma_actual).
+    """
+    firma = firma_archivo(archivo)
+    if entrada is None or not os.path.exists(entrada["parcial"]):
+        return True, firma
+    if entrada.get("version") != VERSION_PARCIALES:
+        return True, firma
+    if sketches and not entrada.get("sketches", False):
+        return True, firma
+    if firma["tamano"] == entrada["tamano"] and firma["mtime"] == entrada["mtime"]:
+        return False, dict(firma, sha256=entrada["sha256"])
+    if firma["tamano"] == entrada["tamano"]:
+        firma["sha256"] = hash_archivo(archivo)
+        return firma["sha256"] != entrada["sha256"], firma
+    return True, firma
+
+
+def agregar_archivo(archivo, tamano_bloque, sketches=False):
+    """
+    Agregados parciales de un solo archivo (mismo recorrido por bloques que main).
+    """
+    acumulador = AcumuladorAgregados(sketches)
+    bloques = leer_tabla_por_bloques(
+        archivo, columnas=COLUMNAS_NECESARIAS, tamano_bloque=tamano_bloque,
+        dtype=dtypes_para(COLUMNAS_NECESARIAS, TIPOS_NECESARIOS), low_memory=False
+    )
+    with etapa("agregar_archivo", archivo) as paso:
+        for bloque in bloques:
+            acumulador.actualizar(bloque)
+        paso.contar(entrada=acumulador.total_registros)
+    return acumulador
+
+
+def actualizar_incremental(tamano_bloque=TAMANO_BLOQUE, sketches=False, paquete=False, conjunto=None):
+    """
+    Refresca datos_agregados/ procesando solo los archivos mensuales nuevos o
+    modificados. Cada archivo guarda su AcumuladorAgregados en
+    CARPETA_PARCIALES y el manifiesto registra nombre, tamano, mtime y hash;
+    al final se combinan todos los parciales y se reescriben las salidas.
+    Sin conjunto se usan los archivos de emergencias; con conjunto, los de
+    ese conjunto de datos, con sus propias carpetas de parciales y de
+    agregados (conjuntos.py).
+    """
+    if conjunto is None:
+        nombre, carpeta_parciales, carpeta_salida = "emergencias", CARPETA_PARCIALES, CARPETA_SALIDA
+    else:
+        datos = conjunto_datos(conjunto)
+        nombre, carpeta_parciales, carpeta_salida = datos.nombre, datos.carpeta_parciales, datos.carpeta_agregados
+    archivos = buscar_archivos_mensuales(nombre)
+    if not archivos:
+        print(f"No se encontraron archivos *_georreferenciado de {nombre}")
+        return
+
+    manifiesto = cargar_manifiesto(carpeta_parciales)
+    nuevo_manifiesto = {}
+    procesados = 0
+
+    for archivo in archivos:
+        entrada = manifiesto.get(archivo)
+        procesar, firma = necesita_proceso(archivo, entrada, sketches)
+        if not procesar:
+            nuevo_manifiesto[archivo] = dict(entrada, **firma)
+            continue
+
+        print(f"Procesando (nuevo/modificado): {archivo}")
+        acumulador = agregar_archivo(archivo, tamano_bloque, sketches)
+        columnas = [c for c in columnas_tabla(archivo) if c not in COLUMNAS_AUXILIARES]
+        parcial = ruta_parcial(archivo, carpeta_parciales)
+        os.makedirs(carpeta_parciales, exist_ok=True)
+        with open(parcial, "wb") as f:
+            pickle.dump({"acumulador": acumulador, "columnas": columnas}, f)
+
+        firma.setdefault("sha256", hash_archivo(archivo))
+        nuevo_manifiesto[archivo] = dict(firma, parcial=parcial, registros=acumulador.total_registros,
+                                         version=VERSION_PARCIALES, sketches=sketches)
+        procesados += 1
+
+    # Archivos que ya no existen: se descartan sus parciales
+    for archivo, entrada in manifiesto.items():
+        if archivo not in nuevo_manifiesto and os.path.exists(entrada["parcial"]):
+            print(f"Descartando parcial de archivo eliminado: {archivo}")
+            os.remove(entrada["parcial"])
+
+    guardar_manifiesto(nuevo_manifiesto, carpeta_parciales)
+    print(f"Archivos procesados: {procesados} de {len(archivos)}")
+
+    # Reduce: combinar todos los parciales
+    total = AcumuladorAgregados(sketches)
+    columnas_fuente = None
+    for archivo in archivos:
+        with open(nuevo_manifiesto[archivo]["parcial"], "rb") as f:
+            parcial = pickle.load(f)
+        total.combinar(parcial["acumulador"])
+        if columnas_fuente is None:
+            columnas_fuente = parcial["columnas"]
+        else:
+            columnas_fuente = [c for c in columnas_fuente if c in parcial["columnas"]]
+
+    print(f"Total acumulado: {total.total_registros:,} registros "
+          f"({total.fechas_invalidas():,} sin Fecha valida)")
+    with etapa("escribir_agregados", filas_entrada=total.total_registros):
+        escribir_agregados(total, columnas_fuente, paquete, carpeta_salida)
+    print(f"\nAgregados actualizados en: {carpeta_salida}/")
+
+
+def conjuntos_de_filas(origen):
+    """
+    Nombre del conjunto de datos de cada fila segun el prefijo de su
+    archivo_origen (se resuelve una vez por valor distinto; sin origen,
+    emergencias).
+    """
+    origen = origen.astype('category')
+    nombres = [conjunto_de_archivo(str(valor)).nombre for valor in origen.cat.categories]
+    nombres.append(conjunto_de_archivo("").nombre)
+    return np.array(nombres, dtype=object)[origen.cat.codes.to_numpy()]
+
+
+def main(tamano_bloque=TAMANO_BLOQUE, sketches=False, paquete=False, por_conjunto=False):
+    """
+    Agregados de todos los datos en CARPETA_SALIDA. Con por_conjunto=True,
+    en la misma pasada, tambien los de cada conjunto de datos (segun
+    archivo_origen) en su carpeta_agregados; los totales salen de combinar
+    los acumuladores de cada conjunto, asi cada fila se agrega una sola vez.
+    """
+    archivo = archivo_entrada()
+    print(f"Cargando datos completos ({archivo}) por bloques de {tamano_bloque or 'todas las'} filas...")
+    columnas_fuente = columnas_tabla(archivo)
+    if por_conjunto and COLUMNA_ORIGEN not in columnas_fuente:
+        print(f"[AVISO] {archivo} no tiene {COLUMNA_ORIGEN}: no se separan los conjuntos de datos")
+        por_conjunto = False
+
+    acumulador = AcumuladorAgregados(sketches)
+    acumuladores = {}
+    columnas = COLUMNAS_NECESARIAS + ([COLUMNA_ORIGEN] if por_conjunto else [])
+    bloques = leer_tabla_por_bloques(
+        archivo, columnas=columnas, tamano_bloque=tamano_bloque,
+        dtype=TIPOS_NECESARIOS, low_memory=False
+    )
+    registros = 0
+    for i, bloque in enumerate(bloques, 1):
+        with etapa("agregar", archivo, len(bloque)):
+            if por_conjunto:
+                etiquetas = conjuntos_de_filas(bloque.pop(COLUMNA_ORIGEN))
+                distintos = pd.unique(etiquetas)
+                partes = ([(distintos[0], bloque)] if len(distintos) == 1
+                          else bloque.groupby(etiquetas, sort=False))
+                for nombre, parte in partes:
+                    acumuladores.setdefault(nombre, AcumuladorAgregados(sketches)).actualizar(parte)
+            else:
+                acumulador.actualizar(bloque)
+        registros += len(bloque)
+        print(f"   Bloque {i}: {registros:,} registros acumulados")
+
+    for nombre in sorted(acumuladores):
+        acumulador.combinar(acumuladores[nombre])
+
+    print(f"Cargados {acumulador.total_registros:,} registros "
+          f"({acumulador.fechas_invalidas():,} sin Fecha valida)")
+
+    with etapa("escribir_agregados", filas_entrada=acumulador.total_registros):
+        escribir_agregados(acumulador, columnas_fuente, paquete)
+
+    for nombre, parcial in sorted(acumuladores.items()):
+        carpeta = conjunto_datos(nombre).carpeta_agregados
+        print(f"\nConjunto {nombre}: {parcial.total_registros:,} registros -> {carpeta}/")
+        with etapa("escribir_agregados", carpeta, parcial.total_registros):
+            escribir_agregados(parcial, columnas_fuente, paquete, carpeta)
+
     print("\nAgregacion completada!")
     print(f"Archivos generados en: {CARPETA_SALIDA}/")
-    
+
     # Mostrar tamano de archivos
     total_size = 0
     for archivo in os.listdir(CARPETA_SALIDA):
@@ -87,4 +626,21 @@ def main():
     print(f"\nTamano total: {total_size/1024:.1f} KB (vs ~2 GB original)")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Pre-agrega los datos del ECU 911")
+    parser.add_argument("--incremental", action="store_true",
+                        help="procesar solo archivos mensuales nuevos o modificados")
+    parser.add_argument("--bloque", type=int, default=TAMANO_BLOQUE,
+                        help="filas por bloque de lectura")
+    parser.add_argument("--sketches", action="store_true",
+                        help="ademas construir los sketches (HLL, Count-Min, Space-Saving)")
+    parser.add_argument("--paquete", action="store_true",
+                        help="ademas escribir todos los agregados en un solo archivo binario (agregados.ecu911)")
+    parser.add_argument("--por-conjunto", action="store_true",
+                        help="ademas agregados por conjunto de datos (emergencias, eventos) en su carpeta")
+    parser.add_argument("--conjunto", choices=list(CONJUNTOS), default=None,
+                        help="con --incremental, usar los archivos mensuales de este conjunto de datos")
+    args = parser.parse_args()
+    if args.incremental:
+        actualizar_incremental(args.bloque, args.sketches, args.paquete, args.conjunto)
+    else:
+        main(args.bloque, args.sketches, args.paquete, args.por_conjunto)
@@ -0,0 +1,226 @@
+"""
+Instrumentación por etapa de los scripts del pipeline del ECU 911.
+
+Cada etapa se envuelve en un bloque with:
+
+    with etapa("limpiar", archivo=ruta, filas_entrada=len(df)) as paso:
+        df = clean_emergencias(df)
+        paso.contar(salida=len(df))
+
+y al cerrar se registra tiempo de reloj, tiempo de CPU, filas de entrada y
+salida, filas/s y pico de RSS de la etapa (las etapas se pueden anidar).
+
+Se activa con variables de entorno; sin ellas etapa() devuelve un objeto
+vacío y el costo es una comparación por etapa:
+- ECU911_PERFIL=<ruta.jsonl>: una línea JSON por etapa agregada al archivo
+  ("-" para escribirlas en stderr)
+- ECU911_TRAZA=<ruta.json>: además una traza en formato Chrome
+  (chrome://tracing o https://ui.perfetto.dev), que se reinicia en cada
+  ejecución; los procesos worker agregan sus etapas a la misma traza
+"""
+import contextlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+VARIABLE_PERFIL = "ECU911_PERFIL"
+VARIABLE_TRAZA = "ECU911_TRAZA"
+# La fija el primer proceso instrumentado; los workers la heredan y no
+# reinician la traza
+VARIABLE_RAIZ = "ECU911_PERFIL_RAIZ"
+
+RUTA_PERFIL = os.environ.get(VARIABLE_PERFIL) or None
+RUTA_TRAZA = os.environ.get(VARIABLE_TRAZA) or None
+# Rutas absolutas: los scripts pueden cambiar de carpeta
+if RUTA_PERFIL and RUTA_PERFIL != "-":
+    RUTA_PERFIL = os.path.abspath(RUTA_PERFIL)
+if RUTA_TRAZA:
+    RUTA_TRAZA = os.path.abspath(RUTA_TRAZA)
+ACTIVO = RUTA_PERFIL is not None or RUTA_TRAZA is not None
+
+
+# ============================================================
+# 2. MEMORIA DEL PROCESO
+# ============================================================
+
+def reiniciar_pico_rss() -> None:
+    """
+    Reinicia el pico de RSS del proceso (Linux); en otros sistemas el pico
+    cuenta desde el arranque del proceso.
+    """
+    with contextlib.suppress(OSError):
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+
+
+def memoria_mb(campo: str = "VmHWM") -> float:
+    """
+    VmHWM (pico) o VmRSS (actual) en MB; sin /proc se usa ru_maxrss.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith(campo + ":"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en KB en Linux y en bytes en macOS
+    return pico / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+# ============================================================
+# 3. ETAPAS
+# ============================================================
+
+class _EtapaNula:
+    """
+    Lo que devuelve etapa() con la instrumentación apagada.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> "_EtapaNula":
+        return self
+
+    def __exit__(self, tipo, error, traza) -> None:
+        return None
+
+    def contar(self, entrada: int = None, salida: int = None) -> None:
+        return None
+
+
+_NULA = _EtapaNula()
+_pila = threading.local()
+
+
+class Etapa:
+    """
+    Mide una etapa. El pico de RSS se reinicia al entrar y, al salir, el
+    pico de la etapa se pasa a la etapa que la contiene.
+    """
+
+    def __init__(self, nombre: str, archivo: str = None, filas_entrada: int = None):
+        self.nombre = nombre
+        self.archivo = archivo
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.pico_mb = 0.0
+
+    def contar(self, entrada: int = None, salida: int = None) -> None:
+        if entrada is not None:
+            self.filas_entrada = entrada
+        if salida is not None:
+            self.filas_salida = salida
+
+    def __enter__(self) -> "Etapa":
+        pila = _pila.__dict__.setdefault("etapas", [])
+        if pila:
+            pila[-1].pico_mb = max(pila[-1].pico_mb, memoria_mb())
+        pila.append(self)
+        reiniciar_pico_rss()
+        self.inicio_us = time.time_ns() // 1000
+        self.reloj = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, tipo, error, traza) -> None:
+        segundos = time.perf_counter() - self.reloj
+        cpu = time.process_time() - self.cpu
+        self.pico_mb = max(self.pico_mb, memoria_mb())
+        pila = _pila.etapas
+        pila.pop()
+        if pila:
+            pila[-1].pico_mb = max(pila[-1].pico_mb, self.pico_mb)
+
+        filas = self.filas_entrada if self.filas_entrada is not None else self.filas_salida
+        evento = {
+            "etapa": self.nombre,
+            "archivo": os.path.basename(self.archivo) if self.archivo else None,
+            "padre": pila[-1].nombre if pila else None,
+            "segundos": round(segundos, 4),
+            "cpu_segundos": round(cpu, 4),
+            "filas_entrada": self.filas_entrada,
+            "filas_salida": self.filas_salida,
+            "filas_por_s": round(filas / segundos, 1) if filas and segundos > 0 else None,
+            "rss_pico_mb": round(self.pico_mb, 1),
+            "pid": os.getpid(),
+            "error": tipo.__name__ if tipo is not None else None,
+        }
+        _emitir(evento, self.inicio_us)
+
+
+def etapa(nombre: str, archivo: str = None, filas_entrada: int = None):
+    """
+    Context manager que mide una etapa (o no hace nada si la
+    instrumentación está apagada).
+    """
+    if not ACTIVO:
+        return _NULA
+    return Etapa(nombre, archivo, filas_entrada)
+
+
+# ============================================================
+# 4. SALIDA (JSON LINES Y TRAZA CHROME)
+# ============================================================
+
+_lock = threading.Lock()
+
+
+def _emitir(evento: dict, inicio_us: int) -> None:
+    with _lock:
+        if RUTA_PERFIL == "-":
+            print(json.dumps(evento, ensure_ascii=False), file=sys.stderr, flush=True)
+        elif RUTA_PERFIL:
+            # Una sola escritura por línea en modo append: los workers
+            # pueden compartir el archivo
+            with open(RUTA_PERFIL, "a", encoding="utf-8") as f:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        if RUTA_TRAZA:
+            _escribir_traza(evento, inicio_us)
+
+
+def _escribir_traza(evento: dict, inicio_us: int) -> None:
+    """
+    Evento "X" (completo) del formato de trazas de Chrome. Se usa la forma
+    de arreglo JSON, en la que el ']' final es opcional, así cada proceso
+    solo agrega líneas.
+    """
+    nombre = evento["etapa"] if not evento["archivo"] else f"{evento['etapa']} ({evento['archivo']})"
+    argumentos = {k: v for k, v in evento.items()
+                  if k not in ("etapa", "pid", "segundos") and v is not None}
+    linea = json.dumps({
+        "name": nombre,
+        "cat": "ecu911",
+        "ph": "X",
+        "ts": inicio_us,
+        "dur": max(1, int(evento["segundos"] * 1_000_000)),
+        "pid": evento["pid"],
+        "tid": threading.get_ident() % 1_000_000,
+        "args": argumentos,
+    }, ensure_ascii=False)
+    with open(RUTA_TRAZA, "a", encoding="utf-8") as f:
+        f.write(linea + ",\n")
+
+
+def _iniciar_traza() -> None:
+    """
+    En el proceso raíz la traza empieza vacía ('[') en cada ejecución.
+    """
+    if os.environ.get(VARIABLE_RAIZ):
+        return
+    os.environ[VARIABLE_RAIZ] = str(os.getpid())
+    with open(RUTA_TRAZA, "w", encoding="utf-8") as f:
+        f.write("[\n")
+
+
+if RUTA_TRAZA:
+    _iniciar_traza()
+
@@ -0,0 +1,119 @@
+"""
+Motor de normalización de texto para nombres geográficos del ECU 911.
+
+En lugar de llamar a norm_nombre fila por fila (Series.apply), cada columna se
+factoriza a sus valores únicos, solo esos valores se normalizan (una vez, con
+una tabla memo que persiste entre columnas y archivos) y el resultado se
+reconstruye con los códigos enteros. El costo depende de los pocos miles de
+nombres distintos y no de los millones de filas.
+"""
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+
+# ============================================================
+# 1. NORMALIZACIÓN DE UN VALOR
+# ============================================================
+
+PROVINCIAS_INVALIDAS = ['0', 'zona no delimitada']
+
+
+def norm_nombre(s):
+    """
+    Normaliza nombres de provincia/cantón/parroquia:
+    - strip espacios
+    - colapsa espacios múltiples
+    - quita acentos
+    - pasa a minúsculas
+    """
+    if pd.isna(s):
+        return None
+    s = str(s).strip()
+    s = " ".join(s.split())
+    s = unidecode(s).lower()
+    return s
+
+
+def norm_provincia(s):
+    """
+    Normaliza provincia y convierte a None si es '0' o 'zona no delimitada'.
+    """
+    s_norm = norm_nombre(s)
+    if s_norm in PROVINCIAS_INVALIDAS:
+        return None
+    return s_norm
+
+
+# ============================================================
+# 2. NORMALIZACIÓN VECTORIZADA POR VALORES ÚNICOS
+# ============================================================
+
+class NormalizadorTexto:
+    """
+    Aplica una función de normalización a una Serie completa trabajando solo
+    sobre sus valores distintos.
+
+    - pd.factorize convierte la columna en códigos enteros + valores únicos
+    - cada valor único se busca en la tabla memo (o se normaliza y se guarda)
+    - el resultado se arma con un take sobre los códigos (NaN -> None)
+
+    El resultado es idéntico a serie.apply(funcion). Si la columna es
+    category el resultado también lo es (mismos valores).
+    """
+
+    def __init__(self, funcion):
+        self.funcion = funcion
+        self.memo = {}
+
+    def normalizar_valores(self, valores) -> list:
+        """
+        Normaliza una secuencia de valores usando la tabla memo.
+        La clave incluye el tipo para no confundir 1, 1.0 y True.
+        """
+        memo = self.memo
+        funcion = self.funcion
+        resultado = []
+        for valor in valores:
+            clave = (type(valor), valor)
+            try:
+                norm = memo[clave]
+            except KeyError:
+                norm = memo[clave] = funcion(valor)
+            resultado.append(norm)
+        return resultado
+
+    def __call__(self, serie: pd.Series) -> pd.Series:
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            return self.normalizar_categorica(serie)
+
+        codigos, unicos = pd.factorize(serie)
+        if serie.dtype == object and pd.api.types.infer_dtype(unicos) not in ('string', 'empty'):
+            # factorize une 1, 1.0 y True; norm_nombre usa str(s), así que
+            # factorizar la representación en texto da el mismo resultado
+            serie_txt = serie.astype(str).where(serie.notna(), None)
+            codigos, unicos = pd.factorize(serie_txt)
+        normalizados = self.normalizar_valores(unicos)
+        # El último elemento (None) es el destino del código -1 (valores nulos)
+        tabla = np.array(normalizados + [None], dtype=object)
+        return pd.Series(tabla[codigos], index=serie.index, name=serie.name, dtype=object)
+
+    def normalizar_categorica(self, serie: pd.Series) -> pd.Series:
+        """
+        Versión para columnas category: se normalizan las categorías y se
+        remapean los códigos, sin pasar por objetos str por fila. Categorías
+        que quedan iguales tras normalizar ('Guayas', 'GUAYAS') se unen.
+        """
+        categorias = serie.cat.categories
+        normalizados = pd.Series(self.normalizar_valores(categorias), dtype=object)
+        nuevos_codigos, nuevas_categorias = pd.factorize(normalizados)
+        # -1 (nulo) se mantiene como -1
+        remapeo = np.append(nuevos_codigos, -1)
+        codigos = remapeo[serie.cat.codes.to_numpy()]
+        datos = pd.Categorical.from_codes(codigos, categories=pd.Index(nuevas_categorias, dtype=object))
+        return pd.Series(datos, index=serie.index, name=serie.name)
+
+
+# Instancias compartidas: la tabla memo persiste durante todo el proceso
+normalizar_nombres = NormalizadorTexto(norm_nombre)
+normalizar_provincias = NormalizadorTexto(norm_provincia)
@@ -0,0 +1,207 @@
+"""
+Paquete binario único con todos los agregados del dashboard.
+
+En lugar de los CSV + metadatos.json + cubo de datos_agregados/, un solo
+archivo (datos_agregados/agregados.ecu911) que se publica, descarga y
+valida de una vez. Formato:
+
+    MAGIA (8 bytes) | versión (uint32) | largo del encabezado (uint32)
+    encabezado JSON: versión, metadatos, sha256 del cuerpo y, por tabla,
+                     desplazamiento / largo / filas
+    cuerpo: una tabla Arrow IPC por agregado, alineada a 64 bytes
+
+El lector abre el archivo con mmap (pyarrow.memory_map) y cada tabla es un
+slice del mismo buffer: no se parsea texto y las páginas las comparte el
+sistema operativo, así el arranque en frío solo toca lo que se consulta.
+"""
+import argparse
+import hashlib
+import json
+import os
+import struct
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+CARPETA_PAQUETE = "datos_agregados"
+ARCHIVO_PAQUETE = "agregados.ecu911"
+MAGIA = b"ECU911AG"
+# Subir si cambia el formato del archivo (los paquetes de otra versión se rechazan)
+VERSION_PAQUETE = 1
+ALINEACION = 64
+
+# Tablas que conservan las columnas de texto como diccionario (category);
+# las demás se leen como texto plano, igual que desde los CSV
+TABLAS_DICCIONARIO = {'cubo_conteos'}
+
+_CABECERA = struct.Struct("<8sII")
+
+
+def _relleno(largo: int) -> bytes:
+    return b"\0" * (-largo % ALINEACION)
+
+
+def _tabla_arrow(nombre: str, df: pd.DataFrame) -> pa.Table:
+    if nombre not in TABLAS_DICCIONARIO:
+        categoricas = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+        if categoricas:
+            df = df.astype({c: object for c in categoricas})
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _serializar(tabla: pa.Table) -> bytes:
+    sumidero = pa.BufferOutputStream()
+    with ipc.new_file(sumidero, tabla.schema) as escritor:
+        escritor.write_table(tabla)
+    return sumidero.getvalue().to_pybytes()
+
+
+# ============================================================
+# 2. ESCRITURA
+# ============================================================
+
+def escribir_paquete(tablas: dict, metadatos: dict, carpeta: str = CARPETA_PAQUETE) -> str:
+    """
+    Escribe {nombre: DataFrame} + metadatos en un solo archivo. Se escribe
+    en un temporal y se reemplaza al final, así un lector nunca ve un
+    paquete a medias.
+    """
+    cuerpo = []
+    indice = {}
+    desplazamiento = 0
+    for nombre, df in tablas.items():
+        bloque = _serializar(_tabla_arrow(nombre, df))
+        indice[nombre] = {"desplazamiento": desplazamiento, "largo": len(bloque), "filas": len(df)}
+        bloque += _relleno(len(bloque))
+        cuerpo.append(bloque)
+        desplazamiento += len(bloque)
+
+    sha = hashlib.sha256()
+    for bloque in cuerpo:
+        sha.update(bloque)
+    encabezado = json.dumps({
+        "version": VERSION_PAQUETE,
+        "metadatos": metadatos,
+        "tablas": indice,
+        "sha256": sha.hexdigest(),
+    }, ensure_ascii=False).encode("utf-8")
+    encabezado += b" " * (-(_CABECERA.size + len(encabezado)) % ALINEACION)
+
+    ruta = os.path.join(carpeta, ARCHIVO_PAQUETE)
+    temporal = f"{ruta}.tmp{os.getpid()}"
+    with open(temporal, "wb") as f:
+        f.write(_CABECERA.pack(MAGIA, VERSION_PAQUETE, len(encabezado)))
+        f.write(encabezado)
+        for bloque in cuerpo:
+            f.write(bloque)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+# ============================================================
+# 3. LECTURA
+# ============================================================
+
+class PaqueteAgregados:
+    """
+    Paquete abierto con mmap. tabla_arrow no copia datos; tabla devuelve el
+    DataFrame (con category en las tablas de TABLAS_DICCIONARIO).
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.buffer = pa.memory_map(ruta, "r").read_buffer()
+        if self.buffer.size < _CABECERA.size:
+            raise ValueError(f"{ruta}: archivo demasiado corto")
+        magia, version, largo = _CABECERA.unpack(self.buffer.slice(0, _CABECERA.size).to_pybytes())
+        if magia != MAGIA:
+            raise ValueError(f"{ruta}: no es un paquete de agregados")
+        if version != VERSION_PAQUETE:
+            raise ValueError(f"{ruta}: versión {version}, se esperaba {VERSION_PAQUETE}")
+        inicio = _CABECERA.size + largo
+        if inicio > self.buffer.size:
+            raise ValueError(f"{ruta}: encabezado truncado")
+        self.encabezado = json.loads(self.buffer.slice(_CABECERA.size, largo).to_pybytes())
+        self.cuerpo = self.buffer.slice(inicio)
+        for nombre, entrada in self.encabezado["tablas"].items():
+            if entrada["desplazamiento"] + entrada["largo"] > self.cuerpo.size:
+                raise ValueError(f"{ruta}: la tabla {nombre} está truncada")
+
+    @staticmethod
+    def existe(carpeta: str = CARPETA_PAQUETE) -> bool:
+        return os.path.exists(os.path.join(carpeta, ARCHIVO_PAQUETE))
+
+    @classmethod
+    def abrir(cls, carpeta: str = CARPETA_PAQUETE) -> "PaqueteAgregados":
+        return cls(os.path.join(carpeta, ARCHIVO_PAQUETE))
+
+    @property
+    def metadatos(self) -> dict:
+        return self.encabezado["metadatos"]
+
+    def nombres(self) -> list:
+        return list(self.encabezado["tablas"])
+
+    def tabla_arrow(self, nombre: str) -> pa.Table:
+        entrada = self.encabezado["tablas"][nombre]
+        bloque = self.cuerpo.slice(entrada["desplazamiento"], entrada["largo"])
+        return ipc.open_file(bloque).read_all()
+
+    def tabla(self, nombre: str) -> pd.DataFrame:
+        return self.tabla_arrow(nombre).to_pandas()
+
+    def validar(self) -> bool:
+        """
+        Compara el sha256 del cuerpo con el del encabezado (lee todo el archivo).
+        """
+        sha = hashlib.sha256()
+        paso = 8 * 1024 * 1024
+        for inicio in range(0, self.cuerpo.size, paso):
+            sha.update(self.cuerpo.slice(inicio, min(paso, self.cuerpo.size - inicio)))
+        return sha.hexdigest() == self.encabezado["sha256"]
+
+
+# ============================================================
+# 4. CONSTRUCCIÓN DESDE datos_agregados/
+# ============================================================
+
+def construir_desde_carpeta(carpeta: str = CARPETA_PAQUETE) -> str:
+    """
+    Empaqueta los CSV, el cubo y metadatos.json ya generados en carpeta
+    (para datos_agregados/ anteriores al paquete).
+    """
+    from consultas_dashboard import TABLAS_AGREGADOS
+
+    tablas = {}
+    for nombre, archivo in TABLAS_AGREGADOS.items():
+        ruta = os.path.join(carpeta, archivo)
+        if not os.path.exists(ruta):
+            print(f"  [AVISO] No existe {ruta}; se omite la tabla {nombre}")
+            continue
+        tablas[nombre] = pd.read_parquet(ruta) if ruta.endswith(".parquet") else pd.read_csv(ruta)
+        print(f"  [OK] {nombre}: {len(tablas[nombre]):,} filas")
+    with open(os.path.join(carpeta, "metadatos.json"), "r", encoding="utf-8") as f:
+        metadatos = json.load(f)
+    return escribir_paquete(tablas, metadatos, carpeta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paquete binario de agregados del dashboard")
+    parser.add_argument("--validar", action="store_true",
+                        help="solo comprobar versión e integridad del paquete existente")
+    args = parser.parse_args()
+    if args.validar:
+        paquete = PaqueteAgregados.abrir()
+        if not paquete.validar():
+            raise SystemExit(f"[ERROR] {paquete.ruta}: el sha256 no coincide")
+        print(f"[OK] {paquete.ruta}: versión {VERSION_PAQUETE}, {len(paquete.nombres())} tablas íntegras")
+    else:
+        print("[PROCESO] Empaquetando datos_agregados/...")
+        ruta = construir_desde_carpeta()
+        print(f"[OK] Paquete guardado en {ruta} ({os.path.getsize(ruta) / 1024:.1f} KB)")
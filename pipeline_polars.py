@@ -0,0 +1,257 @@
+"""
+Pipeline perezoso (lazy) en Polars: de los CSV mensuales crudos del ECU 911
+directamente a datos_agregados/, sin escribir los *_georreferenciado.csv ni
+el CSV unificado 2021-2025.
+
+Un solo plan de consulta hace:
+- descubrimiento de archivos emergencias_*.csv en el año actual y ../20XX
+- limpieza (mismas reglas que clean_emergencias, normalizando por valores
+  únicos de cada lote)
+- código INEC (DPA_PARROQ) por pertenencia al índice de parroquias
+- un cubo de conteos (Año, Mes, DiaSemana, Hora, Año_Mes, provincia,
+  Canton, Parroquia, Servicio, Subtipo) del que salen los ocho agregados
+  y el cubo de consultas de cubo.py
+Con scan_csv + ejecución en streaming, Polars empuja filtros y proyecciones
+hasta la lectura y no materializa las filas.
+"""
+import argparse
+import glob
+import os
+from functools import partial
+
+import polars as pl
+
+from catalogo_inec import ARCHIVO_CODIFICACION, cargar_catalogo_inec
+from esquema import FORMATOS_FECHA
+from cubo import DIMENSIONES_CUBO, DIMENSIONES_ENTERAS, SIN_DATO
+from generar_agregados import AGRUPACIONES, AcumuladorAgregados, escribir_agregados
+from normalizacion import normalizar_nombres, normalizar_provincias
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+PATRONES_CRUDOS = [
+    "emergencias_*.csv",
+    "../20*/emergencias_*.csv",
+]
+
+COLUMNAS_CRUDAS = ['Fecha', 'provincia', 'Canton', 'Cod_Parroquia',
+                   'Parroquia', 'Servicio', 'Subtipo']
+
+# Columnas del dataset limpio (las que lista metadatos.json)
+COLUMNAS_LIMPIAS = COLUMNAS_CRUDAS + ['DPA_PARROQ']
+
+COLUMNAS_CUBO = ['Año', 'Mes', 'DiaSemana', 'Hora', 'Año_Mes',
+                 'provincia', 'Canton', 'Parroquia', 'Servicio', 'Subtipo']
+
+
+# ============================================================
+# 2. DESCUBRIMIENTO Y LECTURA
+# ============================================================
+
+def buscar_archivos_crudos() -> list:
+    """
+    CSV mensuales crudos (sin las salidas *_georreferenciado ni *_completo_*).
+    """
+    archivos = set()
+    for patron in PATRONES_CRUDOS:
+        for archivo in glob.glob(patron):
+            nombre = os.path.basename(archivo)
+            if "_georreferenciado" in nombre or "_completo_" in nombre:
+                continue
+            archivos.add(archivo)
+    return sorted(archivos)
+
+
+def escanear_crudos(archivos: list) -> pl.LazyFrame:
+    """
+    scan_csv perezoso de todos los archivos, todo como texto.
+    """
+    escaneos = [
+        pl.scan_csv(archivo, separator=";", encoding="utf8", infer_schema_length=0)
+        .select(COLUMNAS_CRUDAS)
+        for archivo in archivos
+    ]
+    return pl.concat(escaneos, how="vertical_relaxed")
+
+
+# ============================================================
+# 3. LIMPIEZA Y CÓDIGO INEC
+# ============================================================
+
+def normalizar_lote(serie: pl.Series, normalizador) -> pl.Series:
+    """
+    Normaliza un lote de Polars usando solo sus valores distintos
+    (misma tabla memo que normalizacion.py).
+    """
+    unicos = serie.unique().drop_nulls()
+    normalizados = normalizador.normalizar_valores(unicos.to_list())
+    return serie.replace_strict(
+        unicos, pl.Series(normalizados, dtype=pl.String),
+        default=None, return_dtype=pl.String,
+    )
+
+
+def normalizar_expr(col: str, normalizador) -> pl.Expr:
+    return pl.col(col).map_batches(
+        partial(normalizar_lote, normalizador=normalizador),
+        return_dtype=pl.String,
+        is_elementwise=True,
+    )
+
+
+def fecha_expr(col: str = 'Fecha') -> pl.Expr:
+    """
+    Parsea Fecha probando los formatos de FORMATOS_FECHA (día primero).
+    """
+    return pl.coalesce([
+        pl.col(col).str.strip_chars().str.strptime(pl.Datetime, formato, strict=False)
+        for formato in FORMATOS_FECHA
+    ])
+
+
+def limpiar_lazy(lf: pl.LazyFrame, codigos_parroquia) -> pl.LazyFrame:
+    """
+    Mismas reglas que clean_emergencias + mapear_parroquias_inec:
+    - normaliza provincia (None si '0' / 'zona no delimitada') y texto
+    - descarta filas sin provincia
+    - DPA_PARROQ = Cod_Parroquia con 6 dígitos si existe en el INEC
+    """
+    codigos = pl.Series(list(codigos_parroquia), dtype=pl.Int64)
+    cod = (
+        pl.col('Cod_Parroquia').str.strip_chars()
+        .str.replace(r"\.0$", "")
+        .cast(pl.Int64, strict=False)
+    )
+    return (
+        lf.with_columns(
+            fecha_expr().alias('Fecha'),
+            normalizar_expr('provincia', normalizar_provincias).alias('provincia'),
+            *[normalizar_expr(c, normalizar_nombres).alias(c)
+              for c in ['Canton', 'Parroquia', 'Servicio', 'Subtipo']],
+        )
+        .filter(pl.col('provincia').is_not_null())
+        .with_columns(
+            pl.when(cod.is_in(pl.lit(codigos).implode()))
+            .then(cod.cast(pl.String).str.zfill(6))
+            .otherwise(None)
+            .alias('DPA_PARROQ')
+        )
+    )
+
+
+def cubo_lazy(lf: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Conteo por todas las dimensiones que usan los agregados
+    (las fechas inválidas quedan con Año/Mes/Año_Mes nulos).
+    """
+    fecha = pl.col('Fecha')
+    return (
+        lf.with_columns(
+            fecha.dt.year().alias('Año'),
+            fecha.dt.month().alias('Mes'),
+            (fecha.dt.weekday() - 1).alias('DiaSemana'),
+            fecha.dt.hour().alias('Hora'),
+            fecha.dt.strftime("%Y-%m").alias('Año_Mes'),
+        )
+        .group_by(COLUMNAS_CUBO)
+        .agg(pl.len().alias('Cantidad'))
+    )
+
+
+# ============================================================
+# 4. AGREGADOS A PARTIR DEL CUBO
+# ============================================================
+
+def acumulador_desde_cubo(cubo: pl.DataFrame) -> AcumuladorAgregados:
+    """
+    Reduce el cubo a los conteos de generar_agregados (las claves nulas se
+    descartan, igual que en groupby de pandas).
+    """
+    acumulador = AcumuladorAgregados()
+    for nombre, claves in AGRUPACIONES.items():
+        tabla = (
+            cubo.drop_nulls(claves)
+            .group_by(claves)
+            .agg(pl.col('Cantidad').sum())
+            .to_pandas()
+        )
+        acumulador.conteos[nombre] = tabla.set_index(claves)['Cantidad'].astype('int64')
+    # Cubo de consultas: los nulos se guardan como SIN_DATO / -1
+    cubo_consultas = (
+        cubo.with_columns(
+            [pl.col(c).fill_null(-1) for c in DIMENSIONES_ENTERAS]
+            + [pl.col(c).fill_null(SIN_DATO) for c in DIMENSIONES_CUBO if c not in DIMENSIONES_ENTERAS]
+        )
+        .group_by(DIMENSIONES_CUBO)
+        .agg(pl.col('Cantidad').sum())
+        .to_pandas()
+    )
+    acumulador.cubo = cubo_consultas.set_index(DIMENSIONES_CUBO)['Cantidad'].astype('int64')
+    acumulador.total_registros = int(cubo['Cantidad'].sum())
+    # El cubo solo guarda la hora: sin horas distintas de 0, Fecha no trae hora
+    acumulador.con_hora = bool((cubo['Hora'].drop_nulls() != 0).any())
+    acumulador.anos = set(cubo['Año'].drop_nulls().unique().to_list())
+    acumulador.provincias = set(cubo['provincia'].drop_nulls().unique().to_list())
+    acumulador.servicios = set(cubo['Servicio'].drop_nulls().unique().to_list())
+    return acumulador
+
+
+def ejecutar(archivos: list = None, ruta_xlsx: str = ARCHIVO_CODIFICACION) -> pl.DataFrame:
+    """
+    Arma el plan completo y lo ejecuta en streaming. Devuelve el cubo.
+    """
+    if archivos is None:
+        archivos = buscar_archivos_crudos()
+    if not archivos:
+        raise FileNotFoundError("No se encontraron archivos emergencias_*.csv")
+
+    catalogo = cargar_catalogo_inec(ruta_xlsx)
+    plan = cubo_lazy(limpiar_lazy(escanear_crudos(archivos), catalogo.codigos_parroquia))
+    return plan.collect(engine="streaming")
+
+
+def exportar_limpios(ruta_parquet: str, archivos: list = None,
+                     ruta_xlsx: str = ARCHIVO_CODIFICACION) -> None:
+    """
+    Escribe el dataset limpio (COLUMNAS_LIMPIAS) con sink_parquet, sin
+    materializarlo en memoria.
+    """
+    if archivos is None:
+        archivos = buscar_archivos_crudos()
+    catalogo = cargar_catalogo_inec(ruta_xlsx)
+    (
+        limpiar_lazy(escanear_crudos(archivos), catalogo.codigos_parroquia)
+        .select(COLUMNAS_LIMPIAS)
+        .sink_parquet(ruta_parquet)
+    )
+
+
+def main(paquete=False):
+    archivos = buscar_archivos_crudos()
+    print(f"[OK] Se encontraron {len(archivos)} archivos crudos")
+    for archivo in archivos:
+        print(f"  - {archivo}")
+
+    print("\n[PROCESO] Ejecutando plan perezoso (limpieza + INEC + cubo)...")
+    cubo = ejecutar(archivos)
+    print(f"  [OK] Cubo: {cubo.height:,} combinaciones")
+
+    acumulador = acumulador_desde_cubo(cubo)
+    print(f"  [OK] Registros: {acumulador.total_registros:,}")
+    escribir_agregados(acumulador, COLUMNAS_LIMPIAS, paquete)
+    print("\n[OK] Agregados generados sin CSV intermedios")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline Polars de CSV crudos a agregados")
+    parser.add_argument("--limpios", metavar="RUTA_PARQUET",
+                        help="además escribir el dataset limpio en Parquet (sink_parquet)")
+    parser.add_argument("--paquete", action="store_true",
+                        help="además escribir los agregados en un solo archivo binario (agregados.ecu911)")
+    args = parser.parse_args()
+    main(args.paquete)
+    if args.limpios:
+        exportar_limpios(args.limpios)
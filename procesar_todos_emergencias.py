@@ -1,78 +1,129 @@
+import numpy as np
 import pandas as pd
-from unidecode import unidecode
-import glob
+import argparse
+import contextlib
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+from almacenamiento import EscritorPorBloques, escribir_tabla, ruta_con_formato
+from cache_etapas import LIMITE_CACHE_MB, CacheEtapas, huella_tabla
+from catalogo_inec import (
+    ARCHIVO_CODIFICACION,
+    cargar_catalogo_inec,
+    indice_parroquias,
+    preparar_inec_ref,
+)
+from coincidencia_nombres import completar_por_nombre
+from conjuntos import CONJUNTOS, CONJUNTOS_POR_DEFECTO, ConjuntoDatos, conjunto_datos, conjunto_de_archivo
+from duplicados import MODOS_DUPLICADOS, HuellasVistas, RegistroHuellas, marcar_duplicados
+from esquema import dtypes_para, leer_csv_tipado, leer_csv_tipado_por_bloques
+from instrumentacion import etapa
+from normalizacion import (
+    norm_nombre,
+    norm_provincia,
+    normalizar_nombres,
+    normalizar_provincias,
+)
 
 
 # ============================================================
 # 1. NORMALIZACIÓN DE TEXTO
 # ============================================================
+# norm_nombre / norm_provincia y el motor vectorizado (normalizar_nombres,
+# normalizar_provincias) viven en normalizacion.py y se reutilizan aquí.
 
-def norm_nombre(s):
+
+# ============================================================
+# 2. CARGAR DATASET DE EMERGENCIAS
+# ============================================================
+
+def load_emergencias(path_csv: str, conjunto: ConjuntoDatos = None) -> pd.DataFrame:
     """
-    Normaliza nombres de provincia/cantón/parroquia:
-    - strip espacios
-    - colapsa espacios múltiples
-    - quita acentos
-    - pasa a minúsculas
+    Lee el CSV de emergencias con los parámetros correctos y el esquema
+    declarado (categorías para texto geográfico/servicio, Int64 para códigos,
+    Fecha parseada con el formato detectado en el archivo).
+    Separador, nombres de columnas y esquema salen del conjunto de datos
+    (por defecto el del prefijo del archivo, ver conjuntos.py).
     """
-    if pd.isna(s):
-        return None
-    s = str(s).strip()
-    s = " ".join(s.split())
-    s = unidecode(s).lower()
-    return s
+    conjunto = conjunto_de_archivo(path_csv, conjunto)
+    df = leer_csv_tipado(path_csv, conjunto.esquema, **conjunto.opciones_csv(path_csv))
+    conjunto.validar_columnas(df.columns, path_csv)
+    return df
 
 
-def norm_provincia(s):
+def load_emergencias_por_bloques(path_csv: str, filas_bloque: int, conjunto: ConjuntoDatos = None):
     """
-    Normaliza provincia y convierte a None si es '0' o 'zona no delimitada'.
+    Igual que load_emergencias, pero itera bloques de filas_bloque filas.
     """
-    s_norm = norm_nombre(s)
-    if s_norm in ['0', 'zona no delimitada']:
-        return None
-    return s_norm
+    conjunto = conjunto_de_archivo(path_csv, conjunto)
+    for bloque in leer_csv_tipado_por_bloques(path_csv, conjunto.esquema, filas_bloque,
+                                              **conjunto.opciones_csv(path_csv)):
+        conjunto.validar_columnas(bloque.columns, path_csv)
+        yield bloque
 
 
-# ============================================================
-# 2. CARGAR DATASET DE EMERGENCIAS
-# ============================================================
+# Memoria pico de una fila durante limpieza + mapeo, en múltiplos de lo que
+# ocupa recién leída (copias de columnas, normalizadas, DPA_PARROQ, CSV...)
+FACTOR_PICO = 8
+FILAS_MUESTRA = 20_000
+FILAS_BLOQUE_MIN = 10_000
+
 
-def load_emergencias(path_csv: str) -> pd.DataFrame:
+def filas_por_presupuesto(path_csv: str, presupuesto_mb: float, conjunto: ConjuntoDatos = None) -> int:
     """
-    Lee el CSV de emergencias con los parámetros correctos.
+    Filas por bloque para no pasar de presupuesto_mb: mide cuánto ocupa una
+    fila tipada en una muestra del archivo y divide por FACTOR_PICO.
     """
-    df = pd.read_csv(path_csv, sep=";", encoding="utf-8")
-    df['Fecha'] = pd.to_datetime(df['Fecha'], dayfirst=True, errors='coerce')
-    return df
+    conjunto = conjunto_de_archivo(path_csv, conjunto)
+    opciones = conjunto.opciones_csv(path_csv)
+    columnas = pd.read_csv(path_csv, nrows=0, **opciones).columns
+    dtypes = {col: ('string' if tipo == 'Int64' else tipo)
+              for col, tipo in dtypes_para(columnas, conjunto.esquema).items()}
+    muestra = pd.read_csv(path_csv, nrows=FILAS_MUESTRA, dtype=dtypes, **opciones)
+    bytes_fila = max(muestra.memory_usage(deep=True).sum() / max(len(muestra), 1), 1)
+    filas = int(presupuesto_mb * 1024 * 1024 / (bytes_fila * FACTOR_PICO))
+    return max(filas, FILAS_BLOQUE_MIN)
 
 
 # ============================================================
 # 3. LIMPIEZA DE EMERGENCIAS
 # ============================================================
 
-def clean_emergencias(df: pd.DataFrame) -> pd.DataFrame:
+def clean_emergencias(df: pd.DataFrame, duplicados: str = "no",
+                      registro: RegistroHuellas = None, origen: str = None,
+                      vistas: HuellasVistas = None, copiar: bool = True,
+                      claves: list = None) -> pd.DataFrame:
     """
     Limpia el dataset de emergencias:
     - Normaliza texto en provincia, cantón, parroquia, servicio, subtipo
     - Marca provincias inválidas ('0', 'zona no delimitada') como None
-    - Limpia Cod_Parroquia y la deja como string (6 dígitos cuando aplique)
+    - Cod_Parroquia: si viene como entero (esquema Int64) se deja así; si
+      viene como texto se limpia y se deja como string (6 dígitos cuando aplique)
     - Crea columnas prov_norm, canton_norm, parr_norm
     - Elimina filas sin provincia (None)
+    - duplicados="reportar"/"eliminar": cuenta (y quita) los eventos
+      repetidos dentro del archivo y, con registro y origen, los que ya
+      aportó otro archivo mensual (ver duplicados.py); vistas lleva los
+      eventos de los bloques anteriores si el archivo se lee por bloques;
+      claves son las columnas que identifican un evento (las del conjunto
+      de datos, por defecto CLAVES_EVENTO)
+    - copiar=False modifica df en lugar de trabajar sobre una copia (para
+      bloques que nadie más usa)
     """
-    df0 = df.copy()
+    df0 = df.copy() if copiar else df
 
-    # Normalizar columnas de texto
+    # Normalizar columnas de texto (solo sobre valores únicos)
     text_cols = ['provincia', 'Canton', 'Parroquia', 'Servicio', 'Subtipo']
     for col in text_cols:
         if col not in df0.columns:
             continue
         if col == 'provincia':
-            df0[col] = df0[col].apply(norm_provincia)
+            df0[col] = normalizar_provincias(df0[col])
         else:
-            df0[col] = df0[col].apply(norm_nombre)
+            df0[col] = normalizar_nombres(df0[col])
             
-    if 'Cod_Parroquia' in df0.columns:
+    if 'Cod_Parroquia' in df0.columns and not pd.api.types.is_integer_dtype(df0['Cod_Parroquia']):
         df0['Cod_Parroquia'] = (
             df0['Cod_Parroquia']
             .astype(str)
@@ -80,16 +131,14 @@ def clean_emergencias(df: pd.DataFrame) -> pd.DataFrame:
             .str.strip()
         )
 
-    df0['Cod_Parroquia'] = df0['Cod_Parroquia'].apply(
-        lambda x: x.zfill(6) if x.isdigit() and len(x) <= 6 else x
-    )
-
-    
+        df0['Cod_Parroquia'] = df0['Cod_Parroquia'].apply(
+            lambda x: x.zfill(6) if x.isdigit() and len(x) <= 6 else x
+        )
 
     # Columnas normalizadas explícitas (para el match con INEC)
-    df0['prov_norm']   = df0['provincia'].apply(norm_nombre)
-    df0['canton_norm'] = df0['Canton'].apply(norm_nombre)
-    df0['parr_norm']   = df0['Parroquia'].apply(norm_nombre)
+    df0['prov_norm']   = normalizar_nombres(df0['provincia'])
+    df0['canton_norm'] = normalizar_nombres(df0['Canton'])
+    df0['parr_norm']   = normalizar_nombres(df0['Parroquia'])
 
     # Eliminar filas sin provincia (None/NaN) porque no se pueden georreferenciar
     antes = len(df0)
@@ -97,6 +146,16 @@ def clean_emergencias(df: pd.DataFrame) -> pd.DataFrame:
     despues = len(df0)
     print(f"[clean_emergencias] Filas eliminadas por provincia None: {antes - despues}")
 
+    # Duplicados sobre las claves ya normalizadas
+    if duplicados != "no":
+        en_archivo, en_otros = marcar_duplicados(df0, registro, origen, vistas, claves)
+        repetidos = en_archivo | en_otros
+        print(f"[clean_emergencias] Duplicados en el archivo: {int(en_archivo.sum())} | "
+              f"ya vistos en otros archivos: {int((en_otros & ~en_archivo).sum())}")
+        if duplicados == "eliminar" and repetidos.any():
+            df0 = df0[~repetidos].copy()
+            print(f"[clean_emergencias] Filas eliminadas por duplicado: {int(repetidos.sum())}")
+
     return df0
 
 
@@ -106,64 +165,51 @@ def clean_emergencias(df: pd.DataFrame) -> pd.DataFrame:
 
 def load_inec_codificacion(dataI: pd.DataFrame) -> pd.DataFrame:
     """
-    Lee el archivo CODIFICACIÓN_2021 del INEC y prepara un DataFrame de referencia
-    con:
+    Prepara a partir de la hoja CODIFICACIÓN_2021 del INEC un DataFrame de
+    referencia con:
     - DPA_PARROQ (código parroquial de 6 dígitos)
     - Nombres oficiales de provincia, cantón, parroquia
     - Versiones normalizadas para el match (prov_norm, canton_norm, parr_norm)
+    Para no releer el xlsx en cada ejecución use catalogo_inec.cargar_catalogo_inec.
     """
-    cols = ['DPA_PROVIN', 'DPA_DESPRO',
-            'DPA_CANTON', 'DPA_DESCAN',
-            'DPA_PARROQ', 'DPA_DESPAR']
-    inec_ref = dataI[cols].copy()
-    
-    # Normalizar nombres
-    inec_ref['prov_norm']   = inec_ref['DPA_DESPRO'].apply(norm_nombre)
-    inec_ref['canton_norm'] = inec_ref['DPA_DESCAN'].apply(norm_nombre)
-    inec_ref['parr_norm']   = inec_ref['DPA_DESPAR'].apply(norm_nombre)
-
-    return inec_ref
+    return preparar_inec_ref(dataI)
 
 
 # ============================================================
 # 5. MAPEAR PARROQUIAS A CÓDIGO INEC
 # ============================================================
 
-def mapear_parroquias_inec(df_emerg: pd.DataFrame, inec_ref: pd.DataFrame) -> pd.DataFrame:
+def mapear_parroquias_inec(df_emerg: pd.DataFrame, inec_ref: pd.DataFrame,
+                           indice: pd.Index = None) -> pd.DataFrame:
     """
     Mapea el código de parroquia de df_emerg contra el catálogo INEC.
     
     Si Cod_Parroquia coincide con DPA_PARROQ -> asigna el código.
     Si NO coincide -> coloca NaN.
-    """
-    # Nos aseguramos que los códigos estén limpios y comparables
-    df = df_emerg.copy()
-    df['Cod_Parroquia'] = (
-        df['Cod_Parroquia']
-        .astype(str)
-        .str.replace(r'\.0$', '', regex=True)
-        .str.strip()
-        .str.zfill(6)
-    )
-    
-    inec = inec_ref.copy()
-    inec['DPA_PARROQ'] = (
-        inec['DPA_PARROQ']
-        .astype(str)
-        .str.replace(r'\.0$', '', regex=True)
-        .str.strip()
-        .str.zfill(6)
-    )
 
-    # Merge SOLO por código parroquial
-    df_geo = df.merge(
-        inec[['DPA_PARROQ']],   # solo necesitamos el código oficial
-        left_on='Cod_Parroquia',
-        right_on='DPA_PARROQ',
-        how='left'
+    En vez de un merge se busca cada código distinto en un índice hash de
+    códigos INEC (indice, o se construye desde inec_ref) y el resultado se
+    reparte con los códigos de factorize. La columna DPA_PARROQ se agrega
+    sobre df_emerg (sin copias) y el número de filas nunca cambia.
+    """
+    if indice is None:
+        indice = indice_parroquias(inec_ref)
+
+    # Cod_Parroquia ya viene limpio de clean_emergencias
+    codigos_fila, unicos = pd.factorize(df_emerg['Cod_Parroquia'])
+    valores = pd.to_numeric(pd.Series(unicos, dtype=object), errors='coerce').to_numpy(dtype=float)
+    posiciones = indice.get_indexer(valores)
+
+    # Código oficial (6 dígitos) por valor distinto; el último es para nulos
+    oficiales = np.array(
+        [f"{indice[p]:06d}" if p >= 0 else np.nan for p in posiciones] + [np.nan],
+        dtype=object,
     )
+    df_emerg['DPA_PARROQ'] = oficiales[codigos_fila]
+    # Mismo índice 0..n-1 que dejaba el merge (se reemplaza sin copiar datos)
+    df_emerg.index = pd.RangeIndex(len(df_emerg))
 
-    return df_geo
+    return df_emerg
 
 
 
@@ -177,23 +223,32 @@ def reporte_geocodificacion(df_geo: pd.DataFrame) -> None:
     - % de filas con código parroquial asignado
     - ejemplos de parroquias sin match
     """
-    total = len(df_geo)
-    con_codigo = df_geo['DPA_PARROQ'].notna().sum()
+    imprimir_reporte(len(df_geo), int(df_geo['DPA_PARROQ'].notna().sum()), ejemplos_sin_match(df_geo))
+
+
+def ejemplos_sin_match(df_geo: pd.DataFrame, previos: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Hasta 300 tripletas (provincia / cantón / parroquia) distintas sin
+    código, agregadas a las de bloques previos si se pasan.
+    """
+    ejemplos = df_geo[df_geo['DPA_PARROQ'].isna()][['provincia', 'Canton', 'Parroquia']]
+    if previos is not None:
+        ejemplos = pd.concat([previos, ejemplos.astype(object)], ignore_index=True)
+    return ejemplos.drop_duplicates().head(300)
+
+
+def imprimir_reporte(total: int, con_codigo: int, ejemplos: pd.DataFrame) -> None:
     sin_codigo = total - con_codigo
 
     print("=== REPORTE GEOREFERENCIACIÓN ===")
     print(f"Filas totales: {total}")
+    if not total:
+        return
     print(f"Con código INEC (DPA_PARROQ): {con_codigo} ({con_codigo/total*100:.2f}%)")
     print(f"Sin código INEC: {sin_codigo} ({sin_codigo/total*100:.2f}%)")
 
     if sin_codigo > 0:
         print("\nEjemplos de parroquias SIN match (provincia / cantón / parroquia):")
-        ejemplos = (
-            df_geo[df_geo['DPA_PARROQ'].isna()]
-            [['provincia', 'Canton', 'Parroquia']]
-            .drop_duplicates()
-            .head(300)
-        )
         print(ejemplos)
 
 
@@ -201,31 +256,56 @@ def reporte_geocodificacion(df_geo: pd.DataFrame) -> None:
 # 7. PIPELINE COMPLETO
 # ============================================================
 
-def pipeline_georreferenciacion(path_emerg: str, dataI: pd.DataFrame) -> pd.DataFrame:
+def pipeline_georreferenciacion(path_emerg: str, dataI: pd.DataFrame,
+                                inec_ref: pd.DataFrame = None,
+                                match_nombres: bool = False,
+                                duplicados: str = "no",
+                                registro: RegistroHuellas = None,
+                                conjunto: ConjuntoDatos = None) -> pd.DataFrame:
     """
     Ejecuta todo el flujo:
     1) Carga emergencias
-    2) Limpia texto, provincias y Cod_Parroquia
-    3) Carga catálogo INEC
+    2) Limpia texto, provincias y Cod_Parroquia (y duplicados, si se pide)
+    3) Carga catálogo INEC (o usa inec_ref si ya viene preparado)
     4) Mapea parroquias y agrega DPA_PARROQ
+       (+ match por nombre para códigos sin match si match_nombres=True;
+       son códigos estimados, por eso no se hace por defecto)
     5) Imprime reporte
+    conjunto define cómo se lee el CSV (por defecto, por el prefijo del archivo).
     Devuelve df_geo (listo para unir con shapefile).
     """
+    conjunto = conjunto_de_archivo(path_emerg, conjunto)
     print(f"\n{'='*60}")
     print(f"Procesando: {os.path.basename(path_emerg)}")
     print(f"{'='*60}")
     
     print("1) Cargando emergencias...")
-    df = load_emergencias(path_emerg)
+    with etapa("cargar", path_emerg) as paso:
+        df = load_emergencias(path_emerg, conjunto)
+        paso.contar(salida=len(df))
 
     print("2) Limpiando emergencias...")
-    df_clean = clean_emergencias(df)
+    with etapa("limpiar", path_emerg, len(df)) as paso:
+        df_clean = clean_emergencias(df, duplicados, registro, path_emerg, claves=conjunto.claves)
+        paso.contar(salida=len(df_clean))
 
-    print("3) Cargando codificación INEC...")
-    inec_ref = load_inec_codificacion(dataI)
+    if inec_ref is None:
+        print("3) Cargando codificación INEC...")
+        with etapa("cargar_inec"):
+            inec_ref = load_inec_codificacion(dataI)
+    else:
+        print("3) Usando codificación INEC ya cargada...")
 
     print("4) Mapeando parroquias a INEC...")
-    df_geo = mapear_parroquias_inec(df_clean, inec_ref)
+    with etapa("mapear_inec", path_emerg, len(df_clean)) as paso:
+        df_geo = mapear_parroquias_inec(df_clean, inec_ref)
+        paso.contar(salida=len(df_geo))
+
+    if match_nombres:
+        print("4b) Match por nombre (provincia/cantón/parroquia) para filas sin código...")
+        with etapa("match_nombres", path_emerg, len(df_geo)) as paso:
+            df_geo = completar_por_nombre(df_geo, inec_ref)
+            paso.contar(salida=len(df_geo))
 
     print("5) Reporte de georreferenciación:")
     reporte_geocodificacion(df_geo)
@@ -233,50 +313,261 @@ def pipeline_georreferenciacion(path_emerg: str, dataI: pd.DataFrame) -> pd.Data
     return df_geo
 
 
+def pipeline_georreferenciacion_por_bloques(path_emerg: str, inec_ref: pd.DataFrame,
+                                            output_path: str, formato: str = "csv",
+                                            presupuesto_mb: float = 512,
+                                            match_nombres: bool = False,
+                                            duplicados: str = "no",
+                                            registro: RegistroHuellas = None,
+                                            conjunto: ConjuntoDatos = None) -> str:
+    """
+    Mismo flujo que pipeline_georreferenciacion con memoria acotada: el CSV
+    se lee en bloques de filas dimensionados para presupuesto_mb, cada
+    bloque se limpia y mapea sin copias y se agrega a la salida. Solo se
+    conservan los totales del reporte, las tripletas de ejemplo y (si se
+    buscan duplicados) las huellas de 8 bytes de los eventos.
+    Devuelve la ruta de salida.
+    """
+    conjunto = conjunto_de_archivo(path_emerg, conjunto)
+    print(f"\n{'='*60}")
+    print(f"Procesando por bloques: {os.path.basename(path_emerg)}")
+    print(f"{'='*60}")
+
+    filas_bloque = filas_por_presupuesto(path_emerg, presupuesto_mb, conjunto)
+    print(f"1) Bloques de {filas_bloque:,} filas (presupuesto {presupuesto_mb:,.0f} MB)")
+    indice = indice_parroquias(inec_ref)
+    vistas = HuellasVistas() if duplicados != "no" else None
+
+    total, con_codigo, ejemplos = 0, 0, None
+    with EscritorPorBloques(output_path, formato) as escritor:
+        for i, bloque in enumerate(load_emergencias_por_bloques(path_emerg, filas_bloque, conjunto), 1):
+            print(f"2) Bloque {i}: {len(bloque):,} filas")
+            with etapa("bloque", path_emerg, len(bloque)) as paso:
+                bloque = clean_emergencias(bloque, duplicados, registro, path_emerg, vistas, copiar=False,
+                                           claves=conjunto.claves)
+                bloque = mapear_parroquias_inec(bloque, inec_ref, indice)
+                if match_nombres:
+                    bloque = completar_por_nombre(bloque, inec_ref)
+                escritor.escribir(bloque)
+                paso.contar(salida=len(bloque))
+
+            total += len(bloque)
+            con_codigo += int(bloque['DPA_PARROQ'].notna().sum())
+            ejemplos = ejemplos_sin_match(bloque, ejemplos)
+            del bloque
+
+    print("5) Reporte de georreferenciación:")
+    imprimir_reporte(total, con_codigo, ejemplos)
+    return escritor.ruta
+
+
+def procesar_archivo(path_emerg: str, inec_ref: pd.DataFrame, formato: str = "csv",
+                     duplicados: str = "no", registro: RegistroHuellas = None,
+                     presupuesto_mb: float = None, cache: CacheEtapas = None,
+                     conjunto: ConjuntoDatos = None, match_nombres: bool = False) -> str:
+    """
+    Georreferencia un archivo mensual y guarda el resultado como
+    emergencias_X_georreferenciado.csv (o .parquet; el prefijo es el del
+    archivo crudo, p. ej. eventos_X_georreferenciado). Devuelve la ruta de salida.
+    Con presupuesto_mb el archivo se procesa por bloques sin pasar de esa
+    memoria (pipeline_georreferenciacion_por_bloques).
+    Con match_nombres las filas sin código se completan por nombre
+    (coincidencia_nombres.py).
+    Con cache, si el CSV, el catálogo INEC y el código no cambiaron desde
+    una ejecución anterior, la salida se copia de la cache sin procesar
+    (sin duplicados: esos dependen de los otros archivos ya procesados).
+    """
+    conjunto = conjunto_de_archivo(path_emerg, conjunto)
+
+    # Crear nombre del archivo de salida
+    nombre_base = os.path.splitext(os.path.basename(path_emerg))[0]
+    output_path = f"{nombre_base}_georreferenciado.csv"
+
+    clave = None
+    if cache is not None and duplicados == "no":
+        clave = cache.clave("georreferenciacion", [path_emerg], formato=formato,
+                            inec=huella_tabla(inec_ref), conjunto=conjunto.nombre,
+                            match_nombres=match_nombres)
+        output_path = ruta_con_formato(output_path, formato)
+        if cache.restaurar(clave, output_path):
+            print(f"[OK] {os.path.basename(path_emerg)} sin cambios: {output_path} restaurado de la cache")
+            return output_path
+
+    with etapa("georreferenciacion", path_emerg) as paso:
+        if presupuesto_mb:
+            output_path = pipeline_georreferenciacion_por_bloques(
+                path_emerg, inec_ref, output_path, formato, presupuesto_mb, match_nombres,
+                duplicados=duplicados, registro=registro, conjunto=conjunto
+            )
+        else:
+            # Ejecutar el pipeline
+            df_geo = pipeline_georreferenciacion(path_emerg, None, inec_ref, match_nombres,
+                                                 duplicados=duplicados, registro=registro,
+                                                 conjunto=conjunto)
+            paso.contar(salida=len(df_geo))
+
+            # Guardar resultado
+            with etapa("escribir", output_path, len(df_geo)):
+                output_path = escribir_tabla(df_geo, output_path, formato)
+    print(f"[OK] Archivo guardado: {output_path}")
+    if clave is not None:
+        cache.guardar(clave, "georreferenciacion", output_path)
+
+    # El registro se guarda solo cuando la salida ya está escrita
+    if registro is not None:
+        registro.guardar()
+    return output_path
+
+
 # ============================================================
-# 8. PROCESAR TODOS LOS ARCHIVOS
+# 8. EJECUCIÓN EN PARALELO (UN PROCESO POR ARCHIVO)
 # ============================================================
 
-def procesar_todos_emergencias():
+# Catálogo INEC de cada proceso worker (se envía una sola vez al iniciarlo)
+_INEC_REF_WORKER = None
+
+
+def _inicializar_worker(inec_ref: pd.DataFrame) -> None:
+    global _INEC_REF_WORKER
+    _INEC_REF_WORKER = inec_ref
+
+
+def _procesar_archivo_worker(path_emerg: str, formato: str, duplicados: str = "no",
+                             presupuesto_mb: float = None, cache: CacheEtapas = None,
+                             match_nombres: bool = False):
+    """
+    Corre procesar_archivo en un worker capturando lo que imprime, para
+    mostrar los reportes en orden. Devuelve (salida, log, error).
     """
-    Encuentra todos los archivos emergencias_*.csv y los procesa.
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            output_path = procesar_archivo(path_emerg, _INEC_REF_WORKER, formato, duplicados,
+                                           presupuesto_mb=presupuesto_mb, cache=cache,
+                                           match_nombres=match_nombres)
+            return output_path, log.getvalue(), None
+        except Exception as e:
+            return None, log.getvalue(), str(e)
+
+
+def procesar_en_paralelo(archivos: list, inec_ref: pd.DataFrame,
+                         formato: str = "csv", n_workers: int = None,
+                         duplicados: str = "no", presupuesto_mb: float = None,
+                         cache: CacheEtapas = None, match_nombres: bool = False) -> dict:
+    """
+    Procesa cada archivo mensual en un proceso independiente.
+    - inec_ref se construye una vez y se comparte con los workers
+    - los reportes se imprimen en el orden de la lista de archivos
+    - un archivo con error no detiene a los demás
+    - los duplicados solo se buscan dentro de cada archivo (el registro
+      entre archivos no se comparte entre procesos)
+    - presupuesto_mb es por worker
+    - todos los workers comparten la misma cache de etapas
+    Devuelve {archivo: ruta_salida o None si falló}.
+    """
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=n_workers,
+                             initializer=_inicializar_worker,
+                             initargs=(inec_ref,)) as pool:
+        futuros = [(archivo, pool.submit(_procesar_archivo_worker, archivo, formato,
+                                             duplicados, presupuesto_mb, cache, match_nombres))
+                   for archivo in archivos]
+        for archivo, futuro in futuros:
+            try:
+                output_path, log, error = futuro.result()
+            except Exception as e:  # el proceso worker murió (p. ej. sin memoria)
+                output_path, log, error = None, "", str(e)
+            print(log, end="")
+            if error is not None:
+                print(f"[ERROR] al procesar {archivo}: {error}")
+            resultados[archivo] = output_path
+    return resultados
+
+
+# ============================================================
+# 9. PROCESAR TODOS LOS ARCHIVOS
+# ============================================================
+
+def procesar_todos_emergencias(formato: str = "csv", n_workers: int = 1,
+                               duplicados: str = "no", ruta_huellas: str = None,
+                               presupuesto_mb: float = None, usar_cache: bool = True,
+                               limite_cache_mb: float = LIMITE_CACHE_MB,
+                               conjuntos: list = None, match_nombres: bool = False):
+    """
+    Encuentra todos los archivos crudos de los conjuntos de datos
+    indicados (conjuntos.py; por defecto solo emergencias_*.csv, los demás
+    como eventos_*.csv se piden con conjuntos=[...]) y los procesa.
     Guarda cada uno con el nombre: emergencias_X_georreferenciado.csv
+    (o emergencias_X_georreferenciado.parquet si formato="parquet"), con el
+    prefijo del archivo crudo.
+    Con n_workers > 1 los archivos de todos los conjuntos se reparten en el
+    mismo pool de workers (None = un worker por núcleo).
+    Con duplicados="reportar"/"eliminar" y un solo worker, los eventos ya
+    aportados por otros archivos se buscan en el registro de huellas de
+    cada conjunto (ruta_huellas lo reemplaza si se procesa un solo conjunto).
+    Con presupuesto_mb cada archivo se procesa por bloques dentro de esa
+    memoria (por worker).
+    Con usar_cache los meses que no cambiaron se copian de la cache de
+    etapas (cache_etapas.py), que no pasa de limite_cache_mb.
+    Con match_nombres las filas sin código válido se completan por nombre
+    (match difuso, ver coincidencia_nombres.py).
     """
-    # Cargar el archivo de codificación INEC
-    print("Cargando CODIFICACIÓN_2021.xlsx...")
-    dataI = pd.read_excel("CODIFICACIÓN_2021.xlsx", header=0, skiprows=1)
-    dataI = dataI.dropna(axis=1, how="any")
-    print(f"Codificación INEC cargada: {dataI.shape[0]} parroquias")
+    if duplicados not in MODOS_DUPLICADOS:
+        raise ValueError(f"Modo de duplicados no soportado: {duplicados} (use {MODOS_DUPLICADOS})")
+    seleccion = [conjunto_datos(nombre) for nombre in (conjuntos or CONJUNTOS_POR_DEFECTO)]
+    if ruta_huellas is not None and len(seleccion) > 1:
+        raise ValueError("ruta_huellas solo se puede indicar al procesar un solo conjunto de datos")
+
+    # Cargar el catálogo INEC (compilado y cacheado por hash del xlsx)
+    print(f"Cargando {ARCHIVO_CODIFICACION}...")
+    catalogo = cargar_catalogo_inec(ARCHIVO_CODIFICACION)
+    inec_ref = catalogo.inec_ref
+    print(f"Codificación INEC cargada: {catalogo.dataI.shape[0]} parroquias")
     
-    # Encontrar todos los archivos emergencias_*.csv
-    archivos_emergencias = glob.glob("emergencias_*.csv")
+    # Encontrar los archivos crudos de cada conjunto (sin las salidas previas)
+    archivos_por_conjunto = {conjunto.nombre: conjunto.archivos_crudos() for conjunto in seleccion}
+    archivos_emergencias = [archivo for archivos in archivos_por_conjunto.values() for archivo in archivos]
     
     if not archivos_emergencias:
-        print("\n¡No se encontraron archivos emergencias_*.csv!")
+        patrones = ", ".join(f"{prefijo}_*.csv" for conjunto in seleccion for prefijo in conjunto.prefijos)
+        print(f"\n¡No se encontraron archivos {patrones}!")
         return
     
     print(f"\n[OK] Se encontraron {len(archivos_emergencias)} archivos para procesar")
-    print("Archivos:")
-    for archivo in archivos_emergencias:
-        print(f"  - {archivo}")
-    
-    # Procesar cada archivo
-    for path_emerg in archivos_emergencias:
-        try:
-            # Ejecutar el pipeline
-            df_geo = pipeline_georreferenciacion(path_emerg, dataI)
-            
-            # Crear nombre del archivo de salida
-            nombre_base = os.path.splitext(os.path.basename(path_emerg))[0]
-            output_path = f"{nombre_base}_georreferenciado.csv"
-            
-            # Guardar resultado
-            df_geo.to_csv(output_path, index=False, encoding='utf-8')
-            print(f"[OK] Archivo guardado: {output_path}")
-            
-        except Exception as e:
-            print(f"[ERROR] al procesar {path_emerg}: {str(e)}")
+    for nombre, archivos in archivos_por_conjunto.items():
+        if not archivos:
             continue
+        print(f"Archivos ({nombre}):")
+        for archivo in archivos:
+            print(f"  - {archivo}")
+
+    cache = CacheEtapas(limite_mb=limite_cache_mb) if usar_cache else None
+    if cache is not None and duplicados != "no":
+        print("[AVISO] Con --duplicados no se usa la cache de etapas")
+    
+    if n_workers is None or n_workers > 1:
+        if duplicados != "no":
+            print("[AVISO] En paralelo los duplicados solo se buscan dentro de cada archivo; "
+                  "use --workers 1 para compararlos con otros meses")
+        print(f"\n[PROCESO] Procesando en paralelo con {n_workers or os.cpu_count()} workers...")
+        procesar_en_paralelo(archivos_emergencias, inec_ref, formato, n_workers, duplicados,
+                             presupuesto_mb, cache, match_nombres)
+    else:
+        for conjunto in seleccion:
+            registro = None
+            if duplicados != "no" and archivos_por_conjunto[conjunto.nombre]:
+                ruta = ruta_huellas or conjunto.archivo_huellas
+                registro = RegistroHuellas.cargar(ruta)
+                print(f"[OK] Registro de huellas ({conjunto.nombre}): {registro.total():,} eventos de "
+                      f"{len(registro.por_archivo)} archivos ({ruta})")
+            # Procesar cada archivo
+            for path_emerg in archivos_por_conjunto[conjunto.nombre]:
+                try:
+                    procesar_archivo(path_emerg, inec_ref, formato, duplicados, registro, presupuesto_mb,
+                                     cache, conjunto, match_nombres)
+                except Exception as e:
+                    print(f"[ERROR] al procesar {path_emerg}: {str(e)}")
+                    continue
     
     print(f"\n{'='*60}")
     print("[OK] PROCESAMIENTO COMPLETADO")
@@ -284,8 +575,31 @@ def procesar_todos_emergencias():
 
 
 # ============================================================
-# 9. EJECUCIÓN
+# 10. EJECUCIÓN
 # ============================================================
 
 if __name__ == "__main__":
-    procesar_todos_emergencias()
+    parser = argparse.ArgumentParser(description="Georreferencia los archivos emergencias_*.csv, eventos_*.csv, ...")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv",
+                        help="formato de los archivos de salida")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="procesos en paralelo (0 = uno por núcleo)")
+    parser.add_argument("--duplicados", choices=MODOS_DUPLICADOS, default="no",
+                        help="reportar o eliminar eventos duplicados (Fecha solo trae el día)")
+    parser.add_argument("--huellas", default=None,
+                        help="registro persistente de huellas para duplicados entre archivos "
+                             "(por defecto el de cada conjunto de datos)")
+    parser.add_argument("--memoria", type=float, metavar="MB",
+                        help="procesar cada archivo por bloques sin pasar de esta memoria (por worker)")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="reprocesar todos los meses aunque no hayan cambiado")
+    parser.add_argument("--cache-mb", type=float, default=LIMITE_CACHE_MB,
+                        help="tamaño máximo de la cache de etapas (se borra lo usado hace más tiempo)")
+    parser.add_argument("--conjuntos", nargs="+", choices=list(CONJUNTOS), default=None,
+                        help="conjuntos de datos a procesar (por defecto emergencias)")
+    parser.add_argument("--match-nombres", action="store_true",
+                        help="completar por nombre (match difuso) las filas sin código INEC válido")
+    args = parser.parse_args()
+    procesar_todos_emergencias(args.formato, args.workers or None, args.duplicados, args.huellas,
+                               args.memoria, not args.sin_cache, args.cache_mb, args.conjuntos,
+                               args.match_nombres)
@@ -0,0 +1,270 @@
+"""
+Resúmenes probabilísticos (sketches) de los datos ECU 911.
+
+Para rankings y conteos de valores distintos sin groupby exacto sobre todo
+el histórico se mantienen, por cada dimensión de DIMENSIONES_SKETCH:
+- HyperLogLog: número aproximado de valores distintos
+- Count-Min: frecuencia aproximada (cota superior) de cualquier valor
+- Space-Saving: los valores más frecuentes (top-K) con su cota de error
+Los tres se construyen en una pasada por bloques, se combinan entre
+archivos/años (HLL por máximo, Count-Min por suma, Space-Saving con la
+combinación de Agarwal et al.) y ocupan lo mismo sin importar cuántas filas
+se acumulen. Cada bloque se reduce primero a sus claves únicas con peso, así
+que el trabajo por bloque depende de los valores distintos, no de las filas.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+
+# ============================================================
+# 1. CONFIGURACIÓN
+# ============================================================
+
+# nombre -> columnas que forman la clave
+DIMENSIONES_SKETCH = {
+    'parroquia': ['Parroquia', 'provincia'],
+    'canton': ['Canton', 'provincia'],
+    'subtipo': ['Subtipo'],
+    'parroquia_mes': ['Año_Mes', 'Parroquia', 'provincia'],
+}
+
+ARCHIVO_SKETCHES = "sketches.pkl"
+
+# HyperLogLog con 2^14 registros: error relativo ~0.8 %
+PRECISION_HLL = 14
+# Count-Min de 4 x 2^14 contadores: error <= total * e / 2^14 con prob. ~98 %
+PROFUNDIDAD_CM = 4
+ANCHO_CM = 2 ** 14
+# Entradas que guarda Space-Saving (se piden top-K con K bastante menor)
+CAPACIDAD_SS = 500
+
+_MASCARA_32 = np.uint64(0xFFFFFFFF)
+
+
+def hash_claves(claves: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits determinista (mismo valor entre procesos y ejecuciones)
+    de cada fila de claves, tratando todo como texto/objeto.
+    """
+    return pd.util.hash_pandas_object(claves.astype(object), index=False).to_numpy(dtype=np.uint64)
+
+
+# ============================================================
+# 2. SKETCHES
+# ============================================================
+
+class HyperLogLog:
+    """
+    Estimador de cardinalidad con 2^precision registros de 8 bits.
+    """
+
+    def __init__(self, precision: int = PRECISION_HLL):
+        self.precision = precision
+        self.registros = np.zeros(2 ** precision, dtype=np.uint8)
+
+    def agregar(self, hashes: np.ndarray) -> None:
+        p = self.precision
+        indices = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        resto = hashes & np.uint64((1 << (64 - p)) - 1)
+        # rho = posición del primer 1 en los 64-p bits restantes
+        bits = np.zeros(len(resto), dtype=np.int64)
+        positivos = resto > 0
+        bits[positivos] = np.floor(np.log2(resto[positivos].astype(np.float64))).astype(np.int64) + 1
+        rho = (64 - p) - bits + 1
+        np.maximum.at(self.registros, indices, rho.astype(np.uint8))
+
+    def combinar(self, otro: "HyperLogLog") -> "HyperLogLog":
+        np.maximum(self.registros, otro.registros, out=self.registros)
+        return self
+
+    def estimar(self) -> int:
+        m = len(self.registros)
+        alfa = 0.7213 / (1 + 1.079 / m)
+        estimado = alfa * m * m / np.sum(np.ldexp(1.0, -self.registros.astype(np.int64)))
+        ceros = int(np.count_nonzero(self.registros == 0))
+        if estimado <= 2.5 * m and ceros:
+            # Corrección para cardinalidades pequeñas (linear counting)
+            estimado = m * np.log(m / ceros)
+        return int(round(estimado))
+
+
+class CountMin:
+    """
+    Tabla profundidad x ancho de contadores; la frecuencia de un valor es el
+    mínimo de sus contadores (nunca la subestima).
+    """
+
+    def __init__(self, profundidad: int = PROFUNDIDAD_CM, ancho: int = ANCHO_CM):
+        self.ancho = ancho
+        self.tabla = np.zeros((profundidad, ancho), dtype=np.int64)
+
+    def _columnas(self, hashes: np.ndarray) -> list:
+        # Doble hashing: h1 + i*h2 a partir de las dos mitades del hash
+        h1 = hashes & _MASCARA_32
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        return [
+            ((h1 + np.uint64(i) * h2) % np.uint64(self.ancho)).astype(np.int64)
+            for i in range(self.tabla.shape[0])
+        ]
+
+    def agregar(self, hashes: np.ndarray, pesos: np.ndarray) -> None:
+        for fila, columnas in enumerate(self._columnas(hashes)):
+            np.add.at(self.tabla[fila], columnas, pesos)
+
+    def estimar(self, hashes: np.ndarray) -> np.ndarray:
+        filas = [self.tabla[fila, columnas] for fila, columnas in enumerate(self._columnas(hashes))]
+        return np.min(filas, axis=0)
+
+    def combinar(self, otro: "CountMin") -> "CountMin":
+        self.tabla += otro.tabla
+        return self
+
+
+class SpaceSaving:
+    """
+    Top-K aproximado con a lo más `capacidad` contadores.
+    contadores: clave -> [conteo, error]; el conteo real está en
+    [conteo - error, conteo].
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_SS):
+        self.capacidad = capacidad
+        self.contadores = {}
+
+    def minimo(self) -> int:
+        if len(self.contadores) < self.capacidad:
+            return 0
+        return min(c[0] for c in self.contadores.values())
+
+    def agregar(self, claves: list, pesos: np.ndarray) -> None:
+        contadores = self.contadores
+        # Claves más pesadas primero: así las livianas son las que compiten
+        # por los últimos lugares
+        for posicion in np.argsort(-pesos, kind='stable'):
+            clave, peso = claves[posicion], int(pesos[posicion])
+            if clave in contadores:
+                contadores[clave][0] += peso
+            elif len(contadores) < self.capacidad:
+                contadores[clave] = [peso, 0]
+            else:
+                victima = min(contadores, key=lambda k: contadores[k][0])
+                conteo_min = contadores.pop(victima)[0]
+                contadores[clave] = [conteo_min + peso, conteo_min]
+
+    def combinar(self, otro: "SpaceSaving") -> "SpaceSaving":
+        """
+        Suma los contadores; a una clave ausente en un lado se le suma el
+        mínimo de ese lado (su conteo pudo ser hasta ese valor). Luego se
+        dejan las `capacidad` claves mayores.
+        """
+        min_a, min_b = self.minimo(), otro.minimo()
+        unidos = {}
+        for clave in set(self.contadores) | set(otro.contadores):
+            a = self.contadores.get(clave, [min_a, min_a])
+            b = otro.contadores.get(clave, [min_b, min_b])
+            unidos[clave] = [a[0] + b[0], a[1] + b[1]]
+        mayores = sorted(unidos.items(), key=lambda kv: kv[1][0], reverse=True)[:self.capacidad]
+        self.contadores = dict(mayores)
+        return self
+
+    def top(self, k: int) -> list:
+        """
+        [(clave, conteo, error)] de los k mayores.
+        """
+        mayores = sorted(self.contadores.items(), key=lambda kv: kv[1][0], reverse=True)[:k]
+        return [(clave, conteo, error) for clave, (conteo, error) in mayores]
+
+
+# ============================================================
+# 3. CONJUNTO DE SKETCHES POR DIMENSIÓN
+# ============================================================
+
+class ResumenSketches:
+    """
+    HLL + Count-Min + Space-Saving por cada dimensión de DIMENSIONES_SKETCH.
+    Se actualiza por bloques (con Año_Mes ya derivada) y se combina como
+    AcumuladorAgregados.
+    """
+
+    def __init__(self):
+        self.total_registros = 0
+        self.hll = {nombre: HyperLogLog() for nombre in DIMENSIONES_SKETCH}
+        self.count_min = {nombre: CountMin() for nombre in DIMENSIONES_SKETCH}
+        self.space_saving = {nombre: SpaceSaving() for nombre in DIMENSIONES_SKETCH}
+
+    def actualizar(self, df: pd.DataFrame) -> "ResumenSketches":
+        self.total_registros += len(df)
+        for nombre, columnas in DIMENSIONES_SKETCH.items():
+            conteo = df.groupby(columnas, observed=True).size()
+            if conteo.empty:
+                continue
+            claves = conteo.index.to_frame(index=False)
+            hashes = hash_claves(claves)
+            pesos = conteo.to_numpy(dtype=np.int64)
+            self.hll[nombre].agregar(hashes)
+            self.count_min[nombre].agregar(hashes, pesos)
+            self.space_saving[nombre].agregar(list(conteo.index), pesos)
+        return self
+
+    def combinar(self, otro: "ResumenSketches") -> "ResumenSketches":
+        self.total_registros += otro.total_registros
+        for nombre in DIMENSIONES_SKETCH:
+            self.hll[nombre].combinar(otro.hll[nombre])
+            self.count_min[nombre].combinar(otro.count_min[nombre])
+            self.space_saving[nombre].combinar(otro.space_saving[nombre])
+        return self
+
+    # --- Consultas ---
+    def distintos(self, nombre: str) -> int:
+        return self.hll[nombre].estimar()
+
+    def frecuencia(self, nombre: str, clave) -> int:
+        """
+        Frecuencia aproximada (cota superior) de una clave; para dimensiones
+        de varias columnas la clave es una tupla en el orden de
+        DIMENSIONES_SKETCH.
+        """
+        if not isinstance(clave, tuple):
+            clave = (clave,)
+        claves = pd.DataFrame([clave], columns=DIMENSIONES_SKETCH[nombre])
+        return int(self.count_min[nombre].estimar(hash_claves(claves))[0])
+
+    def top(self, nombre: str, k: int) -> pd.DataFrame:
+        """
+        Top-k de una dimensión: columnas de la clave + Cantidad (estimada
+        por Space-Saving, acotada con Count-Min) y Error (cota máxima).
+        """
+        columnas = DIMENSIONES_SKETCH[nombre]
+        filas = self.space_saving[nombre].top(k)
+        tabla = pd.DataFrame(
+            [clave if isinstance(clave, tuple) else (clave,) for clave, _, _ in filas],
+            columns=columnas,
+        )
+        conteos = np.array([conteo for _, conteo, _ in filas], dtype=np.int64)
+        errores = np.array([error for _, _, error in filas], dtype=np.int64)
+        if len(tabla):
+            # Ambas son cotas superiores: la menor es la mejor estimación
+            cota_cm = self.count_min[nombre].estimar(hash_claves(tabla))
+            mejor = np.minimum(conteos, cota_cm)
+            errores = np.minimum(errores, mejor)
+            conteos = mejor
+        tabla['Cantidad'] = conteos
+        tabla['Error'] = errores
+        return tabla
+
+
+def guardar_sketches(resumen: ResumenSketches, carpeta: str) -> str:
+    ruta = os.path.join(carpeta, ARCHIVO_SKETCHES)
+    temporal = f"{ruta}.tmp{os.getpid()}"
+    with open(temporal, "wb") as f:
+        pickle.dump(resumen, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def cargar_sketches(carpeta: str) -> ResumenSketches:
+    with open(os.path.join(carpeta, ARCHIVO_SKETCHES), "rb") as f:
+        return pickle.load(f)
@@ -4,7 +4,10 @@ import plotly.express as px
 import plotly.graph_objects as go
 import numpy as np
 import os
-import json
+
+from consultas_dashboard import ARCHIVO_DUCKDB, crear_consultas
+from cubo import ARCHIVO_CUBO
+from paquete_agregados import ARCHIVO_PAQUETE
 
 st.set_page_config(page_title="ECU 911 - Dashboard", layout="wide")
 
@@ -22,151 +25,155 @@ GOOGLE_DRIVE_IDS = {
     "conteos_canton.csv": None,
     "conteos_ano_servicio.csv": None,
     "ranking_parroquias.csv": None,
-    "metadatos.json": None
+    "conteos_hora_dia.csv": None,
+    "conteos_hora_servicio.csv": None,
+    "conteos_subtipo_ano.csv": None,
+    "conteos_subtipo_provincia.csv": None,
+    "metadatos.json": None,
+    ARCHIVO_CUBO: None,
+    # Paquete binario con todo lo anterior (basta con descargar este archivo)
+    ARCHIVO_PAQUETE: None
+}
+
+MESES = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun',
+         'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+NOMBRES_DIMENSION = {
+    'Año_Mes': 'Año-Mes', 'DiaSemana': 'Día de la semana', 'Hora': 'Hora',
+    'provincia': 'Provincia', 'Canton': 'Cantón', 'Parroquia': 'Parroquia',
+    'Servicio': 'Servicio', 'Subtipo': 'Subtipo',
 }
 
 # ==========================================
 # CARGA DE DATOS AGREGADOS
 # ==========================================
-@st.cache_data
-def cargar_metadatos():
-    with open(f"{CARPETA_DATOS}/metadatos.json", "r", encoding="utf-8") as f:
-        return json.load(f)
+# Los datos se leen recién cuando una pestaña los pide (el backend los
+# memoriza) y cada figura se guarda en cache_resource según el estado de
+# sus widgets, así un rerun no vuelve a construir figuras que no cambiaron.
+# Todas las funciones memorizadas reciben VERSION_DATOS: si generar_agregados
+# reescribe los datos cambia la versión y se vuelven a leer.
+def version_datos():
+    """
+    Versión de los agregados: el mtime más reciente de metadatos.json, el
+    paquete binario y la base DuckDB (los que existan).
+    """
+    archivos = ["metadatos.json", ARCHIVO_PAQUETE, ARCHIVO_DUCKDB]
+    rutas = [os.path.join(CARPETA_DATOS, archivo) for archivo in archivos]
+    return max((os.stat(ruta).st_mtime_ns for ruta in rutas if os.path.exists(ruta)), default=0)
 
-@st.cache_data
-def cargar_csv(nombre):
-    return pd.read_csv(f"{CARPETA_DATOS}/{nombre}")
+VERSION_DATOS = version_datos()
 
-# Cargar metadatos
-metadatos = cargar_metadatos()
-total_registros = metadatos["total_registros"]
+@st.cache_data
+def cargar_metadatos(version: int):
+    return consultas.metadatos()
 
-# Métricas principales
-st.markdown("### 📈 Resumen General")
-col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-with col_m1:
-    st.metric("Total de Registros", f"{total_registros:,}")
-with col_m2:
-    años = metadatos["anos"]
-    st.metric("Período", f"{min(años)} - {max(años)}")
-with col_m3:
-    st.metric("Provincias", metadatos["provincias"])
-with col_m4:
-    st.metric("Servicios", metadatos["servicios"])
+@st.cache_resource
+def obtener_consultas(version: int):
+    # Backend paquete, csv (pandas) o duckdb según ECU911_BACKEND; compartido por todas las sesiones
+    return crear_consultas(carpeta=CARPETA_DATOS)
 
-st.divider()
+consultas = obtener_consultas(VERSION_DATOS)
 
 # ==========================================
-# CREAR PESTAÑAS
+# FIGURAS (MEMORIZADAS)
 # ==========================================
-tab1, tab2, tab3, tab4 = st.tabs([
-    "📅 Análisis Temporal",
-    "🗺️ Análisis Geográfico", 
-    "📊 Análisis Comparativo",
-    "📋 Información"
-])
+@st.cache_resource
+def figura_heatmap_ano_mes(version: int):
+    heatmap_data = consultas.conteos_ano_mes()
+    heatmap_pivot = heatmap_data.pivot(index='Año', columns='Mes', values='Cantidad').fillna(0)
 
-# ==========================================
-# TAB 1: ANÁLISIS TEMPORAL
-# ==========================================
-with tab1:
-    st.subheader("📅 Análisis Temporal de Incidentes")
-    
-    col1, col2 = st.columns(2)
-    
-    # --- HEATMAP: ¿Hay meses con más incidentes? ---
-    with col1:
-        st.markdown("#### 🔥 Heatmap: Incidentes por Año y Mes")
-        st.caption("¿Hay meses con más incidentes?")
-        
-        heatmap_data = cargar_csv("conteos_ano_mes.csv")
-        heatmap_pivot = heatmap_data.pivot(index='Año', columns='Mes', values='Cantidad').fillna(0)
-        
-        meses = ['Ene', 'Feb', 'Mar', 'Abr', 'May', 'Jun', 
-                 'Jul', 'Ago', 'Sep', 'Oct', 'Nov', 'Dic']
-        
-        fig_heatmap = go.Figure(data=go.Heatmap(
-            z=heatmap_pivot.values,
-            x=meses,
-            y=heatmap_pivot.index.astype(str),
-            colorscale='YlOrRd',
-            text=heatmap_pivot.values.astype(int),
-            texttemplate="%{text:,}",
-            textfont={"size": 10},
-            hovertemplate='Año: %{y}<br>Mes: %{x}<br>Incidentes: %{z:,}<extra></extra>'
-        ))
-        
-        fig_heatmap.update_layout(
-            height=400,
-            xaxis_title="Mes",
-            yaxis_title="Año",
-            yaxis=dict(type='category'),
-            xaxis=dict(showgrid=False),
-            yaxis_showgrid=False
-        )
-        st.plotly_chart(fig_heatmap, use_container_width=True)
-    
-    # --- BARRAS: ¿Qué día tiene más emergencias? ---
-    with col2:
-        st.markdown("#### 📊 Incidentes por Día de la Semana")
-        st.caption("¿Qué día tiene más emergencias?")
-        
-        datos_dia = cargar_csv("conteos_dia_semana.csv")
-        dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-        datos_dia['Dia'] = datos_dia['DiaSemana'].apply(lambda x: dias[int(x)])
-        datos_dia = datos_dia.sort_values('DiaSemana')
-        
-        fig_dias = px.bar(
-            datos_dia,
-            x='Dia',
-            y='Cantidad',
-            color='Cantidad',
-            color_continuous_scale='YlOrRd',
-            text='Cantidad'
-        )
-        
-        fig_dias.update_traces(texttemplate='%{text:,}', textposition='outside')
-        fig_dias.update_layout(
-            height=400,
-            xaxis_title="Día de la semana",
-            yaxis_title="Cantidad de incidentes",
-            showlegend=False,
-            xaxis={'categoryorder': 'array', 'categoryarray': dias, 'showgrid': False},
-            yaxis=dict(showgrid=False)
-        )
-        st.plotly_chart(fig_dias, use_container_width=True)
-        
-        dia_pico = datos_dia.loc[datos_dia['Cantidad'].idxmax()]
-        st.info(f"📌 **Día con más emergencias:** {dia_pico['Dia']} con {dia_pico['Cantidad']:,} incidentes")
-    
-    # Insights
-    st.markdown("---")
-    col_i1, col_i2, col_i3 = st.columns(3)
-    
-    mes_pico = heatmap_data.loc[heatmap_data['Cantidad'].idxmax()]
-    mes_min = heatmap_data.loc[heatmap_data['Cantidad'].idxmin()]
-    
-    with col_i1:
-        st.info(f"📅 **Mes pico:** {meses[int(mes_pico['Mes'])-1]} {int(mes_pico['Año'])} con {mes_pico['Cantidad']:,} incidentes")
-    with col_i2:
-        st.info(f"📉 **Mes más bajo:** {meses[int(mes_min['Mes'])-1]} {int(mes_min['Año'])} con {mes_min['Cantidad']:,} incidentes")
-    with col_i3:
-        promedio_mensual = heatmap_data['Cantidad'].mean()
-        st.info(f"📊 **Promedio mensual:** {promedio_mensual:,.0f} incidentes")
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=heatmap_pivot.values,
+        x=MESES,
+        y=heatmap_pivot.index.astype(str),
+        colorscale='YlOrRd',
+        text=heatmap_pivot.values.astype(int),
+        texttemplate="%{text:,}",
+        textfont={"size": 10},
+        hovertemplate='Año: %{y}<br>Mes: %{x}<br>Incidentes: %{z:,}<extra></extra>'
+    ))
 
-# ==========================================
-# TAB 2: ANÁLISIS GEOGRÁFICO
-# ==========================================
-with tab2:
-    st.subheader("🗺️ Análisis Geográfico de Incidentes")
-    
-    # Provincias más afectadas
-    st.markdown("#### 📍 Provincias más Afectadas")
-    
-    datos_provincia = cargar_csv("conteos_provincia.csv")
-    
+    fig_heatmap.update_layout(
+        height=400,
+        xaxis_title="Mes",
+        yaxis_title="Año",
+        yaxis=dict(type='category'),
+        xaxis=dict(showgrid=False),
+        yaxis_showgrid=False
+    )
+    return fig_heatmap
+
+@st.cache_data
+def datos_dia_semana(version: int):
+    datos_dia = consultas.conteos_dia_semana().copy()
+    datos_dia['Dia'] = datos_dia['DiaSemana'].apply(lambda x: DIAS[int(x)])
+    return datos_dia.sort_values('DiaSemana')
+
+@st.cache_resource
+def figura_dias(version: int):
+    fig_dias = px.bar(
+        datos_dia_semana(VERSION_DATOS),
+        x='Dia',
+        y='Cantidad',
+        color='Cantidad',
+        color_continuous_scale='YlOrRd',
+        text='Cantidad'
+    )
+
+    fig_dias.update_traces(texttemplate='%{text:,}', textposition='outside')
+    fig_dias.update_layout(
+        height=400,
+        xaxis_title="Día de la semana",
+        yaxis_title="Cantidad de incidentes",
+        showlegend=False,
+        xaxis={'categoryorder': 'array', 'categoryarray': DIAS, 'showgrid': False},
+        yaxis=dict(showgrid=False)
+    )
+    return fig_dias
+
+@st.cache_resource
+def figura_hora_dia(version: int):
+    hora_dia = consultas.conteos_hora_dia()
+    hora_dia_pivot = hora_dia.pivot(index='DiaSemana', columns='Hora', values='Cantidad').fillna(0)
+
+    fig_hora_dia = go.Figure(data=go.Heatmap(
+        z=hora_dia_pivot.values,
+        x=hora_dia_pivot.columns.astype(str),
+        y=[DIAS[int(d)] for d in hora_dia_pivot.index],
+        colorscale='YlOrRd',
+        hovertemplate='Día: %{y}<br>Hora: %{x}<br>Incidentes: %{z:,}<extra></extra>'
+    ))
+    fig_hora_dia.update_layout(
+        height=400,
+        xaxis_title="Hora",
+        yaxis_title="Día",
+        yaxis=dict(autorange='reversed', showgrid=False),
+        xaxis=dict(showgrid=False)
+    )
+    return fig_hora_dia
+
+@st.cache_resource
+def figura_hora_servicio(version: int):
+    fig_hora_servicio = px.line(
+        consultas.conteos_hora_servicio(),
+        x='Hora',
+        y='Cantidad',
+        color='Servicio',
+        markers=True
+    )
+    fig_hora_servicio.update_layout(height=400, xaxis=dict(dtick=1, showgrid=False), yaxis=dict(showgrid=False))
+    return fig_hora_servicio
+
+@st.cache_resource
+def figura_diaria(version: int):
+    fig_diaria = px.line(consultas.conteos_diarios(), x='Dia', y='Cantidad')
+    fig_diaria.update_layout(height=350, xaxis_title="Día", yaxis_title="Cantidad de incidentes")
+    return fig_diaria
+
+@st.cache_resource
+def figura_provincias(version: int):
     fig_provincias = px.bar(
-        datos_provincia,
+        consultas.conteos_provincia(),
         x='Cantidad',
         y='Provincia',
         orientation='h',
@@ -180,53 +187,25 @@ with tab2:
         yaxis={'categoryorder': 'total ascending'},
         showlegend=False
     )
-    st.plotly_chart(fig_provincias, use_container_width=True)
-    
-    st.markdown("---")
-    
-    # Evolución por provincia
-    st.markdown("#### 📈 Evolución de Provincias en el Tiempo")
-    st.caption("¿Cómo cambia cada provincia en el tiempo?")
-    
-    evolucion = cargar_csv("evolucion_provincia.csv")
-    top_provincias = datos_provincia.head(10)['Provincia'].tolist()
-    
-    provincias_seleccionadas = st.multiselect(
-        "Selecciona provincias a comparar:",
-        options=datos_provincia['Provincia'].tolist(),
-        default=top_provincias[:5]
+    return fig_provincias
+
+@st.cache_resource
+def figura_evolucion(version: int, provincias: tuple):
+    fig_evolucion = px.line(
+        consultas.evolucion_provincia(list(provincias)),
+        x='Año_Mes',
+        y='Cantidad',
+        color='provincia',
+        markers=True,
+        title="Evolución mensual de incidentes por provincia"
     )
-    
-    if provincias_seleccionadas:
-        evolucion_filtrada = evolucion[evolucion['provincia'].isin(provincias_seleccionadas)]
-        
-        fig_evolucion = px.line(
-            evolucion_filtrada,
-            x='Año_Mes',
-            y='Cantidad',
-            color='provincia',
-            markers=True,
-            title="Evolución mensual de incidentes por provincia"
-        )
-        fig_evolucion.update_layout(height=450, xaxis_tickangle=45, legend_title="Provincia")
-        st.plotly_chart(fig_evolucion, use_container_width=True)
-    else:
-        st.warning("Selecciona al menos una provincia para ver la evolución.")
+    fig_evolucion.update_layout(height=450, xaxis_tickangle=45, legend_title="Provincia")
+    return fig_evolucion
 
-# ==========================================
-# TAB 3: ANÁLISIS COMPARATIVO
-# ==========================================
-with tab3:
-    st.subheader("📊 Análisis Comparativo")
-    
-    # Año vs Año
-    st.markdown("#### 📅 Comparación Año vs Año")
-    st.caption("¿2024 tuvo más incidentes que 2023?")
-    
-    datos_año_servicio = cargar_csv("conteos_ano_servicio.csv")
-    
+@st.cache_resource
+def figura_ano_servicio(version: int):
     fig_anio = px.bar(
-        datos_año_servicio,
+        consultas.conteos_ano_servicio(),
         x='Año',
         y='Cantidad',
         color='Servicio',
@@ -236,24 +215,17 @@ with tab3:
     )
     fig_anio.update_traces(texttemplate='%{text:,.0f}', textposition='outside', textfont_size=9)
     fig_anio.update_layout(
-        height=450, 
+        height=450,
         xaxis={'type': 'category', 'showgrid': False},
         yaxis=dict(showgrid=False)
     )
-    st.plotly_chart(fig_anio, use_container_width=True)
-    
-    st.markdown("---")
-    
-    # Ranking de parroquias
-    st.markdown("#### 🎯 Ranking de Parroquias (Puntos Críticos)")
-    st.caption("¿Cuáles son los puntos críticos?")
-    
-    n_parroquias = st.slider("Número de parroquias a mostrar:", 10, 30, 15)
-    
-    ranking = cargar_csv("ranking_parroquias.csv")
-    datos_parroquia = ranking.head(n_parroquias).copy()
+    return fig_anio
+
+@st.cache_resource
+def figura_parroquias(version: int, n_parroquias: int):
+    datos_parroquia = consultas.ranking_parroquias(n_parroquias)
     datos_parroquia['Etiqueta'] = datos_parroquia['Parroquia'] + ' (' + datos_parroquia['provincia'] + ')'
-    
+
     fig_parroquias = px.bar(
         datos_parroquia,
         x='Cantidad',
@@ -270,32 +242,345 @@ with tab3:
         showlegend=True,
         legend_title="Provincia"
     )
-    st.plotly_chart(fig_parroquias, use_container_width=True)
+    return fig_parroquias
+
+@st.cache_resource
+def figura_subtipo_ano(version: int):
+    subtipo_ano = consultas.conteos_subtipo_ano()
+    fig_subtipo_ano = px.bar(
+        subtipo_ano,
+        x='Cantidad',
+        y='Subtipo',
+        color=subtipo_ano['Año'].astype(str),
+        orientation='h',
+        title="Subtipos por Año"
+    )
+    fig_subtipo_ano.update_layout(
+        height=600,
+        yaxis={'categoryorder': 'total ascending'},
+        legend_title="Año"
+    )
+    return fig_subtipo_ano
+
+@st.cache_resource
+def figura_subtipo_provincia(version: int, provincia: str):
+    fig_subtipo_provincia = px.bar(
+        consultas.conteos_subtipo_provincia(provincia),
+        x='Cantidad',
+        y='Subtipo',
+        orientation='h',
+        color='Cantidad',
+        color_continuous_scale='Blues',
+        title=f"Subtipos en {provincia}"
+    )
+    fig_subtipo_provincia.update_layout(
+        height=550,
+        yaxis={'categoryorder': 'total ascending'},
+        showlegend=False
+    )
+    return fig_subtipo_provincia
+
+@st.cache_resource
+def figura_explorador(version: int, por: tuple, provincias: tuple, servicios: tuple, subtipos: tuple,
+                      desde: str, hasta: str):
+    """
+    Devuelve (figura, total) del explorador, o (None, 0) si no hay datos.
+    """
+    dimension, color = por[0], (por[1] if len(por) > 1 else None)
+    resultado = consultas.consultar(
+        list(por),
+        filtros={
+            'provincia': list(provincias) or None,
+            'Servicio': list(servicios) or None,
+            'Subtipo': list(subtipos) or None,
+        },
+        desde=desde,
+        hasta=hasta,
+    )
+    if resultado.empty:
+        return None, 0
+    if color:
+        # Solo las 10 categorías con más incidentes para que el gráfico sea legible
+        top_color = resultado.groupby(color)['Cantidad'].sum().nlargest(10).index
+        resultado = resultado[resultado[color].isin(top_color)]
+    total = int(resultado['Cantidad'].sum())
+    fig_explorador = px.bar(
+        resultado,
+        x=dimension,
+        y='Cantidad',
+        color=color,
+        title=f"Incidentes por {NOMBRES_DIMENSION[dimension]}"
+    )
+    fig_explorador.update_layout(
+        height=450,
+        xaxis={'type': 'category', 'showgrid': False},
+        yaxis=dict(showgrid=False),
+        xaxis_title=NOMBRES_DIMENSION[dimension]
+    )
+    return fig_explorador, total
 
 # ==========================================
-# TAB 4: INFORMACIÓN
+# SECCIONES INTERACTIVAS (FRAGMENTOS)
 # ==========================================
-with tab4:
-    st.subheader("📋 Información del Dataset")
-    
-    st.markdown(f"""
-    ### Datos ECU 911 (2021-2025)
-    
-    - **Total de registros:** {total_registros:,}
-    - **Período:** {min(años)} - {max(años)}
-    - **Provincias:** {metadatos['provincias']}
-    - **Servicios:** {metadatos['servicios']}
-    
-    ### Columnas originales del dataset:
-    """)
-    
-    for col in metadatos['columnas']:
-        st.markdown(f"- `{col}`")
-    
-    st.markdown("""
-    ---
-    ### Notas técnicas
-    
-    Este dashboard utiliza datos pre-agregados para optimizar el rendimiento en la nube.
-    Los gráficos muestran estadísticas calculadas sobre los **16.3 millones de registros** originales.
-    """)
+# Un cambio en estos widgets solo vuelve a ejecutar su fragmento
+@st.fragment
+def seccion_evolucion():
+    datos_provincia = consultas.conteos_provincia()
+    top_provincias = datos_provincia.head(10)['Provincia'].tolist()
+
+    provincias_seleccionadas = st.multiselect(
+        "Selecciona provincias a comparar:",
+        options=datos_provincia['Provincia'].tolist(),
+        default=top_provincias[:5]
+    )
+
+    if provincias_seleccionadas:
+        st.plotly_chart(figura_evolucion(VERSION_DATOS, tuple(provincias_seleccionadas)), use_container_width=True)
+    else:
+        st.warning("Selecciona al menos una provincia para ver la evolución.")
+
+@st.fragment
+def seccion_ranking():
+    n_parroquias = st.slider("Número de parroquias a mostrar:", 10, 30, 15)
+    st.plotly_chart(figura_parroquias(VERSION_DATOS, n_parroquias), use_container_width=True)
+
+@st.fragment
+def seccion_subtipo_provincia():
+    provincia_subtipo = st.selectbox(
+        "Provincia:", options=consultas.conteos_provincia()['Provincia'].tolist()
+    )
+    st.plotly_chart(figura_subtipo_provincia(VERSION_DATOS, provincia_subtipo), use_container_width=True)
+
+@st.fragment
+def seccion_explorador():
+    col_f1, col_f2, col_f3 = st.columns(3)
+    with col_f1:
+        filtro_provincias = st.multiselect("Provincias:", consultas.valores('provincia'))
+    with col_f2:
+        filtro_servicios = st.multiselect("Servicios:", consultas.valores('Servicio'))
+    with col_f3:
+        filtro_subtipos = st.multiselect("Subtipos:", consultas.valores('Subtipo'))
+
+    periodos = consultas.valores('Año_Mes')
+    desde, hasta = st.select_slider(
+        "Período:", options=periodos, value=(periodos[0], periodos[-1])
+    )
+
+    col_d1, col_d2 = st.columns(2)
+    with col_d1:
+        # Sin hora en Fecha (feed con solo el día) todo el cubo está en Hora=0
+        dimensiones = ['Hora'] if metadatos.get('con_hora', True) else []
+        dimension = st.selectbox(
+            "Agrupar por:", dimensiones + ['DiaSemana', 'Año_Mes', 'provincia', 'Servicio', 'Subtipo'],
+            format_func=NOMBRES_DIMENSION.get
+        )
+    with col_d2:
+        opciones_color = [d for d in ['Servicio', 'provincia', 'Subtipo'] if d != dimension]
+        color = st.selectbox(
+            "Desglosar por:", [None] + opciones_color,
+            format_func=lambda d: "(ninguno)" if d is None else NOMBRES_DIMENSION[d]
+        )
+
+    por = (dimension,) + ((color,) if color else ())
+    fig_explorador, total = figura_explorador(
+        VERSION_DATOS, por, tuple(filtro_provincias), tuple(filtro_servicios), tuple(filtro_subtipos), desde, hasta
+    )
+    if fig_explorador is None:
+        st.warning("No hay incidentes con esos filtros.")
+    else:
+        st.plotly_chart(fig_explorador, use_container_width=True)
+        st.info(f"📌 **Total con los filtros:** {total:,} incidentes")
+
+# Cargar metadatos
+metadatos = cargar_metadatos(VERSION_DATOS)
+total_registros = metadatos["total_registros"]
+
+# Métricas principales
+st.markdown("### 📈 Resumen General")
+col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+with col_m1:
+    st.metric("Total de Registros", f"{total_registros:,}")
+with col_m2:
+    años = metadatos["anos"]
+    st.metric("Período", f"{min(años)} - {max(años)}")
+with col_m3:
+    st.metric("Provincias", metadatos["provincias"])
+with col_m4:
+    st.metric("Servicios", metadatos["servicios"])
+
+st.divider()
+
+# ==========================================
+# CREAR PESTAÑAS
+# ==========================================
+nombres_pestanas = [
+    "📅 Análisis Temporal",
+    "🗺️ Análisis Geográfico",
+    "📊 Análisis Comparativo",
+    "🔎 Explorador",
+    "📋 Información"
+]
+try:
+    # Con on_change="rerun" solo se ejecuta la pestaña abierta (tab.open)
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(nombres_pestanas, key="pestana", on_change="rerun")
+except TypeError:
+    # Streamlit sin pestañas perezosas: se ejecutan todas
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(nombres_pestanas)
+
+def pestana_abierta(tab):
+    return getattr(tab, "open", None) is not False
+
+# ==========================================
+# TAB 1: ANÁLISIS TEMPORAL
+# ==========================================
+if pestana_abierta(tab1):
+    with tab1:
+        st.subheader("📅 Análisis Temporal de Incidentes")
+
+        col1, col2 = st.columns(2)
+
+        # --- HEATMAP: ¿Hay meses con más incidentes? ---
+        with col1:
+            st.markdown("#### 🔥 Heatmap: Incidentes por Año y Mes")
+            st.caption("¿Hay meses con más incidentes?")
+            st.plotly_chart(figura_heatmap_ano_mes(VERSION_DATOS), use_container_width=True)
+
+        # --- BARRAS: ¿Qué día tiene más emergencias? ---
+        with col2:
+            st.markdown("#### 📊 Incidentes por Día de la Semana")
+            st.caption("¿Qué día tiene más emergencias?")
+            st.plotly_chart(figura_dias(VERSION_DATOS), use_container_width=True)
+
+            datos_dia = datos_dia_semana(VERSION_DATOS)
+            dia_pico = datos_dia.loc[datos_dia['Cantidad'].idxmax()]
+            st.info(f"📌 **Día con más emergencias:** {dia_pico['Dia']} con {dia_pico['Cantidad']:,} incidentes")
+
+        # Insights
+        st.markdown("---")
+        col_i1, col_i2, col_i3 = st.columns(3)
+
+        heatmap_data = consultas.conteos_ano_mes()
+        mes_pico = heatmap_data.loc[heatmap_data['Cantidad'].idxmax()]
+        mes_min = heatmap_data.loc[heatmap_data['Cantidad'].idxmin()]
+
+        with col_i1:
+            st.info(f"📅 **Mes pico:** {MESES[int(mes_pico['Mes'])-1]} {int(mes_pico['Año'])} con {mes_pico['Cantidad']:,} incidentes")
+        with col_i2:
+            st.info(f"📉 **Mes más bajo:** {MESES[int(mes_min['Mes'])-1]} {int(mes_min['Año'])} con {mes_min['Cantidad']:,} incidentes")
+        with col_i3:
+            promedio_mensual = heatmap_data['Cantidad'].mean()
+            st.info(f"📊 **Promedio mensual:** {promedio_mensual:,.0f} incidentes")
+
+        # --- HEATMAP HORA x DÍA y HORA x SERVICIO ---
+        # (solo si Fecha trae hora, ver con_hora en metadatos.json)
+        if (metadatos.get('con_hora', True) and consultas.disponible('conteos_hora_dia')
+                and consultas.disponible('conteos_hora_servicio')):
+            st.markdown("---")
+            col_h1, col_h2 = st.columns(2)
+
+            with col_h1:
+                st.markdown("#### 🕐 Heatmap: Hora del Día vs Día de la Semana")
+                st.caption("¿A qué hora ocurren más incidentes?")
+                st.plotly_chart(figura_hora_dia(VERSION_DATOS), use_container_width=True)
+
+            with col_h2:
+                st.markdown("#### 🚑 Incidentes por Hora y Servicio")
+                st.caption("¿Cambia el tipo de servicio según la hora?")
+                st.plotly_chart(figura_hora_servicio(VERSION_DATOS), use_container_width=True)
+
+        # --- SERIE DIARIA (solo con el backend duckdb y agregados finos) ---
+        if consultas.disponible('conteos_diarios'):
+            st.markdown("---")
+            st.markdown("#### 📆 Incidentes por Día")
+            st.plotly_chart(figura_diaria(VERSION_DATOS), use_container_width=True)
+
+# ==========================================
+# TAB 2: ANÁLISIS GEOGRÁFICO
+# ==========================================
+if pestana_abierta(tab2):
+    with tab2:
+        st.subheader("🗺️ Análisis Geográfico de Incidentes")
+
+        # Provincias más afectadas
+        st.markdown("#### 📍 Provincias más Afectadas")
+        st.plotly_chart(figura_provincias(VERSION_DATOS), use_container_width=True)
+
+        st.markdown("---")
+
+        # Evolución por provincia
+        st.markdown("#### 📈 Evolución de Provincias en el Tiempo")
+        st.caption("¿Cómo cambia cada provincia en el tiempo?")
+        seccion_evolucion()
+
+# ==========================================
+# TAB 3: ANÁLISIS COMPARATIVO
+# ==========================================
+if pestana_abierta(tab3):
+    with tab3:
+        st.subheader("📊 Análisis Comparativo")
+
+        # Año vs Año
+        st.markdown("#### 📅 Comparación Año vs Año")
+        st.caption("¿2024 tuvo más incidentes que 2023?")
+        st.plotly_chart(figura_ano_servicio(VERSION_DATOS), use_container_width=True)
+
+        st.markdown("---")
+
+        # Ranking de parroquias
+        st.markdown("#### 🎯 Ranking de Parroquias (Puntos Críticos)")
+        st.caption("¿Cuáles son los puntos críticos?")
+        seccion_ranking()
+
+        # Subtipos de incidente
+        if consultas.disponible('conteos_subtipo_ano') and consultas.disponible('conteos_subtipo_provincia'):
+            st.markdown("---")
+            st.markdown("#### 🏷️ Subtipos de Incidente")
+            st.caption("¿Qué tipos de incidente predominan y cómo cambian?")
+
+            col_s1, col_s2 = st.columns(2)
+            with col_s1:
+                st.plotly_chart(figura_subtipo_ano(VERSION_DATOS), use_container_width=True)
+            with col_s2:
+                seccion_subtipo_provincia()
+
+# ==========================================
+# TAB 4: EXPLORADOR (CUBO DE CONTEOS)
+# ==========================================
+if pestana_abierta(tab4):
+    with tab4:
+        st.subheader("🔎 Explorador de Incidentes")
+        st.caption("Cruces libres sobre el cubo de conteos, sin volver a procesar los datos")
+
+        if not consultas.disponible('cubo_conteos'):
+            st.warning(f"No se encontró {CARPETA_DATOS}/{ARCHIVO_CUBO}. Ejecuta generar_agregados.py para crearlo.")
+        else:
+            seccion_explorador()
+
+# ==========================================
+# TAB 5: INFORMACIÓN
+# ==========================================
+if pestana_abierta(tab5):
+    with tab5:
+        st.subheader("📋 Información del Dataset")
+
+        st.markdown(f"""
+        ### Datos ECU 911 (2021-2025)
+
+        - **Total de registros:** {total_registros:,}
+        - **Período:** {min(años)} - {max(años)}
+        - **Provincias:** {metadatos['provincias']}
+        - **Servicios:** {metadatos['servicios']}
+
+        ### Columnas originales del dataset:
+        """)
+
+        for col in metadatos['columnas']:
+            st.markdown(f"- `{col}`")
+
+        st.markdown("""
+        ---
+        ### Notas técnicas
+
+        Este dashboard utiliza datos pre-agregados para optimizar el rendimiento en la nube.
+        Los gráficos muestran estadísticas calculadas sobre los **16.3 millones de registros** originales.
+        """)
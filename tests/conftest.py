@@ -0,0 +1,55 @@
+"""
+Datos de prueba compartidos: catálogo y eventos de datos_sinteticos.py
+(chicos, para que cada prueba corra en segundos).
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# Los scripts del pipeline viven en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos_sinteticos import GeneradorEventos, generar_catalogo  # noqa: E402
+from esquema import COLUMNAS_CATEGORICAS, parsear_fecha  # noqa: E402
+
+FILAS_MES = 5_000
+MESES_PRUEBA = [(2021, 7), (2021, 8), (2022, 1)]
+
+
+@pytest.fixture(scope="session")
+def catalogo():
+    return generar_catalogo(cantones=3, parroquias=4)
+
+
+def generar_eventos(catalogo, con_hora=False):
+    generador = GeneradorEventos(catalogo, con_hora=con_hora)
+    return pd.concat([generador.bloque(FILAS_MES, anio, mes) for anio, mes in MESES_PRUEBA],
+                     ignore_index=True)
+
+
+@pytest.fixture
+def eventos(catalogo):
+    """
+    Eventos crudos (Fecha como texto dd/mm/YYYY, el resto object).
+    """
+    return generar_eventos(catalogo)
+
+
+@pytest.fixture
+def eventos_con_hora(catalogo):
+    return generar_eventos(catalogo, con_hora=True)
+
+
+@pytest.fixture
+def eventos_tipados(eventos):
+    """
+    Eventos como los deja leer_csv_tipado: Fecha datetime, texto como category.
+    """
+    df = eventos.copy()
+    df['Fecha'] = parsear_fecha(df['Fecha'], informar=False)
+    for col in COLUMNAS_CATEGORICAS:
+        df[col] = df[col].astype('category')
+    df['Cod_Parroquia'] = df['Cod_Parroquia'].astype('Int64')
+    return df
@@ -0,0 +1,70 @@
+"""
+Parquet / CSV: lo que se escribe se vuelve a leer igual, por archivo,
+por particiones y por bloques.
+"""
+import pandas as pd
+import pandas.testing as pdt
+
+from almacenamiento import EscritorPorBloques, escribir_tabla, leer_tabla, leer_tabla_por_bloques
+from esquema import ESQUEMA_EMERGENCIAS, leer_csv_tipado, parsear_fecha
+
+
+def ordenar(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def como_texto(df):
+    """
+    Valores planos para comparar sin depender de categorías ni de dtypes.
+    """
+    return df.astype(object).where(df.notna(), None)
+
+
+def test_parquet_ida_y_vuelta(eventos_tipados, tmp_path):
+    ruta = escribir_tabla(eventos_tipados, str(tmp_path / "mes.csv"), formato='parquet')
+    assert ruta.endswith(".parquet")
+    leido = leer_tabla(ruta)
+    pdt.assert_frame_equal(leido, eventos_tipados)
+
+
+def test_parquet_particionado_igual_al_original(eventos_tipados, tmp_path):
+    ruta = escribir_tabla(eventos_tipados, str(tmp_path / "anual.csv"), formato='parquet',
+                          particionar=True)
+    leido = leer_tabla(ruta)
+    assert list(leido.columns) == list(eventos_tipados.columns)
+    pdt.assert_frame_equal(como_texto(ordenar(leido)), como_texto(ordenar(eventos_tipados)))
+
+
+def test_parquet_y_csv_equivalentes(eventos_tipados, tmp_path):
+    ruta_csv = escribir_tabla(eventos_tipados, str(tmp_path / "mes.csv"), formato='csv')
+    ruta_parquet = escribir_tabla(eventos_tipados, str(tmp_path / "mes.csv"), formato='parquet')
+
+    desde_csv = leer_csv_tipado(ruta_csv, ESQUEMA_EMERGENCIAS)
+    desde_csv['Fecha'] = parsear_fecha(desde_csv['Fecha'], informar=False)
+    desde_parquet = leer_tabla(ruta_parquet)
+    pdt.assert_frame_equal(como_texto(desde_csv), como_texto(desde_parquet))
+
+
+def test_lectura_por_bloques_cubre_todo(eventos_tipados, tmp_path):
+    ruta = escribir_tabla(eventos_tipados, str(tmp_path / "mes.csv"), formato='parquet')
+    bloques = list(leer_tabla_por_bloques(ruta, ['Fecha', 'Servicio'], tamano_bloque=2_000))
+    assert all(len(b) <= 2_000 for b in bloques)
+    juntos = pd.concat(bloques, ignore_index=True)
+    pdt.assert_frame_equal(como_texto(juntos), como_texto(eventos_tipados[['Fecha', 'Servicio']]))
+
+
+def test_escritor_por_bloques_igual_a_escribir_tabla(eventos_tipados, tmp_path):
+    completo = leer_tabla(escribir_tabla(eventos_tipados, str(tmp_path / "completo.csv"),
+                                         formato='parquet'))
+    ruta = str(tmp_path / "bloques.parquet")
+    with EscritorPorBloques(ruta, 'parquet') as escritor:
+        for inicio in range(0, len(eventos_tipados), 4_000):
+            escritor.escribir(eventos_tipados.iloc[inicio:inicio + 4_000])
+    pdt.assert_frame_equal(leer_tabla(ruta), completo, check_categorical=False)
+
+
+def test_escritor_particionado_sin_filas(eventos_tipados, tmp_path):
+    ruta = str(tmp_path / "vacio.parquet")
+    with EscritorPorBloques(ruta, 'parquet', particionar=True) as escritor:
+        escritor.escribir(eventos_tipados.iloc[:0])
+    assert leer_tabla(ruta).empty
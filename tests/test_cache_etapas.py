@@ -0,0 +1,80 @@
+"""
+Cache de etapas: claves por contenido, restauración, poda LRU y el
+atajo de unir_archivos_georreferenciados cuando ningún mes cambió.
+"""
+import os
+
+import pandas.testing as pdt
+import pytest
+
+from cache_etapas import ARCHIVO_ENTRADA, CacheEtapas
+from catalogo_inec import preparar_inec_ref
+from procesar_todos_emergencias import clean_emergencias, mapear_parroquias_inec
+from unir_georreferenciados import unir_archivos_georreferenciados
+
+
+def escribir(ruta, texto):
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
+    return str(ruta)
+
+
+def test_clave_depende_del_contenido(tmp_path):
+    cache = CacheEtapas(str(tmp_path / "cache"))
+    entrada = escribir(tmp_path / "mes.csv", "a;b\n1;2\n")
+    clave = cache.clave("unir", [entrada], formato="csv")
+    assert cache.clave("unir", [entrada], formato="csv") == clave
+    assert cache.clave("unir", [entrada], formato="parquet") != clave
+
+    escribir(entrada, "a;b\n1;3\n")
+    os.utime(entrada, (1, 1))
+    assert cache.clave("unir", [entrada], formato="csv") != clave
+
+
+def test_guardar_y_restaurar(tmp_path):
+    cache = CacheEtapas(str(tmp_path / "cache"))
+    salida = escribir(tmp_path / "salida.csv", "x\n1\n")
+    assert not cache.restaurar("clave", str(tmp_path / "restaurada.csv"))
+    cache.guardar("clave", "unir", salida)
+    assert cache.restaurar("clave", str(tmp_path / "restaurada.csv"))
+    with open(tmp_path / "restaurada.csv", encoding="utf-8") as f:
+        assert f.read() == "x\n1\n"
+
+
+def test_poda_la_menos_usada(tmp_path):
+    cache = CacheEtapas(str(tmp_path / "cache"))
+    salida = escribir(tmp_path / "salida.csv", "x" * 10_000)
+    cache.guardar("a" * 64, "unir", salida)
+    cache.guardar("b" * 64, "unir", salida)
+    os.utime(os.path.join(cache._entrada("a" * 64), ARCHIVO_ENTRADA), (100, 100))
+    os.utime(os.path.join(cache._entrada("b" * 64), ARCHIVO_ENTRADA), (200, 200))
+    # Usar "a" la vuelve la más reciente: al pasar el límite se borra "b"
+    assert cache.restaurar("a" * 64, str(tmp_path / "copia.csv"))
+
+    cache.limite_mb = 25_000 / (1024 * 1024)
+    cache.guardar("c" * 64, "unir", salida)
+    assert cache.restaurar("a" * 64, str(tmp_path / "copia.csv"))
+    assert not cache.restaurar("b" * 64, str(tmp_path / "copia.csv"))
+    assert cache.restaurar("c" * 64, str(tmp_path / "copia.csv"))
+
+
+@pytest.mark.parametrize("formato", ["csv", "parquet"])
+def test_unir_desde_cache_devuelve_el_mismo_frame(eventos, catalogo, tmp_path, monkeypatch, capsys, formato):
+    monkeypatch.chdir(tmp_path)
+    geo = mapear_parroquias_inec(clean_emergencias(eventos), preparar_inec_ref(catalogo))
+    mitad = len(geo) // 2
+    geo.iloc[:mitad].to_csv("emergencias_julio_2021_georreferenciado.csv", index=False)
+    geo.iloc[mitad:].to_csv("emergencias_agosto_2021_georreferenciado.csv", index=False)
+
+    calculado = unir_archivos_georreferenciados(formato)
+    capsys.readouterr()
+    desde_cache = unir_archivos_georreferenciados(formato)
+    assert "restaurado de la cache" in capsys.readouterr().out
+    assert desde_cache is not None
+    assert len(desde_cache) == len(geo)
+    if formato == "parquet":
+        # Las particiones anio/mes no conservan el orden de las filas
+        columnas = list(calculado.columns)
+        calculado = calculado.sort_values(columnas).reset_index(drop=True)
+        desde_cache = desde_cache[columnas].sort_values(columnas).reset_index(drop=True)
+    pdt.assert_frame_equal(desde_cache.astype(object), calculado.astype(object))
@@ -0,0 +1,88 @@
+"""
+Backends del dashboard: csv, paquete y duckdb devuelven las mismas tablas
+y la base DuckDB solo se usa si no es más vieja que los agregados.
+"""
+import os
+
+import pandas.testing as pdt
+import pytest
+
+import generar_agregados
+from consultas_dashboard import (
+    ARCHIVO_DUCKDB,
+    ARCHIVO_METADATOS,
+    ConsultasCSV,
+    ConsultasDuckDB,
+    ConsultasPaquete,
+    construir_base,
+)
+
+# DuckDB es opcional (requirements-duckdb.txt)
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture
+def agregados(eventos, tmp_path, monkeypatch):
+    """
+    Agregados de los eventos de prueba (con paquete) en tmp_path/agregados.
+    """
+    monkeypatch.chdir(tmp_path)
+    # Pocos subtipos en el top para que haya filas "otros"
+    monkeypatch.setattr(generar_agregados, "TOP_SUBTIPOS", 5)
+    carpeta = str(tmp_path / "agregados")
+    acumulador = generar_agregados.AcumuladorAgregados().actualizar(eventos.copy())
+    generar_agregados.escribir_agregados(acumulador, list(eventos.columns), paquete=True, carpeta=carpeta)
+    return carpeta
+
+
+def envejecer(ruta, segundos=60):
+    estado = os.stat(ruta)
+    os.utime(ruta, (estado.st_atime - segundos, estado.st_mtime - segundos))
+
+
+def plano(df):
+    """
+    Valores y orden de filas, sin depender de dtypes ni del índice.
+    """
+    return df.reset_index(drop=True).astype(object)
+
+
+def test_base_duckdb_vieja_no_se_usa(agregados, capsys):
+    ruta_db = construir_base(agregados)
+
+    # Se regeneran los agregados sin reconstruir la base
+    ruta_provincias = os.path.join(agregados, "conteos_provincia.csv")
+    with open(ruta_provincias, "w", encoding="utf-8") as f:
+        f.write("Provincia,Cantidad\nPICHINCHA,1\n")
+    envejecer(ruta_db)
+    capsys.readouterr()
+
+    consultas = ConsultasDuckDB(agregados)
+    assert "anterior a los agregados" in capsys.readouterr().out
+    pdt.assert_frame_equal(consultas.conteos_provincia(), ConsultasCSV(agregados).conteos_provincia(),
+                           check_dtype=False)
+
+
+def test_base_duckdb_vigente_se_usa(agregados):
+    construir_base(agregados)
+    envejecer(os.path.join(agregados, ARCHIVO_METADATOS))
+    consultas = ConsultasDuckDB(agregados)
+    tablas = consultas.conexion.execute("SELECT table_name, table_type FROM information_schema.tables").fetchall()
+    assert all(tipo == "BASE TABLE" for _, tipo in tablas)
+    assert os.path.exists(os.path.join(agregados, ARCHIVO_DUCKDB))
+
+
+def test_backends_devuelven_lo_mismo(agregados, monkeypatch):
+    construir_base(agregados)
+    consultas = [ConsultasCSV(agregados), ConsultasPaquete(agregados), ConsultasDuckDB(agregados)]
+    provincia = consultas[0].conteos_provincia()['Provincia'].iloc[0]
+    llamadas = {
+        'conteos_ano_mes': (), 'conteos_dia_semana': (), 'conteos_provincia': (),
+        'evolucion_provincia': ([provincia],), 'conteos_ano_servicio': (),
+        'ranking_parroquias': (10,), 'conteos_subtipo_ano': (),
+        'conteos_subtipo_provincia': (provincia,),
+    }
+    for metodo, argumentos in llamadas.items():
+        csv, paquete, sql = (plano(getattr(c, metodo)(*argumentos)) for c in consultas)
+        pdt.assert_frame_equal(paquete, csv, obj=f"paquete.{metodo}")
+        pdt.assert_frame_equal(sql, csv, obj=f"duckdb.{metodo}")
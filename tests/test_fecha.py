@@ -0,0 +1,43 @@
+"""
+parsear_fecha (formato detectado + respaldo) contra pd.to_datetime con
+inferencia, que es lo que hacía el pipeline antes.
+"""
+import pandas as pd
+import pandas.testing as pdt
+
+from esquema import detectar_formato_fecha, parsear_fecha
+
+
+def inferido(serie):
+    return pd.to_datetime(serie, dayfirst=True, format='mixed', errors='coerce').astype('datetime64[ns]')
+
+
+def test_igual_a_inferencia_en_el_feed(eventos, eventos_con_hora):
+    for serie in (eventos['Fecha'], eventos_con_hora['Fecha']):
+        pdt.assert_series_equal(parsear_fecha(serie, informar=False), inferido(serie))
+
+
+def test_formato_del_feed_es_dia_primero(eventos, eventos_con_hora):
+    assert detectar_formato_fecha(eventos['Fecha'].unique()) == "%d/%m/%Y"
+    assert detectar_formato_fecha(eventos_con_hora['Fecha'].unique()) == "%d/%m/%Y %H:%M:%S"
+
+
+def test_minoria_en_otros_formatos_y_basura():
+    serie = pd.Series(["03/02/2021"] * 5 + ["2021-02-04", "05/02/2021 10:30", "no es fecha", None, " 06/02/2021 "],
+                      index=range(10, 20), name="Fecha")
+    conteo = {}
+    resultado = parsear_fecha(serie, informar=False, conteo=conteo)
+
+    # Con dayfirst=True la inferencia lee 2021-02-04 como 2 de abril; el
+    # formato ISO explícito no
+    assert resultado.index.equals(serie.index)
+    assert resultado.iloc[0] == pd.Timestamp(2021, 2, 3)
+    assert resultado.iloc[5] == pd.Timestamp(2021, 2, 4)
+    assert resultado.iloc[6] == pd.Timestamp(2021, 2, 5, 10, 30)
+    assert resultado.iloc[[7, 8]].isna().all()
+    assert conteo == {'en_formato': 6, 'alternas': 2, 'sin_parsear': 1}
+
+
+def test_datetime_se_devuelve_sin_reparsear(eventos_tipados):
+    fechas = eventos_tipados['Fecha']
+    assert parsear_fecha(fechas, informar=False) is fechas
@@ -0,0 +1,79 @@
+"""
+Agregación por bloques: los conteos acumulados bloque a bloque (y
+combinados entre acumuladores) son los mismos que agrupar todo de una vez.
+"""
+import pickle
+
+import pandas as pd
+import pandas.testing as pdt
+
+from generar_agregados import (
+    AGRUPACIONES,
+    AcumuladorAgregados,
+    agregar_columnas_tiempo,
+    contar,
+    reducir_conteos,
+    sumar_conteos,
+)
+
+
+def acumular(df, filas_bloque):
+    acumulador = AcumuladorAgregados()
+    for inicio in range(0, len(df), filas_bloque):
+        acumulador.actualizar(df.iloc[inicio:inicio + filas_bloque].copy())
+    return acumulador
+
+
+def tabla_esperada(df, claves):
+    tabla = df.groupby(claves).size().reset_index(name='Cantidad')
+    return tabla.sort_values(claves).reset_index(drop=True)
+
+
+def comparar(tabla, esperada):
+    pdt.assert_frame_equal(tabla.astype(object), esperada.astype(object))
+
+
+def test_bloques_igual_a_agrupar_todo(eventos):
+    completo = agregar_columnas_tiempo(eventos.copy())
+    # 15 bloques: pasa varias veces por la reducción de pendientes
+    acumulador = acumular(eventos, 1_000)
+    assert acumulador.total_registros == len(eventos)
+    assert acumulador.fechas_invalidas() == 0
+    for nombre, claves in AGRUPACIONES.items():
+        comparar(acumulador.tabla(nombre), tabla_esperada(completo, claves))
+
+
+def test_cubo_por_bloques_igual_a_un_bloque(eventos):
+    por_bloques = acumular(eventos, 700).reducir()
+    uno = acumular(eventos, len(eventos)).reducir()
+    pdt.assert_series_equal(por_bloques.cubo.sort_index(), uno.cubo.sort_index(),
+                            check_names=False)
+
+
+def test_combinar_igual_a_una_pasada(eventos):
+    mitad = len(eventos) // 2
+    combinado = acumular(eventos.iloc[:mitad], 1_000).combinar(acumular(eventos.iloc[mitad:], 1_000))
+    uno = acumular(eventos, 1_000)
+    assert combinado.total_registros == uno.total_registros
+    assert combinado.provincias == uno.provincias
+    for nombre in AGRUPACIONES:
+        comparar(combinado.tabla(nombre), uno.tabla(nombre))
+
+
+def test_pickle_conserva_pendientes(eventos):
+    acumulador = acumular(eventos, 3_000)
+    copia = pickle.loads(pickle.dumps(acumulador))
+    for nombre in AGRUPACIONES:
+        comparar(copia.tabla(nombre), acumulador.tabla(nombre))
+
+
+def test_reducir_conteos_igual_a_sumar_de_a_uno(eventos):
+    df = agregar_columnas_tiempo(eventos.copy())
+    claves = AGRUPACIONES['evolucion_provincia']
+    partes = [contar(df.iloc[i:i + 2_500], claves) for i in range(0, len(df), 2_500)]
+    de_a_uno = None
+    for parte in partes:
+        de_a_uno = sumar_conteos(de_a_uno, parte)
+    pdt.assert_series_equal(reducir_conteos(partes).sort_index(), de_a_uno.sort_index(),
+                            check_names=False)
+    assert reducir_conteos([None, None]) is None
@@ -0,0 +1,71 @@
+"""
+mapear_parroquias_inec (búsqueda en el índice de códigos) contra el merge
+por código que hacía antes.
+"""
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from catalogo_inec import indice_parroquias, preparar_inec_ref
+from procesar_todos_emergencias import clean_emergencias, mapear_parroquias_inec
+
+
+def codigo_texto(serie):
+    return serie.astype(str).str.replace(r'\.0$', '', regex=True).str.strip().str.zfill(6)
+
+
+def mapear_con_merge(df_emerg, inec_ref):
+    """
+    Implementación anterior: copias, códigos como texto y merge por código.
+    """
+    df = df_emerg.copy()
+    df['Cod_Parroquia'] = codigo_texto(df['Cod_Parroquia'])
+    inec = inec_ref.copy()
+    inec['DPA_PARROQ'] = codigo_texto(inec['DPA_PARROQ'])
+    return df.merge(inec[['DPA_PARROQ']], left_on='Cod_Parroquia', right_on='DPA_PARROQ', how='left')
+
+
+@pytest.fixture(scope="module")
+def inec_ref(catalogo):
+    return preparar_inec_ref(catalogo)
+
+
+@pytest.fixture
+def limpios(eventos):
+    return clean_emergencias(eventos)
+
+
+def dpa(df):
+    return df['DPA_PARROQ'].astype(object).where(df['DPA_PARROQ'].notna(), None).reset_index(drop=True)
+
+
+def test_indice_igual_al_merge(limpios, inec_ref):
+    esperado = mapear_con_merge(limpios, inec_ref)
+    resultado = mapear_parroquias_inec(limpios.copy(), inec_ref)
+    assert len(resultado) == len(limpios)
+    pdt.assert_series_equal(dpa(resultado), dpa(esperado))
+    # El generador mete códigos inexistentes: tiene que haber filas sin match
+    assert resultado['DPA_PARROQ'].isna().any()
+
+
+def test_codigos_como_texto(limpios, inec_ref):
+    limpios['Cod_Parroquia'] = codigo_texto(limpios['Cod_Parroquia'])
+    limpios.loc[limpios.index[:5], 'Cod_Parroquia'] = ['abc', '', None, '0', '1701509']
+    esperado = mapear_con_merge(limpios, inec_ref)
+    resultado = mapear_parroquias_inec(limpios.copy(), inec_ref)
+    pdt.assert_series_equal(dpa(resultado), dpa(esperado))
+
+
+def test_claves_repetidas_no_duplican_filas(limpios, inec_ref):
+    repetido = pd.concat([inec_ref, inec_ref], ignore_index=True)
+    resultado = mapear_parroquias_inec(limpios.copy(), repetido)
+    assert len(resultado) == len(limpios)
+    pdt.assert_series_equal(dpa(resultado), dpa(mapear_parroquias_inec(limpios.copy(), inec_ref)))
+    assert len(indice_parroquias(repetido)) == len(np.unique(inec_ref['DPA_PARROQ']))
+
+
+def test_asigna_sobre_el_mismo_frame(limpios, inec_ref):
+    resultado = mapear_parroquias_inec(limpios, inec_ref)
+    assert resultado is limpios
+    assert isinstance(resultado.index, pd.RangeIndex)
@@ -0,0 +1,46 @@
+"""
+pipeline_polars contra el camino pandas (procesar_todos_emergencias +
+generar_agregados): mismos conteos, también con Fechas inválidas.
+"""
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from catalogo_inec import indice_parroquias, preparar_inec_ref
+from generar_agregados import AGRUPACIONES, AcumuladorAgregados
+from procesar_todos_emergencias import clean_emergencias, mapear_parroquias_inec
+
+pl = pytest.importorskip("polars")
+from pipeline_polars import acumulador_desde_cubo, cubo_lazy, escanear_crudos, limpiar_lazy  # noqa: E402
+
+
+def comparar_motores(crudos, catalogo, tmp_path):
+    ruta = tmp_path / "emergencias_julio_2021.csv"
+    crudos.to_csv(ruta, sep=";", index=False)
+    inec_ref = preparar_inec_ref(catalogo)
+
+    limpios = mapear_parroquias_inec(clean_emergencias(crudos.astype(str)), inec_ref)
+    con_pandas = AcumuladorAgregados().actualizar(limpios)
+    cubo = cubo_lazy(limpiar_lazy(escanear_crudos([str(ruta)]), indice_parroquias(inec_ref))).collect()
+    con_polars = acumulador_desde_cubo(cubo)
+
+    assert con_polars.total_registros == con_pandas.total_registros
+    assert con_polars.fechas_invalidas() == con_pandas.fechas_invalidas()
+    for nombre in AGRUPACIONES:
+        pdt.assert_frame_equal(con_polars.tabla(nombre).astype(object),
+                               con_pandas.tabla(nombre).astype(object), obj=nombre)
+    return con_pandas
+
+
+def test_mismos_conteos_que_pandas(eventos, catalogo, tmp_path):
+    comparar_motores(eventos, catalogo, tmp_path)
+
+
+def test_fechas_invalidas_fuera_de_la_evolucion(eventos, catalogo, tmp_path):
+    eventos.loc[eventos.index[:50], 'Fecha'] = "sin fecha"
+    eventos.loc[eventos.index[50:60], 'Fecha'] = "31/02/2021"
+    con_pandas = comparar_motores(eventos, catalogo, tmp_path)
+    assert con_pandas.fechas_invalidas() > 0
+    evolucion = con_pandas.tabla('evolucion_provincia')
+    assert evolucion['Año_Mes'].notna().all()
+    assert "NaT" not in set(evolucion['Año_Mes'])
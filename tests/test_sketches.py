@@ -0,0 +1,79 @@
+"""
+Sketches: combinar los de cada parte da lo mismo que una sola pasada, y
+las estimaciones quedan dentro de sus cotas frente a los conteos exactos.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from generar_agregados import agregar_columnas_tiempo
+from sketches import (
+    DIMENSIONES_SKETCH,
+    ResumenSketches,
+    SpaceSaving,
+    cargar_sketches,
+    guardar_sketches,
+)
+
+
+@pytest.fixture
+def con_tiempo(eventos):
+    return agregar_columnas_tiempo(eventos.copy())
+
+
+def por_partes(df, filas):
+    resumen = ResumenSketches()
+    for inicio in range(0, len(df), filas):
+        resumen.combinar(ResumenSketches().actualizar(df.iloc[inicio:inicio + filas]))
+    return resumen
+
+
+def test_combinar_igual_a_una_pasada(con_tiempo):
+    uno = ResumenSketches().actualizar(con_tiempo)
+    combinado = por_partes(con_tiempo, 4_000)
+    assert combinado.total_registros == uno.total_registros
+    for nombre in DIMENSIONES_SKETCH:
+        np.testing.assert_array_equal(combinado.hll[nombre].registros, uno.hll[nombre].registros)
+        np.testing.assert_array_equal(combinado.count_min[nombre].tabla, uno.count_min[nombre].tabla)
+
+
+def test_distintos_y_frecuencias_dentro_de_cotas(con_tiempo):
+    resumen = por_partes(con_tiempo, 4_000)
+    for nombre, columnas in DIMENSIONES_SKETCH.items():
+        exactos = con_tiempo.groupby(columnas).size()
+        assert abs(resumen.distintos(nombre) - len(exactos)) <= 0.05 * len(exactos)
+        for clave, cantidad in exactos.head(20).items():
+            assert resumen.frecuencia(nombre, clave) >= cantidad
+
+
+def test_top_subtipos_igual_al_exacto(con_tiempo):
+    resumen = por_partes(con_tiempo, 4_000)
+    exactos = con_tiempo['Subtipo'].value_counts()
+    top = resumen.top('subtipo', 5)
+    assert top['Subtipo'].tolist() == exactos.index[:5].tolist()
+    assert top['Cantidad'].tolist() == exactos.iloc[:5].tolist()
+
+
+def test_space_saving_acota_el_conteo_real():
+    rng = np.random.default_rng(7)
+    claves = rng.zipf(1.5, 20_000) % 300
+    exactos = pd.Series(claves).value_counts()
+    partes = []
+    for trozo in np.array_split(claves, 4):
+        conteo = pd.Series(trozo).value_counts()
+        parte = SpaceSaving(capacidad=40)
+        parte.agregar(list(conteo.index), conteo.to_numpy())
+        partes.append(parte)
+    combinado = partes[0]
+    for parte in partes[1:]:
+        combinado.combinar(parte)
+    for clave, conteo, error in combinado.top(10):
+        assert conteo - error <= exactos[clave] <= conteo
+    assert combinado.top(1)[0][0] == exactos.index[0]
+
+
+def test_guardar_y_cargar(con_tiempo, tmp_path):
+    resumen = ResumenSketches().actualizar(con_tiempo)
+    guardar_sketches(resumen, str(tmp_path))
+    cargado = cargar_sketches(str(tmp_path))
+    pd.testing.assert_frame_equal(cargado.top('parroquia', 10), resumen.top('parroquia', 10))
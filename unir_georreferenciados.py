@@ -1,17 +1,122 @@
+import numpy as np
 import pandas as pd
+import argparse
 import glob
 import os
 
-def unir_archivos_georreferenciados():
+from almacenamiento import EscritorPorBloques, es_parquet, escribir_tabla, leer_tabla, ruta_con_formato, tamano_mb
+from cache_etapas import CacheEtapas
+from conjuntos import CONJUNTOS, conjunto_datos
+from esquema import ESQUEMA_GEORREFERENCIADO, leer_csv_tipado, parsear_fecha, unificar_categorias
+from instrumentacion import etapa
+
+
+def buscar_archivos_georreferenciados(conjunto: str = "emergencias"):
+    """
+    Busca los archivos emergencias_*_georreferenciado (o los del conjunto
+    de datos indicado, ver conjuntos.py) en CSV o Parquet
+    (sin el *_completo_* que genera este mismo script).
+    Si un mes existe en ambos formatos se usa el Parquet.
+    """
+    por_nombre = {}
+    for patron in conjunto_datos(conjunto).patrones_georreferenciados():
+        for archivo in glob.glob(patron):
+            if "_completo_" not in archivo:
+                por_nombre[os.path.splitext(archivo)[0]] = archivo
+    return list(por_nombre.values())
+
+
+def leer_mes(archivo: str) -> pd.DataFrame:
+    """
+    Lee un archivo georreferenciado (CSV tipado o Parquet) y agrega la
+    columna archivo_origen.
     """
-    Une todos los archivos *_georreferenciado.csv en un solo archivo.
+    with etapa("leer", archivo) as paso:
+        if es_parquet(archivo):
+            df = leer_tabla(archivo)
+        else:
+            df = leer_csv_tipado(archivo, ESQUEMA_GEORREFERENCIADO, encoding='utf-8')
+        paso.contar(salida=len(df))
+
+    # Agregar columna con el nombre del archivo de origen (opcional)
+    df['archivo_origen'] = pd.Categorical.from_codes(
+        np.zeros(len(df), dtype=np.int8), [os.path.basename(archivo)]
+    )
+    return df
+
+
+def leer_unificado(archivo: str) -> pd.DataFrame:
+    """
+    Lee el archivo unificado (CSV tipado o Parquet, particionado o no) con
+    Fecha como datetime, como lo devuelve unir_archivos_georreferenciados.
+    """
+    with etapa("leer", archivo) as paso:
+        if es_parquet(archivo):
+            df = leer_tabla(archivo)
+        else:
+            df = leer_csv_tipado(archivo, ESQUEMA_GEORREFERENCIADO, encoding='utf-8')
+        if 'Fecha' in df.columns:
+            df['Fecha'] = parsear_fecha(df['Fecha'])
+        paso.contar(salida=len(df))
+    return df
+
+
+class EstadisticasUnion:
+    """
+    Estadísticas del archivo unificado acumuladas archivo por archivo:
+    filas, filas con código INEC, rango de Fecha y filas por origen.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.con_codigo = 0
+        self.fecha_min = None
+        self.fecha_max = None
+        self.por_origen = {}
+
+    def actualizar(self, df: pd.DataFrame, origen: str) -> None:
+        self.total += len(df)
+        self.con_codigo += int(df['DPA_PARROQ'].notna().sum())
+        if 'Fecha' in df.columns and df['Fecha'].notna().any():
+            minimo, maximo = df['Fecha'].min(), df['Fecha'].max()
+            self.fecha_min = minimo if self.fecha_min is None else min(self.fecha_min, minimo)
+            self.fecha_max = maximo if self.fecha_max is None else max(self.fecha_max, maximo)
+        self.por_origen[os.path.basename(origen)] = (
+            self.por_origen.get(os.path.basename(origen), 0) + len(df)
+        )
+
+    def imprimir(self) -> None:
+        print(f"\n[ESTADISTICAS]")
+        if self.total == 0:
+            print("  - Sin filas (todos los archivos estaban vacíos)")
+            return
+        sin_codigo = self.total - self.con_codigo
+        print(f"  - Con codigo INEC: {self.con_codigo:,} ({self.con_codigo/self.total*100:.2f}%)")
+        print(f"  - Sin codigo INEC: {sin_codigo:,} ({sin_codigo/self.total*100:.2f}%)")
+        if self.fecha_min is not None:
+            print(f"  - Rango de fechas: {self.fecha_min} a {self.fecha_max}")
+
+
+def unir_archivos_georreferenciados(formato: str = "csv", usar_cache: bool = True,
+                                    streaming: bool = False, conjunto: str = "emergencias"):
+    """
+    Une todos los archivos *_georreferenciado.csv (o .parquet) de un
+    conjunto de datos en un solo archivo <conjunto>_2021_completo_georreferenciado.
+    Con formato="parquet" el resultado se guarda particionado por año/mes.
+    Con usar_cache, si ningún mes cambió desde una ejecución anterior el
+    archivo unificado se copia de la cache de etapas y se devuelve leído de
+    ese archivo (sin volver a leer los meses).
+    Con streaming=True cada mes se escribe en la salida apenas se lee
+    (columnas del primer archivo) y solo se guardan las estadísticas, así
+    la memoria es la de un mes; no se arma el DataFrame completo y se
+    devuelve None.
     """
     print("="*60)
     print("UNIENDO ARCHIVOS GEORREFERENCIADOS")
     print("="*60)
     
     # Buscar todos los archivos georreferenciados
-    archivos = glob.glob("emergencias_*_georreferenciado.csv")
+    archivos = buscar_archivos_georreferenciados(conjunto)
     
     if not archivos:
         print("\n❌ No se encontraron archivos *_georreferenciado.csv")
@@ -19,60 +124,96 @@ def unir_archivos_georreferenciados():
     
     print(f"\n[OK] Se encontraron {len(archivos)} archivos:")
     for archivo in sorted(archivos):
-        tamano_mb = os.path.getsize(archivo) / (1024 * 1024)
-        print(f"  - {archivo} ({tamano_mb:.2f} MB)")
-    
-    # Leer y concatenar todos los archivos
-    print(f"\n[PROCESO] Leyendo archivos...")
-    dataframes = []
-    
-    for i, archivo in enumerate(sorted(archivos), 1):
-        print(f"  [{i}/{len(archivos)}] Cargando {archivo}...")
-        df = pd.read_csv(archivo, encoding='utf-8')
-        
-        # Agregar columna con el nombre del archivo de origen (opcional)
-        df['archivo_origen'] = os.path.basename(archivo)
-        
-        dataframes.append(df)
-        print(f"      [OK] {len(df):,} filas cargadas")
-    
-    # Concatenar todos los dataframes
-    print(f"\n[PROCESO] Concatenando {len(dataframes)} archivos...")
-    df_completo = pd.concat(dataframes, ignore_index=True)
-    
-    print(f"  [OK] Total de filas: {len(df_completo):,}")
-    print(f"  [OK] Total de columnas: {len(df_completo.columns)}")
-    
-    # Mostrar estadísticas
-    print(f"\n[ESTADISTICAS]")
-    print(f"  - Con codigo INEC: {df_completo['DPA_PARROQ'].notna().sum():,} ({df_completo['DPA_PARROQ'].notna().sum()/len(df_completo)*100:.2f}%)")
-    print(f"  - Sin codigo INEC: {df_completo['DPA_PARROQ'].isna().sum():,} ({df_completo['DPA_PARROQ'].isna().sum()/len(df_completo)*100:.2f}%)")
-    
-    if 'Fecha' in df_completo.columns:
-        df_completo['Fecha'] = pd.to_datetime(df_completo['Fecha'], errors='coerce')
-        print(f"  - Rango de fechas: {df_completo['Fecha'].min()} a {df_completo['Fecha'].max()}")
-    
-    # Guardar archivo unificado
-    output_file = "emergencias_2021_completo_georreferenciado.csv"
-    print(f"\n[GUARDANDO] Archivo unificado: {output_file}")
-    df_completo.to_csv(output_file, index=False, encoding='utf-8')
+        print(f"  - {archivo} ({tamano_mb(archivo):.2f} MB)")
+
+    output_file = ruta_con_formato(f"{conjunto}_2021_completo_georreferenciado.csv", formato)
+    cache = CacheEtapas() if usar_cache else None
+    if cache is not None:
+        clave = cache.clave("unir", archivos, formato=formato, conjunto=conjunto)
+        if cache.restaurar(clave, output_file):
+            print(f"\n[OK] Ningún mes cambió: {output_file} restaurado de la cache")
+            return None if streaming else leer_unificado(output_file)
+
+    estadisticas = EstadisticasUnion()
+    df_completo = None
+    if streaming:
+        print(f"\n[PROCESO] Leyendo y escribiendo archivo por archivo en {output_file}...")
+        with EscritorPorBloques(output_file, formato, particionar=True) as escritor:
+            for i, archivo in enumerate(sorted(archivos), 1):
+                print(f"  [{i}/{len(archivos)}] Cargando {archivo}...")
+                df = leer_mes(archivo)
+                if escritor.columnas is not None and list(df.columns) != escritor.columnas:
+                    print(f"      [AVISO] Columnas distintas a las del primer archivo; "
+                          f"se ajustan a esas {len(escritor.columnas)} columnas")
+                if 'Fecha' in df.columns:
+                    df['Fecha'] = parsear_fecha(df['Fecha'])
+                with etapa("escribir", archivo, len(df)):
+                    escritor.escribir(df)
+                estadisticas.actualizar(df, archivo)
+                print(f"      [OK] {len(df):,} filas escritas")
+                del df
+        print(f"  [OK] Total de filas: {estadisticas.total:,}")
+        print(f"  [OK] Total de columnas: {len(escritor.columnas)}")
+    else:
+        # Leer y concatenar todos los archivos
+        print(f"\n[PROCESO] Leyendo archivos...")
+        dataframes = []
+
+        for i, archivo in enumerate(sorted(archivos), 1):
+            print(f"  [{i}/{len(archivos)}] Cargando {archivo}...")
+            df = leer_mes(archivo)
+            estadisticas.actualizar(df, archivo)
+            dataframes.append(df)
+            print(f"      [OK] {len(df):,} filas cargadas")
+
+        # Concatenar todos los dataframes
+        print(f"\n[PROCESO] Concatenando {len(dataframes)} archivos...")
+        with etapa("concatenar", filas_entrada=sum(len(df) for df in dataframes)) as paso:
+            df_completo = pd.concat(unificar_categorias(dataframes), ignore_index=True)
+            paso.contar(salida=len(df_completo))
+
+        print(f"  [OK] Total de filas: {len(df_completo):,}")
+        print(f"  [OK] Total de columnas: {len(df_completo.columns)}")
+
+        if 'Fecha' in df_completo.columns:
+            # Ya viene como datetime de leer_csv_tipado / Parquet; no se re-parsea
+            df_completo['Fecha'] = parsear_fecha(df_completo['Fecha'])
+
+        # Guardar archivo unificado
+        print(f"\n[GUARDANDO] Archivo unificado: {output_file}")
+        with etapa("escribir", output_file, len(df_completo)):
+            output_file = escribir_tabla(df_completo, output_file, formato, particionar=True)
+
+    estadisticas.imprimir()
     
-    tamano_final_mb = os.path.getsize(output_file) / (1024 * 1024)
-    print(f"  [OK] Archivo guardado exitosamente ({tamano_final_mb:.2f} MB)")
+    tamano_final_mb = tamano_mb(output_file)
+    print(f"\n  [OK] Archivo guardado exitosamente ({tamano_final_mb:.2f} MB)")
+    if cache is not None:
+        cache.guardar(clave, "unir", output_file)
     
     # Reporte por archivo de origen
     print(f"\n[DISTRIBUCION] Por archivo:")
-    conteo_origen = df_completo['archivo_origen'].value_counts().sort_index()
-    for archivo, cantidad in conteo_origen.items():
+    for archivo, cantidad in sorted(estadisticas.por_origen.items()):
         print(f"  - {archivo}: {cantidad:,} filas")
     
     print(f"\n{'='*60}")
     print("[OK] PROCESO COMPLETADO")
     print(f"{'='*60}")
     print(f"\nArchivo final: {output_file}")
-    print(f"Total de registros: {len(df_completo):,}")
+    print(f"Total de registros: {estadisticas.total:,}")
     
     return df_completo
 
 if __name__ == "__main__":
-    df_unificado = unir_archivos_georreferenciados()
+    parser = argparse.ArgumentParser(description="Une los *_georreferenciado de un conjunto de datos en un solo archivo")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv",
+                        help="formato del archivo unificado")
+    parser.add_argument("--streaming", action="store_true",
+                        help="escribir mes a mes sin tener el año completo en memoria")
+    parser.add_argument("--sin-cache", action="store_true",
+                        help="unir aunque ningún mes haya cambiado")
+    parser.add_argument("--conjunto", choices=list(CONJUNTOS), default="emergencias",
+                        help="conjunto de datos a unir")
+    args = parser.parse_args()
+    df_unificado = unir_archivos_georreferenciados(args.formato, not args.sin_cache, args.streaming,
+                                                   args.conjunto)